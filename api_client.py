@@ -1,12 +1,132 @@
 #-----------------------------------------------------------------#
-import json
+import os
 import base64
 import datetime
-import requests
-from urllib.parse import urlencode
-from secrets import client_id
-from secrets import client_secret
+import functools
+import threading
+import contextlib
+import deadlines
+import lanes
 
+# Credentials are looked up in this order: constructor arguments, the
+# environment, then the config file (STATIFY_CONFIG or the default path).
+CLIENT_ID_ENV = "SPOTIFY_CLIENT_ID"
+CLIENT_SECRET_ENV = "SPOTIFY_CLIENT_SECRET"
+CONFIG_PATH_ENV = "STATIFY_CONFIG"
+DEFAULT_CONFIG_PATH = os.path.join("~", ".config", "statify", "config.ini")
+
+
+def _requests():
+    """
+    Import requests on first use so that importing this module (and statify)
+    stays cheap for commands that never touch the network
+    """
+    import requests
+    return requests
+
+
+def __getattr__(name):
+    # Module level fallbacks: `api_client.requests` for callers/tests that
+    # patch it, and `api_client.client_id` / `client_secret` for scripts that
+    # used to read them from the old secrets.py import
+    if name == "requests":
+        return _requests()
+    if name in ("client_id", "client_secret"):
+        return load_credentials()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def read_config_credentials(path=None):
+    """
+    Returns (client_id, client_secret) from the [spotify] section of an INI
+    config file, or (None, None) if there is no such file
+    """
+    path = path or os.environ.get(CONFIG_PATH_ENV) or DEFAULT_CONFIG_PATH
+    path = os.path.expanduser(path)
+    if not os.path.isfile(path):
+        return None, None
+    import configparser
+    parser = configparser.ConfigParser()
+    parser.read(path)
+    if not parser.has_section("spotify"):
+        return None, None
+    section = parser["spotify"]
+    return section.get("client_id"), section.get("client_secret")
+
+
+def load_credentials(client_id=None, client_secret=None, config_path=None):
+    """
+    Resolves client credentials from arguments, then the environment, then
+    the config file. Missing values are returned as None
+    """
+    client_id = client_id or os.environ.get(CLIENT_ID_ENV)
+    client_secret = client_secret or os.environ.get(CLIENT_SECRET_ENV)
+    if client_id is None or client_secret is None:
+        file_id, file_secret = read_config_credentials(config_path)
+        client_id = client_id or file_id
+        client_secret = client_secret or file_secret
+    return {"client_id": client_id, "client_secret": client_secret}
+
+
+def accepts_deadline(method):
+    """
+    Adds a deadline keyword (a deadlines.Deadline or seconds from now) and a
+    lane keyword (see lanes.py) that apply to every HTTP call the method makes
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, deadline=None, lane=None, **kwargs):
+        with deadlines.scope(deadline), lanes.scope(lane):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class RequestTally(object):
+    """Number of HTTP requests sent while it was active (see count_requests)."""
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, n=1):
+        with self.lock:
+            self.count += n
+
+
+_tallies = threading.local()
+
+
+def active_tallies():
+    """The RequestTally objects counting requests sent on this thread."""
+    return getattr(_tallies, "active", ())
+
+
+@contextlib.contextmanager
+def tally_scope(tallies):
+    """Counts requests sent on this thread within the block in tallies (from active_tallies())."""
+    outer = active_tallies()
+    _tallies.active = tuple(tallies)
+    try:
+        yield
+    finally:
+        _tallies.active = outer
+
+
+@contextlib.contextmanager
+def count_requests():
+    """
+    Counts the HTTP requests sent on this thread within the block, and the
+    hedged requests they start, in the yielded RequestTally. Unlike a
+    client's request_count it is not shared with other callers
+    """
+    tally = RequestTally()
+    with tally_scope(active_tallies() + (tally,)):
+        yield tally
+
+
+def count_request():
+    """Adds one request to every tally active on this thread."""
+    for tally in active_tallies():
+        tally.add()
 
 
 class SpotifyAPI(object):
@@ -19,10 +139,59 @@ class SpotifyAPI(object):
     token_url = "https://accounts.spotify.com/api/token"
     method = "POST"
 
-    def __init__(self, client_id, client_secret, *args, **kwargs):
+    fast_decode = False
+    catalog = None
+    circuit_breakers = None
+    hedger = None
+    entity_map = None
+    # requests-compatible object the HTTP calls go through; None is requests
+    transport = None
+    lane_scheduler = None
+    # per-call timeout in seconds, also the cap when a deadline is in effect
+    timeout = 10.0
+    # HTTP requests sent by this client, for budgeting and tests
+    request_count = 0
+
+    def __init__(self, client_id=None, client_secret=None, *args, config_path=None,
+                 fast_decode=False, catalog=None, circuit_breakers=None, hedger=None,
+                 entity_map=None, transport=None, lane_scheduler=None, timeout=10.0, **kwargs):
         super().__init__(*args, **kwargs)
-        self.client_id = client_id
-        self.client_secret = client_secret
+        credentials = load_credentials(client_id, client_secret, config_path)
+        self.client_id = credentials["client_id"]
+        self.client_secret = credentials["client_secret"]
+        # Typed struct decoding is only used when msgspec is installed
+        if fast_decode:
+            import models
+            fast_decode = models.AVAILABLE
+        self.fast_decode = fast_decode
+        # Optional catalog.Catalog filled in from every successful response
+        self.catalog = catalog
+        # Optional resilience.CircuitBreakers / resilience.Hedger; True picks defaults
+        if circuit_breakers is True or hedger is True:
+            import resilience
+            if circuit_breakers is True:
+                circuit_breakers = resilience.CircuitBreakers()
+            if hedger is True:
+                hedger = resilience.Hedger()
+        self.circuit_breakers = circuit_breakers
+        self.hedger = hedger
+        # Optional entities.EntityMap answering get_artist / get_album /
+        # get_track from complete objects embedded in earlier responses
+        if entity_map is True:
+            import entities
+            entity_map = entities.EntityMap()
+        self.entity_map = entity_map
+        # Anything with requests' get/post and exceptions.Timeout, e.g. the
+        # in-process fake_spotify.FakeSpotify used by the performance tests
+        self.transport = transport
+        # Optional lanes.LaneScheduler admitting requests in weighted fair
+        # order across lanes; True picks the default weights without limits
+        if lane_scheduler is True:
+            lane_scheduler = lanes.LaneScheduler()
+        self.lane_scheduler = lane_scheduler
+        self.timeout = timeout
+        self.request_count = 0
+        self.request_count_lock = threading.Lock()
 
     # API AUTHENTICATION FUNCTIONS
     
@@ -57,7 +226,7 @@ class SpotifyAPI(object):
         token_data = self.get_token_data()
         token_headers = self.get_token_headers()
         # Make request for access token
-        r = requests.post(token_url, data=token_data, headers=token_headers)
+        r = self.send_request("post", token_url, data=token_data, headers=token_headers)
         # Check for validity
         valid_request = r.status_code in range(200, 299)
         if not valid_request:
@@ -86,6 +255,147 @@ class SpotifyAPI(object):
             return self.get_access_token()
         return token
 
+    def decode_response(self, r, kind):
+        """
+        Returns the response body as typed structs (see models.py) when fast
+        decoding is enabled, otherwise as plain dicts
+        """
+        if self.fast_decode:
+            import models
+            if kind in models.DECODERS:
+                return models.decode(kind, r.content)
+        return r.json()
+
+    def record(self, kind, data, parent_id=None):
+        """
+        Writes a decoded response into the attached entity map and catalog.
+        parent_id is the artist of an album listing or the album of a tracks
+        listing
+        """
+        if not data:
+            return
+        if self.entity_map is not None:
+            self.entity_map.harvest(data)
+        catalog = self.catalog
+        if catalog is None:
+            return
+        if kind == "artists":
+            catalog.add_artists([data])
+        elif kind == "albums":
+            catalog.add_albums([data])
+            catalog.add_tracks((data.get("tracks") or {}).get("items", []), album_id=data.get("id"))
+        elif kind == "tracks":
+            catalog.add_tracks([data])
+        elif kind == "search":
+            catalog.add_artists((data.get("artists") or {}).get("items", []))
+            catalog.add_albums((data.get("albums") or {}).get("items", []))
+            catalog.add_tracks((data.get("tracks") or {}).get("items", []))
+        elif kind == "album_page":
+            catalog.add_albums(data.get("items", []), artist_id=parent_id)
+        elif kind == "track_page":
+            catalog.add_tracks(data.get("items", []), album_id=parent_id)
+        elif kind == "track_list":
+            catalog.add_tracks(data.get("tracks", []))
+        elif kind == "artist_list":
+            catalog.add_artists(data.get("artists", []))
+        elif kind == "album_list":
+            albums = [album for album in data.get("albums", []) if album]
+            catalog.add_albums(albums)
+            for album in albums:
+                catalog.add_tracks((album.get("tracks") or {}).get("items", []), album_id=album.get("id"))
+
+    def request_timeout(self):
+        """
+        Timeout for the next HTTP call: the time left on the current deadline,
+        capped at self.timeout. Raises DeadlineExceeded once it has run out
+        """
+        deadline = deadlines.current()
+        if deadline is None:
+            return self.timeout
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise deadlines.DeadlineExceeded()
+        return min(self.timeout, remaining) if self.timeout else remaining
+
+    def send_request(self, method, url, **kwargs):
+        """
+        Sends one HTTP request with the current timeout, once the lane
+        scheduler (if any) admits it. A socket timeout caused by the deadline
+        is raised as DeadlineExceeded
+        """
+        deadline = deadlines.current()
+        scheduler = self.lane_scheduler
+        if scheduler is not None:
+            scheduler.acquire(lanes.current())
+        try:
+            # after queueing, so the time spent waiting counts against the deadline
+            timeout = self.request_timeout()
+            requests = self.transport if self.transport is not None else _requests()
+            with self.request_count_lock:
+                self.request_count += 1
+            count_request()
+            try:
+                return getattr(requests, method)(url, timeout=timeout, **kwargs)
+            except requests.exceptions.Timeout as e:
+                if deadline is not None and deadline.expired():
+                    raise deadlines.DeadlineExceeded() from e
+                raise
+        finally:
+            if scheduler is not None:
+                scheduler.release()
+
+    def http_get(self, endpoint, endpoint_key, headers, params=None):
+        """
+        Sends a GET through the endpoint's circuit breaker and hedger, when
+        configured. endpoint_key groups URLs of the same API endpoint
+        """
+        deadline = deadlines.current()
+        lane = lanes.current()
+        tallies = active_tallies()
+
+        def send():
+            # hedged requests run on another thread, so carry the deadline,
+            # lane and request tallies over
+            with deadlines.scope(deadline), lanes.scope(lane), tally_scope(tallies):
+                return self.send_request("get", endpoint, headers=headers, params=params)
+
+        breaker = None
+        if self.circuit_breakers is not None:
+            breaker = self.circuit_breakers.get(endpoint_key)
+            breaker.before_request()
+        try:
+            if self.hedger is not None:
+                r = self.hedger.call(endpoint_key, send)
+            else:
+                r = send()
+        except deadlines.DeadlineExceeded:
+            # running out of our own time budget says nothing about the endpoint
+            if breaker is not None:
+                breaker.record_abandoned()
+            raise
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            import resilience
+            if resilience.is_failure_status(r.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return r
+
+    def resilience_metrics(self):
+        """Breaker states and hedging counts per endpoint."""
+        return {
+            "circuit_breakers": self.circuit_breakers.metrics() if self.circuit_breakers is not None else {},
+            "hedging": self.hedger.metrics() if self.hedger is not None else {}
+        }
+
+    def lane_metrics(self):
+        """Per-lane request counts and queue wait percentiles (see lanes.LaneScheduler)."""
+        return self.lane_scheduler.metrics() if self.lane_scheduler is not None else {}
+
     # ENTITY ACCESS FUNCTIONS
     
     def get_resource_header(self):
@@ -95,23 +405,34 @@ class SpotifyAPI(object):
         }
         return headers
     
+    @accepts_deadline
     def get_resource(self, lookup_id, resource_type='artists', version='v1'):
+        if self.entity_map is not None:
+            data = self.entity_map.get(resource_type, lookup_id)
+            if data is not None:
+                return data
         endpoint = f"https://api.spotify.com/{version}/{resource_type}/{lookup_id}"
         headers = self.get_resource_header()
-        r = requests.get(endpoint, headers=headers)
+        r = self.http_get(endpoint, resource_type, headers)
         if r.status_code not in range(200,299):
             return {}
-        return r.json()
+        data = self.decode_response(r, resource_type)
+        self.record(resource_type, data)
+        return data
 
+    @accepts_deadline
     def get_track(self, _id):
         return self.get_resource(_id, resource_type='tracks')
 
+    @accepts_deadline
     def get_album(self, _id):
         return self.get_resource(_id, resource_type='albums')
 
+    @accepts_deadline
     def get_artist(self, _id):
         return self.get_resource(_id, resource_type='artists')
 
+    @accepts_deadline
     def search(self, query, search_type="track", limit=20, offset=0, market=None):
         headers = self.get_resource_header()
         endpoint = "https://api.spotify.com/v1/search"
@@ -126,17 +447,22 @@ class SpotifyAPI(object):
         if market:
             params["market"] = market
             
-        r = requests.get(endpoint, headers=headers, params=params)
+        r = self.http_get(endpoint, "search", headers, params)
         if r.status_code not in range(200, 299):
             raise Exception(f"Search failed with status {r.status_code}: {r.text}")
-        return r.json()
+        data = self.decode_response(r, "search")
+        self.record("search", data)
+        return data
 
+    @accepts_deadline
     def search_artists(self, query, limit=20, offset=0, market=None):
         return self.search(query, "artist", limit, offset, market)
     
+    @accepts_deadline
     def search_albums(self, query, limit=20, offset=0, market=None):
         return self.search(query, "album", limit, offset, market)
     
+    @accepts_deadline
     def search_tracks(self, query, limit=20, offset=0, market=None):
         return self.search(query, "track", limit, offset, market)
     
@@ -147,6 +473,7 @@ class SpotifyAPI(object):
     # For BFF: get collaborative artists on every song
     # For MIMD: get popularity score for artist
 
+    @accepts_deadline
     def get_albums_by_artist(self, artist_id, include_groups=None, market=None, limit=20, offset=0):
         endpoint = f"https://api.spotify.com/v1/artists/{artist_id}/albums"
         headers = self.get_resource_header()
@@ -161,11 +488,14 @@ class SpotifyAPI(object):
         if market:
             params["market"] = market
             
-        r = requests.get(endpoint, headers=headers, params=params)
+        r = self.http_get(endpoint, "artist_albums", headers, params)
         if r.status_code not in range(200, 299):
             raise Exception(f"Failed to get albums for artist {artist_id}: {r.status_code}")
-        return r.json()
+        data = self.decode_response(r, "album_page")
+        self.record("album_page", data, parent_id=artist_id)
+        return data
 
+    @accepts_deadline
     def get_album_tracks(self, album_id, market=None, limit=20, offset=0):
         endpoint = f"https://api.spotify.com/v1/albums/{album_id}/tracks"
         headers = self.get_resource_header()
@@ -178,21 +508,32 @@ class SpotifyAPI(object):
         if market:
             params["market"] = market
             
-        r = requests.get(endpoint, headers=headers, params=params)
+        r = self.http_get(endpoint, "album_tracks", headers, params)
         if r.status_code not in range(200, 299):
             raise Exception(f"Failed to get tracks for album {album_id}: {r.status_code}")
-        return r.json()
+        data = self.decode_response(r, "track_page")
+        self.record("track_page", data, parent_id=album_id)
+        return data
 
-    def get_all_tracks_by_artist(self, artist_id, include_groups="album,single", market=None):
-        all_tracks = []
+    def iter_artist_discography(self, artist_id, include_groups="album,single", market=None, deadline=None,
+                                lane=None):
+        """
+        Yields (album, tracks) for every album in the artist's discography,
+        one album at a time, so callers can stream results as they arrive
+        """
+        # A generator can't hold a scope open across yields, so fix the
+        # deadline and lane now and apply them to each call
+        deadline = deadlines.resolve(deadline)
+        lane = lane or lanes.current()
         offset = 0
         limit = 50
         
         while True:
-            albums_response = self.get_albums_by_artist(
-                artist_id, include_groups=include_groups, market=market, 
-                limit=limit, offset=offset
-            )
+            with deadlines.scope(deadline), lanes.scope(lane):
+                albums_response = self.get_albums_by_artist(
+                    artist_id, include_groups=include_groups, market=market, 
+                    limit=limit, offset=offset
+                )
             
             albums = albums_response.get("items", [])
             if not albums:
@@ -201,16 +542,29 @@ class SpotifyAPI(object):
             for album in albums:
                 album_id = album.get("id")
                 if album_id:
-                    tracks_response = self.get_album_tracks(album_id, market=market)
-                    tracks = tracks_response.get("items", [])
-                    all_tracks.extend(tracks)
+                    with deadlines.scope(deadline), lanes.scope(lane):
+                        tracks_response = self.get_album_tracks(album_id, market=market)
+                    yield album, tracks_response.get("items", [])
             
             if len(albums) < limit:
                 break
             offset += limit
-            
+
+        if self.catalog is not None:
+            self.catalog.mark_discography_fetched(artist_id)
+
+    def get_all_tracks_by_artist(self, artist_id, include_groups="album,single", market=None, deadline=None,
+                                 lane=None):
+        all_tracks = []
+        try:
+            for album, tracks in self.iter_artist_discography(artist_id, include_groups, market, deadline, lane):
+                all_tracks.extend(tracks)
+        except deadlines.DeadlineExceeded as e:
+            raise deadlines.DeadlineExceeded(
+                f"Deadline exceeded fetching tracks for artist {artist_id}", partial=all_tracks) from e
         return all_tracks
     
+    @accepts_deadline
     def get_multiple_tracks(self, track_ids, market=None):
         endpoint = "https://api.spotify.com/v1/tracks"
         headers = self.get_resource_header()
@@ -219,20 +573,55 @@ class SpotifyAPI(object):
         if market:
             params["market"] = market
             
-        r = requests.get(endpoint, headers=headers, params=params)
+        r = self.http_get(endpoint, "several_tracks", headers, params)
         if r.status_code not in range(200, 299):
             raise Exception(f"Failed to get multiple tracks: {r.status_code}")
-        return r.json()
+        data = self.decode_response(r, "track_list")
+        self.record("track_list", data)
+        return data
+    
+    @accepts_deadline
+    def get_multiple_albums(self, album_ids, market=None):
+        endpoint = "https://api.spotify.com/v1/albums"
+        headers = self.get_resource_header()
+        
+        params = {"ids": ",".join(album_ids)}
+        if market:
+            params["market"] = market
+            
+        r = self.http_get(endpoint, "several_albums", headers, params)
+        if r.status_code not in range(200, 299):
+            raise Exception(f"Failed to get multiple albums: {r.status_code}")
+        data = self.decode_response(r, "album_list")
+        self.record("album_list", data)
+        return data
     
+    @accepts_deadline
+    def get_multiple_artists(self, artist_ids):
+        endpoint = "https://api.spotify.com/v1/artists"
+        headers = self.get_resource_header()
+        
+        params = {"ids": ",".join(artist_ids)}
+            
+        r = self.http_get(endpoint, "several_artists", headers, params)
+        if r.status_code not in range(200, 299):
+            raise Exception(f"Failed to get multiple artists: {r.status_code}")
+        data = self.decode_response(r, "artist_list")
+        self.record("artist_list", data)
+        return data
+    
+    @accepts_deadline
     def get_artist_top_tracks(self, artist_id, market="US"):
         endpoint = f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks"
         headers = self.get_resource_header()
         
         params = {"market": market}
         
-        r = requests.get(endpoint, headers=headers, params=params)
+        r = self.http_get(endpoint, "artist_top_tracks", headers, params)
         if r.status_code not in range(200, 299):
             raise Exception(f"Failed to get top tracks for artist {artist_id}: {r.status_code}")
-        return r.json()
+        data = self.decode_response(r, "track_list")
+        self.record("track_list", data)
+        return data
     
 
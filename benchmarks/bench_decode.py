@@ -0,0 +1,139 @@
+# parse-throughput benchmark
+#
+# Compares the stdlib json dict path against the typed msgspec decoders in
+# models.py on album-track and search pages.
+#
+#   python benchmarks/bench_decode.py [--payloads DIR] [--repeat 200]
+#
+# DIR may contain recorded responses named after the decoder they feed,
+# e.g. track_page.json, album_page.json, search.json. Without it the
+# benchmark runs on synthetic pages built below: they have the field layout
+# of the Spotify responses but short ASCII names and no optional extras, so
+# absolute MB/s (and to a lesser degree the speedup) differ from recorded
+# traffic. No recorded responses ship with the repo; pass --payloads for
+# representative numbers. Each result says which source it came from.
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+
+MARKETS = ["AD", "AE", "AR", "AT", "AU", "BE", "BG", "BR", "CA", "CH", "CL", "CO",
+           "CZ", "DE", "DK", "ES", "FI", "FR", "GB", "GR", "HK", "IE", "IT", "JP",
+           "MX", "NL", "NO", "NZ", "PL", "PT", "SE", "SG", "US", "ZA"]
+
+
+def simplified_artist(i):
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{i}"},
+        "href": f"https://api.spotify.com/v1/artists/{i}",
+        "id": f"artist{i}",
+        "name": f"Artist {i}",
+        "type": "artist",
+        "uri": f"spotify:artist:artist{i}"
+    }
+
+
+def synthetic_track_page(n=50):
+    return {
+        "href": "https://api.spotify.com/v1/albums/album/tracks?offset=0&limit=50",
+        "limit": n, "next": None, "offset": 0, "previous": None, "total": n,
+        "items": [{
+            "artists": [simplified_artist(0), simplified_artist(i % 7 + 1)],
+            "available_markets": MARKETS,
+            "disc_number": 1,
+            "duration_ms": 200000 + i,
+            "explicit": i % 3 == 0,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{i}"},
+            "href": f"https://api.spotify.com/v1/tracks/{i}",
+            "id": f"track{i}",
+            "is_local": False,
+            "name": f"Track {i}",
+            "preview_url": None,
+            "track_number": i + 1,
+            "type": "track",
+            "uri": f"spotify:track:track{i}"
+        } for i in range(n)]
+    }
+
+
+def synthetic_album_page(n=50):
+    return {
+        "href": "https://api.spotify.com/v1/artists/artist0/albums",
+        "limit": n, "next": None, "offset": 0, "previous": None, "total": n,
+        "items": [{
+            "album_group": "album",
+            "album_type": "album" if i % 2 else "single",
+            "artists": [simplified_artist(0)],
+            "available_markets": MARKETS,
+            "external_urls": {"spotify": f"https://open.spotify.com/album/{i}"},
+            "href": f"https://api.spotify.com/v1/albums/{i}",
+            "id": f"album{i}",
+            "images": [{"height": s, "width": s, "url": f"https://i.scdn.co/image/{i}-{s}"}
+                       for s in (640, 300, 64)],
+            "name": f"Album {i}",
+            "release_date": f"{2000 + i % 20}-01-01",
+            "release_date_precision": "day",
+            "total_tracks": 12,
+            "type": "album",
+            "uri": f"spotify:album:album{i}"
+        } for i in range(n)]
+    }
+
+
+def load_payloads(directory):
+    """{kind: raw JSON bytes} from directory, or the synthetic pages without one"""
+    if not directory:
+        return {
+            "track_page": json.dumps(synthetic_track_page()).encode(),
+            "album_page": json.dumps(synthetic_album_page()).encode(),
+        }
+    payloads = {}
+    for name in sorted(os.listdir(directory)):
+        kind = name.split(".")[0]
+        if name.endswith(".json") and kind in models.DECODERS:
+            with open(os.path.join(directory, name), "rb") as f:
+                payloads[kind] = f.read()
+    return payloads
+
+
+def throughput(fn, payload, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    elapsed = time.perf_counter() - start
+    return len(payload) * repeat / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON decoding throughput, dict vs typed structs")
+    parser.add_argument("--payloads", help="directory of recorded <kind>.json responses")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    if not models.AVAILABLE:
+        sys.exit("msgspec is not installed; only the dict path is available")
+
+    results = []
+    for kind, payload in load_payloads(args.payloads).items():
+        decoder = models.DECODERS[kind]
+        dict_mbps = throughput(json.loads, payload, args.repeat)
+        typed_mbps = throughput(decoder.decode, payload, args.repeat)
+        results.append({
+            "payload": kind,
+            "source": "recorded" if args.payloads else "synthetic",
+            "bytes": len(payload),
+            "dict_MB_s": round(dict_mbps, 1),
+            "typed_MB_s": round(typed_mbps, 1),
+            "speedup": round(typed_mbps / dict_mbps, 2)
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
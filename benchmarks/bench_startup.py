@@ -0,0 +1,58 @@
+# startup benchmark
+#
+# Measures the cold `import statify` / `import api_client` time in a fresh
+# interpreter and checks that requests is not pulled in at import time.
+#
+#   python benchmarks/bench_startup.py [--runs 20]
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, int("requests" in sys.modules))
+"""
+
+
+def time_import(module, runs):
+    timings = []
+    loaded_requests = False
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.split()
+        timings.append(float(out[0]) * 1000)
+        loaded_requests = loaded_requests or out[1] == "1"
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "imports_requests": loaded_requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time for statify modules")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    results = [time_import(module, args.runs) for module in ("statify", "api_client")]
+    print(json.dumps(results, indent=2))
+    if any(r["imports_requests"] for r in results):
+        sys.exit("requests was imported at module load")
+
+
+if __name__ == "__main__":
+    main()
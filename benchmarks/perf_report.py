@@ -0,0 +1,72 @@
+# performance report
+#
+# Runs the request-count / wall-time / allocation scenarios from
+# test_performance.py against the in-process fake Spotify and writes the
+# measurements as JSON. With --compare, prints the change against an older
+# report and exits non-zero when HTTP calls or peak allocations went up by
+# more than the threshold.
+#
+#   python benchmarks/perf_report.py [--out perf.json] [--compare old.json] [--repeat 3]
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import test_performance
+
+COMPARED = ("http_calls", "wall_seconds", "peak_bytes")
+# wall time is too noisy between runs to fail on
+GATED = ("http_calls", "peak_bytes")
+
+
+def compare(old, new, threshold):
+    """Per scenario/size change of each measurement. Returns (rows, regressed)."""
+    previous = {(r["scenario"], r["size"]): r for r in old["results"]}
+    rows = []
+    regressed = False
+    for result in new["results"]:
+        before = previous.get((result["scenario"], result["size"]))
+        if before is None:
+            continue
+        row = {"scenario": result["scenario"], "size": result["size"]}
+        for key in COMPARED:
+            if before[key]:
+                change = (result[key] - before[key]) / before[key]
+            else:
+                # anything from nothing is a regression, whatever the threshold
+                change = float("inf") if result[key] > 0 else 0.0
+            row[key] = {"before": before[key], "after": result[key], "change": round(change, 3)}
+            if key in GATED and change > threshold:
+                regressed = True
+        rows.append(row)
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP call, wall time and allocation report")
+    parser.add_argument("--out", help="write the report here (default: stdout)")
+    parser.add_argument("--compare", help="older report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative increase")
+    parser.add_argument("--repeat", type=int, default=3, help="wall time is the best of this many runs")
+    args = parser.parse_args()
+
+    report = test_performance.report(test_performance.measure_all(args.repeat))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows, regressed = compare(json.load(f), report, args.threshold)
+        print(json.dumps(rows, indent=2), file=sys.stderr)
+        if regressed:
+            sys.exit(f"HTTP calls or peak allocations grew by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#-----------------------------------------------------------------#
+# Local SQLite catalog of everything SpotifyAPI fetches.
+#
+# Pass a Catalog to SpotifyAPI(catalog=...) and artists, albums, tracks and
+# track credits are written here as a side effect of the API calls. Once an
+# artist's discography has been ingested, PMM, MIMIM and BFF can be computed
+# as SQL aggregates without touching the network.
+#
+# album_artists holds every artist an album was seen credited to, from any
+# response (searches, album lookups, embedded albums). The discography
+# table only holds the albums an artist's own albums listing returned, which
+# is what the meters score, so PMM and BFF are computed over it.
+import sqlite3
+import datetime
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    popularity INTEGER,
+    followers INTEGER,
+    discography_fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS albums (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    album_type TEXT,
+    release_date TEXT,
+    total_tracks INTEGER
+);
+CREATE TABLE IF NOT EXISTS album_artists (
+    album_id TEXT NOT NULL,
+    artist_id TEXT NOT NULL,
+    PRIMARY KEY (album_id, artist_id)
+);
+CREATE TABLE IF NOT EXISTS discography (
+    artist_id TEXT NOT NULL,
+    album_id TEXT NOT NULL,
+    album_group TEXT,
+    PRIMARY KEY (artist_id, album_id)
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    album_id TEXT,
+    explicit INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS track_artists (
+    track_id TEXT NOT NULL,
+    artist_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (track_id, artist_id)
+);
+CREATE INDEX IF NOT EXISTS idx_album_artists_artist ON album_artists (artist_id);
+CREATE INDEX IF NOT EXISTS idx_tracks_album ON tracks (album_id);
+CREATE INDEX IF NOT EXISTS idx_tracks_explicit ON tracks (explicit);
+CREATE INDEX IF NOT EXISTS idx_track_artists_artist ON track_artists (artist_id);
+"""
+
+# Artists we only saw as simplified objects keep whatever popularity and
+# follower counts a full artist object gave us earlier
+UPSERT_ARTIST = """
+INSERT INTO artists (id, name, popularity, followers) VALUES (?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = COALESCE(excluded.name, name),
+    popularity = COALESCE(excluded.popularity, popularity),
+    followers = COALESCE(excluded.followers, followers)
+"""
+
+UPSERT_ALBUM = """
+INSERT INTO albums (id, name, album_type, release_date, total_tracks) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = COALESCE(excluded.name, name),
+    album_type = COALESCE(excluded.album_type, album_type),
+    release_date = COALESCE(excluded.release_date, release_date),
+    total_tracks = COALESCE(excluded.total_tracks, total_tracks)
+"""
+
+UPSERT_TRACK = """
+INSERT INTO tracks (id, name, album_id, explicit) VALUES (?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = excluded.name,
+    album_id = COALESCE(excluded.album_id, album_id),
+    explicit = excluded.explicit
+"""
+
+PMM_QUERY = """
+SELECT COUNT(*), COALESCE(SUM(t.explicit), 0)
+FROM discography d
+JOIN tracks t ON t.album_id = d.album_id
+WHERE d.artist_id = ?
+"""
+
+# Same weighting as statify.mom_i_made_it_meter: 60% popularity, 40% followers
+# normalised so that 10M followers = 100
+MIMIM_QUERY = """
+SELECT popularity, followers,
+       COALESCE(popularity, 0) * 0.6
+       + MIN(COALESCE(followers, 0) / 10000000.0 * 100, 100) * 0.4
+FROM artists
+WHERE id = ? AND popularity IS NOT NULL
+"""
+
+BFF_QUERY = """
+SELECT ta.artist_id, a.name, COUNT(*) AS collaborations
+FROM discography d
+JOIN tracks t ON t.album_id = d.album_id
+JOIN track_artists ta ON ta.track_id = t.id
+LEFT JOIN artists a ON a.id = ta.artist_id
+WHERE d.artist_id = :artist_id
+  AND ta.artist_id != :artist_id
+  AND EXISTS (SELECT 1 FROM track_artists other
+              WHERE other.track_id = t.id AND other.artist_id != ta.artist_id)
+GROUP BY ta.artist_id
+ORDER BY collaborations DESC, MIN(t.rowid)
+LIMIT 1
+"""
+
+
+class Catalog(object):
+    """
+    Normalised artists / albums / tracks / track_artists store backed by
+    SQLite. Safe to share between threads; writes are batched into one
+    transaction per API response.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        upgrading = self._has_table("artists") and not self._has_table("discography")
+        self.conn.executescript(SCHEMA)
+        if upgrading:
+            # discographies ingested before the discography table existed
+            # have no listing links; fetch them again instead of scoring 0
+            with self.conn:
+                self.conn.execute("UPDATE artists SET discography_fetched_at = NULL")
+
+    def _has_table(self, name):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    def close(self):
+        self.conn.close()
+
+    # INGEST
+
+    @staticmethod
+    def _artist_row(artist):
+        followers = artist.get("followers")
+        return (
+            artist.get("id"),
+            artist.get("name"),
+            artist.get("popularity"),
+            followers.get("total") if followers else None
+        )
+
+    @staticmethod
+    def _album_row(album):
+        return (
+            album.get("id"),
+            album.get("name"),
+            album.get("album_type"),
+            album.get("release_date"),
+            album.get("total_tracks")
+        )
+
+    def _write(self, artists=(), albums=(), album_artists=(), discography=(), tracks=(), track_artists=()):
+        with self.lock, self.conn:
+            if artists:
+                self.conn.executemany(UPSERT_ARTIST, artists)
+            if albums:
+                self.conn.executemany(UPSERT_ALBUM, albums)
+            if album_artists:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO album_artists (album_id, artist_id) VALUES (?, ?)",
+                    album_artists)
+            if discography:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO discography (artist_id, album_id, album_group) VALUES (?, ?, ?)",
+                    discography)
+            if tracks:
+                self.conn.executemany(UPSERT_TRACK, tracks)
+            if track_artists:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO track_artists (track_id, artist_id, position) VALUES (?, ?, ?)",
+                    track_artists)
+
+    def add_artists(self, artists):
+        """Store full or simplified artist objects."""
+        rows = [self._artist_row(a) for a in artists if a and a.get("id")]
+        self._write(artists=rows)
+
+    def add_albums(self, albums, artist_id=None):
+        """
+        Store album objects. artist_id is the artist whose albums listing
+        returned them: each album is added to that artist's discography
+        (with its album_group), which is what PMM and BFF are scored over
+        """
+        album_rows, artist_rows, links, listed = [], [], [], []
+        for album in albums:
+            if not album or not album.get("id"):
+                continue
+            album_rows.append(self._album_row(album))
+            for artist in album.get("artists") or []:
+                if artist.get("id"):
+                    artist_rows.append(self._artist_row(artist))
+                    links.append((album.get("id"), artist.get("id")))
+            if artist_id:
+                links.append((album.get("id"), artist_id))
+                listed.append((artist_id, album.get("id"), album.get("album_group")))
+        self._write(artists=artist_rows, albums=album_rows, album_artists=links, discography=listed)
+
+    def add_tracks(self, tracks, album_id=None):
+        """
+        Store simplified or full track objects. Album tracks listings don't
+        embed the album, so its id is passed in
+        """
+        track_rows, artist_rows, credits, album_rows = [], [], [], []
+        for track in tracks:
+            if not track or not track.get("id"):
+                continue
+            album = track.get("album")
+            track_album_id = album_id
+            if album and album.get("id"):
+                track_album_id = album.get("id")
+                album_rows.append(self._album_row(album))
+            track_rows.append((
+                track.get("id"),
+                track.get("name"),
+                track_album_id,
+                int(bool(track.get("explicit", False)))
+            ))
+            for position, artist in enumerate(track.get("artists") or []):
+                if artist.get("id"):
+                    artist_rows.append(self._artist_row(artist))
+                    credits.append((track.get("id"), artist.get("id"), position))
+        self._write(artists=artist_rows, albums=album_rows, tracks=track_rows, track_artists=credits)
+
+    def mark_discography_fetched(self, artist_id, fetched_at=None):
+        """Record that every album and track of artist_id is in the catalog."""
+        fetched_at = fetched_at or datetime.datetime.now()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO artists (id) VALUES (?)", (artist_id,))
+            self.conn.execute(
+                "UPDATE artists SET discography_fetched_at = ? WHERE id = ?",
+                (fetched_at.isoformat(), artist_id))
+
+    # QUERIES
+
+    def _query(self, sql, params):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def has_discography(self, artist_id):
+        row = self._query("SELECT discography_fetched_at FROM artists WHERE id = ?", (artist_id,))
+        return bool(row and row[0])
+
+    def calculate_pmm(self, artist_id):
+        """
+        Returns the PMM score from the catalog, or None if the artist's
+        discography has not been ingested
+        """
+        if not self.has_discography(artist_id):
+            return None
+        total_count, explicit_count = self._query(PMM_QUERY, (artist_id,))
+        return (explicit_count / total_count) * 100 if total_count > 0 else 0.0
+
+    def calculate_mimim(self, artist_id):
+        """
+        Returns the MIMIM result dict from the catalog, or None if no full
+        artist object has been stored
+        """
+        row = self._query(MIMIM_QUERY, (artist_id,))
+        if row is None:
+            return None
+        popularity, followers, score = row
+        return {
+            "mimim_score": round(score, 2),
+            "popularity": popularity,
+            "followers": followers or 0
+        }
+
+    def find_bff(self, artist_id):
+        """
+        Returns the most frequent collaborator from the catalog. None means
+        no collaborations, or that the discography has not been ingested
+        """
+        if not self.has_discography(artist_id):
+            return None
+        row = self._query(BFF_QUERY, {"artist_id": artist_id})
+        if row is None:
+            return None
+        bff_id, name, count = row
+        return {
+            "id": bff_id,
+            "name": name,
+            "collaboration_count": count
+        }
@@ -0,0 +1,334 @@
+#-----------------------------------------------------------------#
+# Collaboration-network crawler.
+#
+# Starting from seed artists, expands breadth-first through collaborators
+# (every other artist credited on a multi-artist track, as counted by
+# statify.count_collaborators for the BFF) with a bounded pool of worker
+# threads. Visited artists are kept in a compact fingerprint set, the
+# frontier is checkpointed to disk so a crawl can be resumed, and new
+# expansions wait while the client is over the global request rate.
+# Each crawled artist's PMM and BFF are handed to on_result and/or
+# appended to a JSON lines file.
+import os
+import json
+import time
+import array
+import base64
+import hashlib
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import lanes
+import statify
+
+
+def fingerprint(artist_id):
+    """Non-zero 64-bit hash of an artist id."""
+    digest = hashlib.blake2b(artist_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class FingerprintSet(object):
+    """
+    Open-addressed set of 64-bit fingerprints in one array: 8 bytes per slot
+    at most half full, instead of a Python string per visited artist. Two
+    ids colliding on all 64 bits is treated as the same artist
+    """
+
+    def __init__(self, capacity=1024, slots=None, size=0):
+        if slots is None:
+            # probing masks with len - 1, so the table size is a power of two
+            slots = array.array("Q", bytes(8 * (1 << (max(16, capacity) - 1).bit_length())))
+        self.slots = slots
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def _insert(self, slots, value):
+        mask = len(slots) - 1
+        index = value & mask
+        while True:
+            current = slots[index]
+            if current == 0:
+                slots[index] = value
+                return True
+            if current == value:
+                return False
+            index = (index + 1) & mask
+
+    def _grow(self):
+        slots = array.array("Q", bytes(8 * len(self.slots) * 2))
+        for value in self.slots:
+            if value:
+                self._insert(slots, value)
+        self.slots = slots
+
+    def add(self, artist_id):
+        """Adds artist_id; returns True if it was not already present."""
+        if (self.size + 1) * 2 > len(self.slots):
+            self._grow()
+        added = self._insert(self.slots, fingerprint(artist_id))
+        if added:
+            self.size += 1
+        return added
+
+    def __contains__(self, artist_id):
+        value = fingerprint(artist_id)
+        mask = len(self.slots) - 1
+        index = value & mask
+        while self.slots[index]:
+            if self.slots[index] == value:
+                return True
+            index = (index + 1) & mask
+        return False
+
+    def to_bytes(self):
+        return self.slots.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw, size):
+        slots = array.array("Q")
+        slots.frombytes(raw)
+        return cls(slots=slots, size=size)
+
+
+class CollaborationCrawler(object):
+    """
+    Breadth-first crawl of the collaboration graph. max_artists and
+    max_depth bound the crawl; requests_per_second bounds the request rate
+    across all workers (measured on api_client.request_count). An artist
+    whose expansion fails goes to the back of the frontier, up to
+    max_attempts tries; after that it is kept in failed_artists (and the
+    checkpoint) for resume(retry_failed=True).
+    """
+
+    def __init__(self, api_client, seeds=(), max_artists=None, max_depth=None, max_workers=8,
+                 requests_per_second=None, checkpoint_path=None, checkpoint_every=100,
+                 results_path=None, on_result=None, max_attempts=3, clock=time.monotonic, sleep=time.sleep):
+        self.api_client = api_client
+        self.max_artists = max_artists
+        self.max_depth = max_depth
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.results_path = results_path
+        self.on_result = on_result
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.sleep = sleep
+
+        self.frontier = collections.deque()
+        self.seen = FingerprintSet()
+        self.crawled = 0
+        self.failed = 0
+        self.attempts = {}          # artist_id -> failed expansions so far
+        self.failed_artists = {}    # artist_id -> depth, for artists given up on
+        self.results_offset = 0     # size of results_path as of the last checkpoint
+        self.requests_at_start = None
+        self.started = None
+        for seed in seeds:
+            self.enqueue(seed, 0)
+
+    def enqueue(self, artist_id, depth):
+        if artist_id and self.seen.add(artist_id):
+            self.frontier.append((artist_id, depth))
+
+    # CHECKPOINTS
+
+    def checkpoint(self, in_flight=(), results_file=None):
+        """
+        Writes the frontier (including in-flight artists), failures and seen
+        set to disk. results_file is flushed first, so every record it holds
+        is covered by the checkpoint
+        """
+        if results_file is not None:
+            results_file.flush()
+            self.results_offset = results_file.tell()
+        if not self.checkpoint_path:
+            return
+        state = {
+            "version": 2,
+            "crawled": self.crawled,
+            "failed": self.failed,
+            "frontier": list(in_flight) + list(self.frontier),
+            "attempts": self.attempts,
+            "failed_artists": self.failed_artists,
+            "results_offset": self.results_offset,
+            "seen_size": len(self.seen),
+            "seen": base64.b64encode(self.seen.to_bytes()).decode()
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    @classmethod
+    def resume(cls, api_client, checkpoint_path, retry_failed=False, **kwargs):
+        """
+        Restores a crawler from its checkpoint file. Records appended to
+        results_path after the checkpoint are taken as crawled rather than
+        fetched (and written) again. retry_failed puts artists given up on
+        back in the frontier
+        """
+        crawler = cls(api_client, checkpoint_path=checkpoint_path, **kwargs)
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        crawler.crawled = state["crawled"]
+        crawler.failed = state["failed"]
+        crawler.frontier = collections.deque(tuple(item) for item in state["frontier"])
+        crawler.attempts = state.get("attempts", {})
+        crawler.failed_artists = state.get("failed_artists", {})
+        crawler.results_offset = state.get("results_offset", 0)
+        crawler.seen = FingerprintSet.from_bytes(base64.b64decode(state["seen"]), state["seen_size"])
+        if retry_failed:
+            for artist_id, depth in crawler.failed_artists.items():
+                crawler.attempts.pop(artist_id, None)
+                crawler.frontier.append((artist_id, depth))
+            crawler.failed -= len(crawler.failed_artists)
+            crawler.failed_artists = {}
+        crawler._recover_results()
+        return crawler
+
+    def _recover_results(self):
+        """
+        Applies the records written after the last checkpoint: their artists
+        leave the frontier and their collaborators join it. A torn last line
+        is cut off
+        """
+        if not self.results_path or not os.path.exists(self.results_path):
+            return
+        pending = {artist_id for artist_id, _ in self.frontier}
+        recovered = set()
+        with open(self.results_path, "r+b") as f:
+            f.seek(self.results_offset)
+            good_end = self.results_offset
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                good_end += len(line)
+                artist_id = record["artist_id"]
+                if artist_id not in pending:
+                    continue
+                pending.discard(artist_id)
+                recovered.add(artist_id)
+                self.attempts.pop(artist_id, None)
+                self.crawled += 1
+                self._expand_frontier(record)
+            f.truncate(good_end)
+        self.frontier = collections.deque(item for item in self.frontier if item[0] not in recovered)
+        self.results_offset = good_end
+
+    # CRAWL
+
+    def _request_count(self):
+        return getattr(self.api_client, "request_count", self.crawled)
+
+    def _wait_for_budget(self):
+        if not self.requests_per_second:
+            return
+        while True:
+            elapsed = self.clock() - self.started
+            used = self._request_count() - self.requests_at_start
+            # allow a one second burst on top of the steady rate
+            excess = used - self.requests_per_second * (elapsed + 1)
+            if excess <= 0:
+                return
+            self.sleep(excess / self.requests_per_second)
+
+    def expand(self, artist_id, depth):
+        """Fetches one artist's tracks, in the bulk lane, and returns its crawl record."""
+        with lanes.scope(lanes.BULK):
+            tracks = self.api_client.get_all_tracks_by_artist(artist_id)
+        collaborators = statify.count_collaborators(artist_id, tracks)
+        return {
+            "artist_id": artist_id,
+            "depth": depth,
+            "tracks": len(tracks),
+            "pmm": statify.explicit_percentage(tracks),
+            "bff": statify.pick_bff(collaborators),
+            "collaborators": {cid: c["count"] for cid, c in collaborators.items() if cid}
+        }
+
+    def _expand_frontier(self, record):
+        depth = record["depth"]
+        if self.max_depth is None or depth < self.max_depth:
+            for collaborator_id in record["collaborators"]:
+                self.enqueue(collaborator_id, depth + 1)
+
+    def _failed(self, artist_id, depth):
+        """Retries a failed artist later, or gives up on it after max_attempts."""
+        attempts = self.attempts[artist_id] = self.attempts.get(artist_id, 0) + 1
+        if attempts < self.max_attempts:
+            self.frontier.append((artist_id, depth))
+        else:
+            del self.attempts[artist_id]
+            self.failed_artists[artist_id] = depth
+            self.failed += 1
+
+    def _deliver(self, record, results_file):
+        if results_file is not None:
+            results_file.write(json.dumps(record) + "\n")
+        if self.on_result is not None:
+            self.on_result(record)
+
+    def _done(self):
+        return self.max_artists is not None and self.crawled >= self.max_artists
+
+    def run(self):
+        """Crawls until the frontier is empty or max_artists is reached. Returns crawl stats."""
+        self.started = self.clock()
+        self.requests_at_start = self._request_count()
+        results_file = open(self.results_path, "a") if self.results_path else None
+        in_flight = {}
+        since_checkpoint = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="statify-crawl") as pool:
+                while True:
+                    while (self.frontier and len(in_flight) < self.max_workers
+                           and not (self.max_artists is not None
+                                    and self.crawled + len(in_flight) >= self.max_artists)):
+                        self._wait_for_budget()
+                        artist_id, depth = self.frontier.popleft()
+                        in_flight[pool.submit(self.expand, artist_id, depth)] = (artist_id, depth)
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        artist_id, depth = in_flight.pop(future)
+                        try:
+                            record = future.result()
+                        except Exception:
+                            self._failed(artist_id, depth)
+                            continue
+                        self.attempts.pop(artist_id, None)
+                        self.crawled += 1
+                        since_checkpoint += 1
+                        self._expand_frontier(record)
+                        self._deliver(record, results_file)
+
+                    if since_checkpoint >= self.checkpoint_every:
+                        self.checkpoint(in_flight.values(), results_file)
+                        since_checkpoint = 0
+                    if self._done() and not in_flight:
+                        break
+        finally:
+            self.checkpoint(in_flight.values(), results_file)
+            if results_file is not None:
+                results_file.close()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "crawled": self.crawled,
+            "failed": self.failed,
+            "retrying": len(self.attempts),
+            "frontier": len(self.frontier),
+            "seen": len(self.seen),
+            "seen_bytes": len(self.seen.slots) * self.seen.slots.itemsize
+        }
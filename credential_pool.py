@@ -0,0 +1,187 @@
+#-----------------------------------------------------------------#
+# Credential pool: spread requests over several client id/secret pairs.
+#
+# PooledSpotifyAPI is a SpotifyAPI, so it can be passed anywhere the meters
+# take an api_client. Each request is sent with the token of the least
+# throttled credential; a credential that gets a 429 is taken out of
+# rotation for its Retry-After period and the request is retried on another.
+import os
+import time
+import threading
+import collections
+import deadlines
+from api_client import SpotifyAPI
+
+CREDENTIALS_ENV = "SPOTIFY_CREDENTIALS"
+
+
+def load_pool_credentials():
+    """
+    Reads "id1:secret1,id2:secret2" from SPOTIFY_CREDENTIALS. Returns a list
+    of (client_id, client_secret) pairs, empty if unset
+    """
+    raw = os.environ.get(CREDENTIALS_ENV, "")
+    pairs = []
+    for item in raw.split(","):
+        if ":" in item:
+            client_id, client_secret = item.strip().split(":", 1)
+            pairs.append((client_id, client_secret))
+    return pairs
+
+
+class CredentialClient(SpotifyAPI):
+    """
+    Token holder for one pooled credential. Its token requests go through
+    the pool's send_request, so they use the pool's transport and lane
+    scheduler and count towards its request_count
+    """
+
+    def __init__(self, client_id, client_secret, pool):
+        super().__init__(client_id, client_secret, timeout=pool.timeout)
+        self.pool = pool
+
+    def send_request(self, method, url, **kwargs):
+        return self.pool.send_request(method, url, **kwargs)
+
+
+class Credential(object):
+    """One client id/secret pair with its own token and rate-limit state."""
+
+    def __init__(self, client_id, client_secret, pool, window=30.0):
+        self.client = CredentialClient(client_id, client_secret, pool)
+        self.window = window
+        self.cooling_until = 0.0
+        self.in_flight = 0
+        self.recent = collections.deque()
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def client_id(self):
+        return self.client.client_id
+
+    def load(self, now):
+        """Requests in flight plus requests sent in the last window seconds."""
+        while self.recent and self.recent[0] <= now - self.window:
+            self.recent.popleft()
+        return self.in_flight + len(self.recent)
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.client.get_access_token()}"}
+
+
+class NoCredentialAvailable(Exception):
+    """Every credential in the pool is cooling down after 429s."""
+
+    def __init__(self, retry_in):
+        super().__init__(f"All credentials are rate limited, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class PooledSpotifyAPI(SpotifyAPI):
+    """
+    SpotifyAPI over a pool of credentials: PooledSpotifyAPI([(id, secret), ...]).
+    Without credentials the pool is read from SPOTIFY_CREDENTIALS.
+    max_wait bounds how long a request waits for a credential to cool down.
+    A throttled credential cools down for at least min_cooldown seconds,
+    whatever its Retry-After says, and a request gives up with
+    NoCredentialAvailable after max_retries 429s (default: two per
+    credential).
+    """
+
+    def __init__(self, credentials=None, *args, cooldown=30.0, min_cooldown=1.0, max_wait=60.0, max_retries=None,
+                 clock=time.monotonic, sleep=time.sleep, **kwargs):
+        super().__init__(*args, **kwargs)
+        credentials = credentials or load_pool_credentials()
+        if not credentials:
+            raise Exception("PooledSpotifyAPI needs at least one (client_id, client_secret) pair")
+        self.pool = [Credential(client_id, client_secret, self) for client_id, client_secret in credentials]
+        self.cooldown = cooldown
+        self.min_cooldown = min_cooldown
+        self.max_wait = max_wait
+        self.max_retries = max_retries if max_retries is not None else 2 * len(self.pool)
+        self.clock = clock
+        self.sleep = sleep
+        self.pool_lock = threading.Lock()
+
+    def get_resource_header(self):
+        # The credential, and so the token, is only picked when the request
+        # is sent; see http_get
+        return {}
+
+    def acquire(self):
+        """
+        Reserves the least throttled credential that is not cooling down.
+        Raises NoCredentialAvailable with the shortest remaining cooldown
+        """
+        with self.pool_lock:
+            now = self.clock()
+            available = [c for c in self.pool if c.cooling_until <= now]
+            if not available:
+                raise NoCredentialAvailable(min(c.cooling_until for c in self.pool) - now)
+            credential = min(available, key=lambda c: c.load(now))
+            credential.in_flight += 1
+            credential.requests += 1
+            credential.recent.append(now)
+            return credential
+
+    def release(self, credential, retry_after=None):
+        with self.pool_lock:
+            credential.in_flight -= 1
+            if retry_after is not None:
+                credential.throttled += 1
+                cooldown = max(retry_after, self.min_cooldown)
+                credential.cooling_until = max(credential.cooling_until, self.clock() + cooldown)
+
+    def _retry_after(self, r):
+        try:
+            return float(r.headers.get("Retry-After"))
+        except (AttributeError, TypeError, ValueError):
+            return self.cooldown
+
+    def http_get(self, endpoint, endpoint_key, headers, params=None):
+        """
+        Sends the GET with a pooled credential, moving on to the next one
+        when a credential is throttled
+        """
+        waited = 0.0
+        throttled = 0
+        while True:
+            try:
+                credential = self.acquire()
+            except NoCredentialAvailable as e:
+                deadline = deadlines.current()
+                if waited + e.retry_in > self.max_wait or (deadline and deadline.remaining() < e.retry_in):
+                    raise
+                self.sleep(e.retry_in)
+                waited += e.retry_in
+                continue
+            retry_after = None
+            try:
+                request_headers = dict(headers)
+                request_headers.update(credential.headers())
+                r = super().http_get(endpoint, endpoint_key, request_headers, params)
+                if r.status_code == 429:
+                    retry_after = self._retry_after(r)
+            finally:
+                self.release(credential, retry_after)
+            if retry_after is None:
+                return r
+            throttled += 1
+            if throttled >= self.max_retries:
+                with self.pool_lock:
+                    retry_in = min(c.cooling_until for c in self.pool) - self.clock()
+                raise NoCredentialAvailable(max(0.0, retry_in))
+
+    def pool_metrics(self):
+        """Per-credential request, throttling and cooldown counts."""
+        with self.pool_lock:
+            now = self.clock()
+            return [{
+                "client_id": credential.client_id[:6] + "...",
+                "requests": credential.requests,
+                "throttled": credential.throttled,
+                "in_flight": credential.in_flight,
+                "recent_requests": credential.load(now) - credential.in_flight,
+                "cooling_for": round(max(0.0, credential.cooling_until - now), 1)
+            } for credential in self.pool]
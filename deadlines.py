@@ -0,0 +1,82 @@
+#-----------------------------------------------------------------#
+# End-to-end deadlines for SpotifyAPI calls and the statify meters.
+#
+# A deadline is set for a block of work with scope(); every HTTP call made
+# inside it uses the remaining time as its timeout, and once it has run out
+# DeadlineExceeded is raised with whatever partial progress was made.
+# Nested scopes can only shorten the deadline, never extend it.
+import time
+import threading
+import contextlib
+
+_local = threading.local()
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a deadline runs out. partial holds the progress made before
+    that point (e.g. the tracks fetched so far), or None
+    """
+
+    def __init__(self, message="Deadline exceeded", partial=None):
+        super().__init__(message)
+        self.partial = partial
+
+
+class Deadline(object):
+    """An absolute point in time, on the monotonic clock, that work must finish by."""
+
+    def __init__(self, seconds=None, expires_at=None, clock=time.monotonic):
+        if expires_at is None:
+            if seconds is None:
+                raise Exception("Deadline needs seconds or expires_at")
+            expires_at = clock() + seconds
+        self.expires_at = expires_at
+        self.clock = clock
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.clock() >= self.expires_at
+
+    def check(self, partial=None):
+        if self.expired():
+            raise DeadlineExceeded(partial=partial)
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.3f}s)"
+
+
+def coerce(deadline):
+    """Accepts None, a Deadline, or a number of seconds from now."""
+    if deadline is None or isinstance(deadline, Deadline):
+        return deadline
+    return Deadline(seconds=deadline)
+
+
+def current():
+    """The deadline in effect on this thread, or None."""
+    return getattr(_local, "deadline", None)
+
+
+def resolve(deadline=None):
+    """The earlier of deadline and the one in effect on this thread."""
+    deadline = coerce(deadline)
+    outer = current()
+    if deadline is None:
+        return outer
+    if outer is None or deadline.expires_at < outer.expires_at:
+        return deadline
+    return outer
+
+
+@contextlib.contextmanager
+def scope(deadline):
+    """Applies deadline (if any) to all calls made on this thread within the block."""
+    outer = current()
+    _local.deadline = resolve(deadline)
+    try:
+        yield _local.deadline
+    finally:
+        _local.deadline = outer
@@ -0,0 +1,118 @@
+#-----------------------------------------------------------------#
+# Identity map of Spotify entities harvested from API responses.
+#
+# Search results, several-albums / several-tracks responses and listings
+# embed artist, album and track objects. EntityMap keeps the ones that are
+# complete (as returned by the single-entity endpoint) keyed by type and id,
+# so SpotifyAPI.get_artist / get_album / get_track can answer from it
+# instead of making another round trip.
+import time
+import threading
+import collections
+
+# resource_type used by SpotifyAPI.get_resource, per Spotify object type
+RESOURCE_TYPES = {"artist": "artists", "album": "albums", "track": "tracks"}
+
+# Fields only present on the full object of each resource type. Simplified
+# objects (e.g. the artists embedded in a track) don't have them
+COMPLETE_FIELDS = {
+    "artists": ("popularity", "followers"),
+    "albums": ("tracks", "label"),
+    "tracks": ("album", "popularity"),
+}
+
+# Typed structs (models.py) are already schema-limited; a struct of the same
+# class the single-entity endpoint decodes into is complete when the
+# complete-only fields it declares are set
+COMPLETE_STRUCTS = {
+    "Artist": "artists",
+    "Album": "albums",
+    "Track": "tracks",
+}
+
+
+def complete_type(entity):
+    """The resource type entity is a complete object of, or None."""
+    if isinstance(entity, dict):
+        resource_type = RESOURCE_TYPES.get(entity.get("type"))
+        if resource_type and entity.get("id") and all(f in entity for f in COMPLETE_FIELDS[resource_type]):
+            return resource_type
+        return None
+    resource_type = COMPLETE_STRUCTS.get(type(entity).__name__)
+    if (resource_type and getattr(entity, "id", None)
+            and all(getattr(entity, f, True) is not None for f in COMPLETE_FIELDS[resource_type])):
+        return resource_type
+    return None
+
+
+def _children(value):
+    if isinstance(value, dict):
+        return value.values()
+    if isinstance(value, (list, tuple)):
+        return value
+    fields = getattr(value, "__struct_fields__", None)
+    if fields:
+        return [getattr(value, name) for name in fields]
+    return ()
+
+
+class EntityMap(object):
+    """
+    Thread-safe (resource_type, id) -> entity map. Entries expire after ttl
+    seconds (None keeps them); the least recently used are evicted beyond
+    max_entries.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()   # (type, id) -> (expires_at, entity)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put(self, resource_type, entity):
+        key = (resource_type, entity.get("id"))
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            self.entries[key] = (expires_at, entity)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get(self, resource_type, _id):
+        """The stored complete entity, or None."""
+        key = (resource_type, _id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def harvest(self, data):
+        """Stores every complete entity nested anywhere in data. Returns how many."""
+        stored = 0
+        stack = [data]
+        while stack:
+            value = stack.pop()
+            resource_type = complete_type(value)
+            if resource_type:
+                self.put(resource_type, value)
+                stored += 1
+            stack.extend(child for child in _children(value)
+                         if isinstance(child, (dict, list, tuple)) or hasattr(child, "__struct_fields__"))
+        return stored
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
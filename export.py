@@ -0,0 +1,234 @@
+#-----------------------------------------------------------------#
+# Columnar export of fetched discographies for offline analytics.
+#
+# DiscographyExporter writes three tables into a directory:
+#   tracks        one row per track, tagged with the artist and album
+#   albums        one row per album in the artist's discography
+#   artist_stats  one row per artist: explicit ratio (PMM), collaboration
+#                 counts and top collaborator (BFF)
+#
+# With pyarrow installed the tables are Parquet (default) or Arrow IPC
+# streams, with artist, album and album type columns dictionary-encoded.
+# Without it they are plain CSV. Every artist is written as its own row
+# group as soon as its discography arrives, so nothing is buffered beyond
+# one artist.
+import os
+import csv
+import lanes
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = ("parquet", "ipc", "csv")
+EXTENSIONS = {"parquet": ".parquet", "ipc": ".arrows", "csv": ".csv"}
+
+# (column, arrow type name); "dict" columns are dictionary-encoded strings
+COLUMNS = {
+    "tracks": [
+        ("artist_id", "dict"),
+        ("album_id", "dict"),
+        ("track_id", "string"),
+        ("name", "string"),
+        ("explicit", "bool"),
+        ("artist_count", "int16"),
+    ],
+    "albums": [
+        ("artist_id", "dict"),
+        ("album_id", "string"),
+        ("name", "string"),
+        ("album_type", "dict"),
+        ("release_date", "string"),
+        ("total_tracks", "int32"),
+    ],
+    "artist_stats": [
+        ("artist_id", "dict"),
+        ("track_count", "int32"),
+        ("explicit_count", "int32"),
+        ("explicit_ratio", "float64"),
+        ("collaboration_tracks", "int32"),
+        ("distinct_collaborators", "int32"),
+        ("bff_id", "string"),
+        ("bff_count", "int32"),
+    ],
+}
+
+
+def default_format():
+    return "parquet" if pyarrow is not None else "csv"
+
+
+def _arrow_schema(table):
+    types = {
+        "dict": pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        "string": pyarrow.string(),
+        "bool": pyarrow.bool_(),
+        "int16": pyarrow.int16(),
+        "int32": pyarrow.int32(),
+        "float64": pyarrow.float64(),
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in COLUMNS[table]])
+
+
+def artist_stats(artist_id, tracks):
+    """
+    Returns the artist_stats row for an artist's tracks. The explicit ratio
+    and top collaborator follow the PMM and BFF definitions in statify.py
+    """
+    explicit_count = 0
+    collaboration_tracks = 0
+    collaborators = {}
+    for track in tracks:
+        if track.get("explicit", False):
+            explicit_count += 1
+        artists = track.get("artists") or []
+        if len(artists) <= 1:
+            continue
+        collaboration_tracks += 1
+        for artist in artists:
+            collaborator_id = artist.get("id")
+            if collaborator_id != artist_id:
+                collaborators[collaborator_id] = collaborators.get(collaborator_id, 0) + 1
+
+    bff_id = max(collaborators, key=collaborators.get) if collaborators else None
+    return {
+        "artist_id": artist_id,
+        "track_count": len(tracks),
+        "explicit_count": explicit_count,
+        "explicit_ratio": (explicit_count / len(tracks)) * 100 if tracks else 0.0,
+        "collaboration_tracks": collaboration_tracks,
+        "distinct_collaborators": len(collaborators),
+        "bff_id": bff_id,
+        "bff_count": collaborators[bff_id] if bff_id else 0,
+    }
+
+
+class _CSVTable(object):
+
+    def __init__(self, path, table):
+        self.columns = [name for name, _ in COLUMNS[table]]
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+
+    def write(self, rows):
+        self.writer.writerows([[row[c] for c in self.columns] for row in rows])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowTable(object):
+
+    def __init__(self, path, table, fmt):
+        self.schema = _arrow_schema(table)
+        if fmt == "parquet":
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.sink = pyarrow.OSFile(path, "wb")
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+        self.fmt = fmt
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in self.schema.names}
+        batch = pyarrow.Table.from_pydict(columns, schema=self.schema)
+        self.writer.write_table(batch)
+
+    def close(self):
+        self.writer.close()
+        if self.fmt == "ipc":
+            self.sink.close()
+
+
+class DiscographyExporter(object):
+    """
+    Streams tracks, albums and artist stats into columnar files under
+    directory. Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, directory, fmt=None):
+        fmt = fmt or default_format()
+        if fmt not in FORMATS:
+            raise Exception(f"Unknown export format {fmt}, expected one of {FORMATS}")
+        if fmt != "csv" and pyarrow is None:
+            raise Exception(f"Exporting {fmt} requires pyarrow")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fmt = fmt
+        self.paths = {}
+        self.tables = {}
+        for table in COLUMNS:
+            path = os.path.join(directory, table + EXTENSIONS[fmt])
+            self.paths[table] = path
+            if fmt == "csv":
+                self.tables[table] = _CSVTable(path, table)
+            else:
+                self.tables[table] = _ArrowTable(path, table, fmt)
+        self.artists_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def write_artist(self, artist_id, discography):
+        """
+        Writes one artist's discography, an iterable of (album, tracks)
+        pairs, as one row group per table. Returns the artist_stats row
+        """
+        album_rows = []
+        track_rows = []
+        all_tracks = []
+        for album, tracks in discography:
+            album_id = album.get("id")
+            album_rows.append({
+                "artist_id": artist_id,
+                "album_id": album_id,
+                "name": album.get("name"),
+                "album_type": album.get("album_type"),
+                "release_date": album.get("release_date"),
+                "total_tracks": album.get("total_tracks"),
+            })
+            for track in tracks:
+                track_rows.append({
+                    "artist_id": artist_id,
+                    "album_id": album_id,
+                    "track_id": track.get("id"),
+                    "name": track.get("name"),
+                    "explicit": bool(track.get("explicit", False)),
+                    "artist_count": len(track.get("artists") or []),
+                })
+            all_tracks.extend(tracks)
+
+        stats = artist_stats(artist_id, all_tracks)
+        if album_rows:
+            self.tables["albums"].write(album_rows)
+        if track_rows:
+            self.tables["tracks"].write(track_rows)
+        self.tables["artist_stats"].write([stats])
+        self.artists_written += 1
+        return stats
+
+
+def export_artists(api_client, artist_ids, directory, fmt=None, include_groups="album,single", market=None):
+    """
+    Fetches each artist's discography through api_client and streams it to
+    directory. Returns the exporter's output paths by table name
+    """
+    # a batch job: bulk lane unless the caller picked one
+    with DiscographyExporter(directory, fmt) as exporter, lanes.scope(lanes.current() or lanes.BULK):
+        for artist_id in artist_ids:
+            discography = api_client.iter_artist_discography(
+                artist_id, include_groups=include_groups, market=market)
+            exporter.write_artist(artist_id, discography)
+        return dict(exporter.paths)
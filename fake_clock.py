@@ -0,0 +1,19 @@
+#-----------------------------------------------------------------#
+# Manually advanced clock, for tests.
+#
+# Anything that takes a clock= callable (deadlines, the scheduler, the
+# credential pool, circuit breakers, snapshot stores) can be given a
+# FakeClock and moved forward by setting now or calling advance(), which
+# also stands in for a sleep= function.
+
+
+class FakeClock(object):
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
@@ -0,0 +1,195 @@
+#-----------------------------------------------------------------#
+# In-process fake of the Spotify Web API, for tests and benchmarks.
+#
+# FakeSpotify stands in for the requests module as a SpotifyAPI transport:
+#
+#   fake = FakeSpotify.synthetic(n_albums=50, tracks_per_album=12)
+#   client = SpotifyAPI("id", "secret", transport=fake)
+#
+# It serves token, artist, album, track, listing, several-* , top-tracks and
+# search endpoints from a generated catalog with the same response shapes
+# (and paging) as the real API, and counts the requests it receives.
+import json
+import time
+import types
+import collections
+from urllib.parse import urlsplit
+
+TOKEN_RESPONSE = {"access_token": "fake-token", "token_type": "Bearer", "expires_in": 3600}
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    @property
+    def content(self):
+        return json.dumps(self.payload).encode()
+
+    @property
+    def text(self):
+        return json.dumps(self.payload)
+
+
+class FakeSpotify(object):
+    """
+    Catalog-backed fake transport. artists, albums and tracks map ids to
+    full objects; artist_albums maps an artist id to its album ids in
+    release order. latency (seconds) is slept before every GET response,
+    or Timeout raised if the request's timeout is shorter.
+    """
+
+    exceptions = types.SimpleNamespace(Timeout=TimeoutError)
+
+    def __init__(self, artists=None, albums=None, tracks=None, artist_albums=None, latency=0.0):
+        self.artists = artists or {}
+        self.albums = albums or {}
+        self.tracks = tracks or {}
+        self.artist_albums = artist_albums or {}
+        self.latency = latency
+        self.calls = collections.Counter()
+
+    @classmethod
+    def synthetic(cls, n_albums=10, tracks_per_album=10, n_collaborators=8, artist_id="artist0", latency=0.0):
+        """
+        One main artist with n_albums albums of tracks_per_album tracks.
+        Every third track is explicit and every other one features one of
+        n_collaborators artists
+        """
+        fake = cls(latency=latency)
+        for i in range(n_collaborators + 1):
+            _id = artist_id if i == 0 else f"collaborator{i}"
+            fake.artists[_id] = {
+                "id": _id, "type": "artist", "name": f"Artist {_id}", "genres": [],
+                "popularity": 90 - i, "followers": {"href": None, "total": 1000000 // (i + 1)},
+                "href": f"https://api.spotify.com/v1/artists/{_id}", "uri": f"spotify:artist:{_id}"
+            }
+        main = cls._simplified(fake.artists[artist_id])
+        album_ids = []
+        for a in range(n_albums):
+            album_id = f"{artist_id}-album{a}"
+            album = {
+                "id": album_id, "type": "album", "name": f"Album {a}",
+                "album_type": "album" if a % 3 else "single", "total_tracks": tracks_per_album,
+                "release_date": f"{2000 + a % 25}-01-01", "release_date_precision": "day",
+                "artists": [main], "label": "Fake Records", "popularity": 50,
+                "uri": f"spotify:album:{album_id}"
+            }
+            track_ids = []
+            for t in range(tracks_per_album):
+                track_id = f"{album_id}-track{t}"
+                n = a * tracks_per_album + t
+                credits = [main]
+                if n % 2 and n_collaborators:
+                    credits = credits + [cls._simplified(fake.artists[f"collaborator{n % n_collaborators + 1}"])]
+                fake.tracks[track_id] = {
+                    "id": track_id, "type": "track", "name": f"Track {n}", "explicit": n % 3 == 0,
+                    "artists": credits, "disc_number": 1, "track_number": t + 1, "duration_ms": 180000 + n,
+                    "popularity": n % 100, "is_local": False, "uri": f"spotify:track:{track_id}",
+                    "album": {key: album[key] for key in ("id", "type", "name", "album_type", "release_date", "artists")}
+                }
+                track_ids.append(track_id)
+            album["track_ids"] = track_ids
+            fake.albums[album_id] = album
+            album_ids.append(album_id)
+        fake.artist_albums[artist_id] = album_ids
+        return fake
+
+    @staticmethod
+    def _simplified(artist):
+        return {key: artist[key] for key in ("id", "type", "name", "href", "uri")}
+
+    # OBJECT SHAPES
+
+    def _album(self, album_id, full=True):
+        album = {key: value for key, value in self.albums[album_id].items() if key != "track_ids"}
+        if full:
+            album["tracks"] = self._page([self._simplified_track(t) for t in self.albums[album_id]["track_ids"]],
+                                         50, 0, f"/v1/albums/{album_id}/tracks")
+        else:
+            del album["label"], album["popularity"]
+        return album
+
+    def _simplified_track(self, track_id):
+        return {key: value for key, value in self.tracks[track_id].items() if key not in ("album", "popularity")}
+
+    @staticmethod
+    def _page(items, limit, offset, path):
+        window = items[offset:offset + limit]
+        more = offset + limit < len(items)
+        return {
+            "href": f"https://api.spotify.com{path}?offset={offset}&limit={limit}",
+            "items": window, "limit": limit, "offset": offset, "total": len(items), "previous": None,
+            "next": f"https://api.spotify.com{path}?offset={offset + limit}&limit={limit}" if more else None
+        }
+
+    # TRANSPORT
+
+    def post(self, url, **kwargs):
+        self.calls["token"] += 1
+        return FakeResponse(200, TOKEN_RESPONSE)
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        params = params or {}
+        path = urlsplit(url).path
+        parts = path.strip("/").split("/")[1:]   # drop the version
+        limit = int(params.get("limit", 20))
+        offset = int(params.get("offset", 0))
+        ids = params["ids"].split(",") if params.get("ids") else []
+
+        route, payload = self._route(parts, path, ids, limit, offset, params)
+        self.calls[route] += 1
+        if self.latency:
+            if timeout is not None and timeout < self.latency:
+                # like requests, give up once the timeout has passed
+                time.sleep(timeout)
+                raise self.exceptions.Timeout(f"GET {path} timed out after {timeout:.3f}s")
+            time.sleep(self.latency)
+        if payload is None:
+            return FakeResponse(404, {"error": {"status": 404, "message": "Not found"}})
+        return FakeResponse(200, payload)
+
+    def _route(self, parts, path, ids, limit, offset, params):
+        if parts == ["search"]:
+            query = params.get("q", "").lower()
+            matches = [a for a in self.artists.values() if query in a["name"].lower()]
+            return "search", {"artists": self._page(matches, limit, offset, path)}
+        if parts == ["artists"]:
+            return "several_artists", {"artists": [self.artists.get(_id) for _id in ids]}
+        if parts == ["albums"]:
+            return "several_albums", {"albums": [self._album(_id) if _id in self.albums else None for _id in ids]}
+        if parts == ["tracks"]:
+            return "several_tracks", {"tracks": [self.tracks.get(_id) for _id in ids]}
+        if len(parts) == 2:
+            resource, _id = parts
+            if resource == "artists":
+                return "artists", self.artists.get(_id)
+            if resource == "albums":
+                return "albums", self._album(_id) if _id in self.albums else None
+            if resource == "tracks":
+                return "tracks", self.tracks.get(_id)
+        if len(parts) == 3:
+            resource, _id, listing = parts
+            if resource == "artists" and listing == "albums":
+                if _id not in self.artists:
+                    return "artist_albums", None
+                albums = [self._album(a, full=False) for a in self.artist_albums.get(_id, [])]
+                return "artist_albums", self._page(albums, limit, offset, path)
+            if resource == "albums" and listing == "tracks":
+                if _id not in self.albums:
+                    return "album_tracks", None
+                tracks = [self._simplified_track(t) for t in self.albums[_id]["track_ids"]]
+                return "album_tracks", self._page(tracks, limit, offset, path)
+            if resource == "artists" and listing == "top-tracks":
+                if _id not in self.artists:
+                    return "artist_top_tracks", None
+                top = sorted((t for t in self.tracks.values() if t["artists"][0]["id"] == _id),
+                             key=lambda t: -t["popularity"])[:10]
+                return "artist_top_tracks", {"tracks": top}
+        return "unknown", None
@@ -2,9 +2,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import api_client
-import secrets
+import deadlines
 import statify
 
+# Seconds a single artist analysis may take before it is abandoned
+ANALYSIS_DEADLINE = 120
+# Seconds an analysed artist's results are reused for
+METER_CACHE_TTL = 300
+
 
 class StatifyGUI:
     def __init__(self, root):
@@ -13,13 +18,13 @@ class StatifyGUI:
         self.root.geometry("600x500")
         self.root.configure(bg="#1DB954")  # Spotify green
         
-        # Initialize API client
-        self.spotify_client = api_client.SpotifyAPI(secrets.client_id, secrets.client_secret)
+        # Initialize API client; the entity map answers MIMIM's get_artist
+        # from the artist the search already returned
+        self.spotify_client = api_client.SpotifyAPI(entity_map=True)
         
-        # Initialize metric calculators
-        self.pmm = statify.potty_mouth_meter(self.spotify_client)
-        self.mimim = statify.mom_i_made_it_meter(self.spotify_client)
-        self.bff = statify.bff_picker(self.spotify_client)
+        # Analysing the same artist again within METER_CACHE_TTL reuses its
+        # discography and MIMIM result instead of fetching them again
+        self.meter_cache = statify.MeterCache(ttl=METER_CACHE_TTL)
         
         self.setup_ui()
     
@@ -112,9 +117,10 @@ class StatifyGUI:
         def run_analysis():
             try:
                 self.show_loading(True)
+                deadline = deadlines.Deadline(ANALYSIS_DEADLINE)
                 
                 # Search for artist
-                search_results = self.spotify_client.search_artists(query=artist_name, limit=1)
+                search_results = self.spotify_client.search_artists(query=artist_name, limit=1, deadline=deadline)
                 artists = search_results.get("artists", {}).get("items", [])
                 
                 if not artists:
@@ -125,14 +131,15 @@ class StatifyGUI:
                 artist_id = artist["id"]
                 found_artist_name = artist["name"]
                 
-                # Calculate metrics
-                pmm_score = self.pmm.calculate_pmm(artist_id)
-                mimim_score = self.mimim.calculate_mimim(artist_id)
-                bff_result = self.bff.find_bff(artist_id)
-                
-                # Update UI on main thread
-                self.root.after(0, lambda: self.display_results(found_artist_name, pmm_score, mimim_score, bff_result))
+                # Show the top-tracks preview at once and refine it as each
+                # album of the discography arrives; updates go to the main thread
+                for profile in statify.iter_profile(self.spotify_client, artist_id, deadline=deadline,
+                                                    cache=self.meter_cache):
+                    self.root.after(0, lambda p=profile: self.display_results(
+                        found_artist_name, p["pmm_score"], p["mimim"], p["bff"], provisional=not p["final"]))
                 
+            except deadlines.DeadlineExceeded:
+                self.root.after(0, lambda: messagebox.showerror("Error", f"Analysis timed out after {ANALYSIS_DEADLINE} seconds"))
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("Error", f"An error occurred: {str(e)}"))
             finally:
@@ -143,7 +150,7 @@ class StatifyGUI:
         thread.daemon = True
         thread.start()
     
-    def display_results(self, artist_name, pmm_score, mimim_score, bff_result):
+    def display_results(self, artist_name, pmm_score, mimim_score, bff_result, provisional=False):
         # Clear previous results
         for widget in self.results_frame.winfo_children():
             widget.destroy()
@@ -156,7 +163,17 @@ class StatifyGUI:
             bg="white",
             fg="#1DB954"
         )
-        artist_label.pack(pady=20)
+        artist_label.pack(pady=(20, 0) if provisional else 20)
+        
+        # Provisional results are still being refined from the discography
+        if provisional:
+            tk.Label(
+                self.results_frame,
+                text="Preview - refining from the full discography...",
+                font=("Arial", 10, "italic"),
+                bg="white",
+                fg="gray"
+            ).pack(pady=(0, 10))
         
         # PMM Score
         pmm_frame = tk.Frame(self.results_frame, bg="white")
@@ -240,8 +257,9 @@ class StatifyGUI:
         # Show results frame
         self.results_frame.pack(pady=20, padx=40, fill="both", expand=True)
         
-        # Clear search field
-        self.artist_entry.delete(0, tk.END)
+        # Clear search field once the final profile is shown
+        if not provisional:
+            self.artist_entry.delete(0, tk.END)
 
 
 def main():
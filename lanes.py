@@ -0,0 +1,172 @@
+#-----------------------------------------------------------------#
+# Priority lanes for SpotifyAPI traffic.
+#
+# Every HTTP call belongs to a lane, "interactive" unless a scope() says
+# otherwise; batch work (calculate_many, the crawler, watchlist and
+# scheduler refreshes) runs in the "bulk" lane. A LaneScheduler attached to
+# the client admits requests under a shared rate limit and/or concurrency
+# limit in weighted fair order: each request gets a virtual finish time of
+# 1 / weight after its lane's previous one, and the earliest is sent first.
+# An interactive request therefore waits for at most a few bulk requests,
+# not for the whole bulk backlog. Queue waits are recorded per lane.
+import time
+import heapq
+import threading
+import contextlib
+import collections
+import deadlines
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+DEFAULT_LANE = INTERACTIVE
+DEFAULT_WEIGHTS = {INTERACTIVE: 8.0, BULK: 1.0}
+
+_local = threading.local()
+
+
+def current():
+    """The lane set on this thread, or None."""
+    return getattr(_local, "lane", None)
+
+
+@contextlib.contextmanager
+def scope(lane):
+    """Sends all calls made on this thread within the block in lane (if not None)."""
+    outer = current()
+    if lane is not None:
+        _local.lane = lane
+    try:
+        yield current()
+    finally:
+        _local.lane = outer
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LaneScheduler(object):
+    """
+    Weighted fair admission of requests across lanes. rate (requests per
+    second, with bursts of up to burst) and max_in_flight are shared by all
+    lanes; with neither set requests are admitted at once and only their
+    lane is recorded. window is how many recent waits per lane the
+    percentiles are computed over.
+    """
+
+    def __init__(self, weights=None, rate=None, burst=None, max_in_flight=None, window=1024,
+                 clock=time.monotonic):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 0.0)
+        self.max_in_flight = max_in_flight
+        self.window = window
+        self.clock = clock
+
+        self.condition = threading.Condition()
+        self.waiting = []               # heap of (finish tag, sequence)
+        self.cancelled = set()
+        self.sequence = 0
+        self.virtual_time = 0.0
+        self.lane_finish = {}
+        self.in_flight = 0
+        self.tokens = self.burst
+        self.tokens_updated = clock()
+        self.waits = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.counts = collections.Counter()
+        self.queued = collections.Counter()
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.tokens_updated) * self.rate)
+        self.tokens_updated = now
+
+    def _token_delay(self, now):
+        """Seconds until a request may be sent under the rate limit (0 if now)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def _drop_cancelled(self):
+        while self.waiting and self.waiting[0] in self.cancelled:
+            self.cancelled.discard(heapq.heappop(self.waiting))
+
+    def acquire(self, lane=None):
+        """
+        Blocks until a request in lane may be sent and returns the time it
+        waited. Raises DeadlineExceeded if the current deadline runs out first.
+        Every acquire must be followed by release()
+        """
+        lane = lane or current() or DEFAULT_LANE
+        deadline = deadlines.current()
+        with self.condition:
+            started = self.clock()
+            self.sequence += 1
+            tag = max(self.virtual_time, self.lane_finish.get(lane, 0.0)) + 1.0 / self.weights.get(lane, 1.0)
+            self.lane_finish[lane] = tag
+            ticket = (tag, self.sequence)
+            heapq.heappush(self.waiting, ticket)
+            self.queued[lane] += 1
+            try:
+                while True:
+                    self._drop_cancelled()
+                    timeout = None
+                    if self.waiting[0] == ticket and (self.max_in_flight is None
+                                                      or self.in_flight < self.max_in_flight):
+                        timeout = self._token_delay(self.clock())
+                        if timeout == 0.0:
+                            break
+                    if deadline is not None:
+                        remaining = deadline.remaining()
+                        if remaining <= 0:
+                            self.cancelled.add(ticket)
+                            raise deadlines.DeadlineExceeded(f"Deadline exceeded queueing in lane {lane}")
+                        timeout = remaining if timeout is None else min(timeout, remaining)
+                    self.condition.wait(timeout)
+                heapq.heappop(self.waiting)
+                if self.rate:
+                    self.tokens -= 1
+                self.virtual_time = tag
+                self.in_flight += 1
+                waited = self.clock() - started
+                self.waits[lane].append(waited)
+                self.counts[lane] += 1
+            finally:
+                self.queued[lane] -= 1
+                # the next ticket may now be at the head of the queue
+                self.condition.notify_all()
+        return waited
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, lane=None):
+        """acquire() / release() around a block."""
+        self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self):
+        """Per-lane request counts, current queue length and queue wait percentiles (seconds)."""
+        with self.condition:
+            lanes = set(self.counts) | set(self.weights)
+            result = {}
+            for lane in sorted(lanes):
+                ordered = sorted(self.waits[lane]) if lane in self.waits else []
+                result[lane] = {
+                    "weight": self.weights.get(lane, 1.0),
+                    "requests": self.counts[lane],
+                    "queued": self.queued[lane],
+                    "wait_p50": _percentile(ordered, 0.50),
+                    "wait_p95": _percentile(ordered, 0.95),
+                    "wait_max": ordered[-1] if ordered else None
+                }
+            return result
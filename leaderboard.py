@@ -0,0 +1,338 @@
+#-----------------------------------------------------------------#
+# Materialised leaderboards for PMM, MIMIM and BFF collaboration counts.
+#
+# Each metric keeps its scores in an indexable skip list ordered highest
+# score first, so re-scoring one artist, top-k and rank-of-artist queries
+# are O(log n) (plus k for top-k) instead of re-running the meters and
+# sorting.
+#
+# On disk a leaderboard is a JSON snapshot (every board in rank order) and
+# a journal of updates since the snapshot, one JSON line each. Updates only
+# append to the journal; save() writes a new snapshot and empties it.
+# Loading rebuilds each board from the snapshot's sorted order in linear
+# time, then replays the journal.
+import os
+import json
+import random
+import threading
+
+METRICS = ("pmm", "mimim", "bff")
+VERSION = 1
+MAX_LEVELS = 32
+
+
+class _Node(object):
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+class RankedIndex(object):
+    """
+    Indexable skip list of sortable keys: insert, remove and rank in
+    O(log n), the key at any position in O(log n) and in-order iteration.
+    Each link stores how many positions it skips
+    """
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+        self.head = _Node(None, MAX_LEVELS)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _level(self):
+        level = 1
+        while level < MAX_LEVELS and self.random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        chain = [None] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key <= key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        new = _Node(key, self._level())
+        steps = 0
+        for level in range(len(new.next)):
+            previous = chain[level]
+            new.next[level] = previous.next[level]
+            previous.next[level] = new
+            new.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(len(new.next), MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain = [None] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """Number of keys smaller than key."""
+        position = 0
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        remaining = index + 1
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node.key
+
+    def iter_from(self, index=0):
+        """Keys in order, starting at position index."""
+        if index >= self.size:
+            return
+        node = self.head
+        remaining = index + 1
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    @classmethod
+    def from_sorted(cls, keys, seed=None):
+        """Builds the index from keys already in order, in linear time."""
+        index = cls(seed)
+        last = [index.head] * MAX_LEVELS
+        last_position = [0] * MAX_LEVELS
+        position = 0
+        for key in keys:
+            position += 1
+            node = _Node(key, index._level())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+        for level in range(MAX_LEVELS):
+            last[level].width[level] = position + 1 - last_position[level]
+        index.size = position
+        return index
+
+
+class Leaderboard(object):
+    """One metric's scores by artist, ranked highest first (ties by artist id)."""
+
+    def __init__(self, entries=()):
+        """entries: [(artist_id, score)] in rank order, as returned by entries()"""
+        self.scores = {artist_id: score for artist_id, score in entries}
+        self.index = RankedIndex.from_sorted((-score, artist_id) for artist_id, score in entries)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __contains__(self, artist_id):
+        return artist_id in self.scores
+
+    def update(self, artist_id, score):
+        """Sets an artist's score; None removes the artist."""
+        old = self.scores.pop(artist_id, None)
+        if old is not None:
+            self.index.remove((-old, artist_id))
+        if score is not None:
+            self.scores[artist_id] = score
+            self.index.insert((-score, artist_id))
+
+    def score(self, artist_id):
+        return self.scores.get(artist_id)
+
+    def rank(self, artist_id):
+        """1-based rank of the artist, or None if it has no score."""
+        score = self.scores.get(artist_id)
+        if score is None:
+            return None
+        return self.index.rank((-score, artist_id)) + 1
+
+    def top(self, k=100, offset=0):
+        """[(artist_id, score)] for ranks offset + 1 to offset + k."""
+        entries = []
+        for neg_score, artist_id in self.index.iter_from(offset):
+            if len(entries) >= k:
+                break
+            entries.append((artist_id, -neg_score))
+        return entries
+
+    def entries(self):
+        return [(artist_id, -neg_score) for neg_score, artist_id in self.index]
+
+
+def score_of(metric, result):
+    """
+    Leaderboard score for a meter result: the PMM percentage, the MIMIM
+    mapping's mimim_score and the BFF's collaboration_count (0 without a BFF)
+    """
+    if metric == "mimim" and hasattr(result, "get"):
+        return result.get("mimim_score")
+    if metric == "bff":
+        if result is None:
+            return 0
+        if hasattr(result, "get"):
+            return result.get("collaboration_count", 0)
+    return result
+
+
+class Leaderboards(object):
+    """
+    PMM, MIMIM and BFF leaderboards, persisted to path (a snapshot) and
+    path + ".journal" when a path is given. The snapshot is rewritten once
+    compact_every updates have been journaled.
+    """
+
+    def __init__(self, path=None, compact_every=10000):
+        self.path = path
+        self.journal_path = path + ".journal" if path else None
+        self.compact_every = compact_every
+        self.journaled = 0
+        self.lock = threading.RLock()
+        self.boards = {metric: Leaderboard() for metric in METRICS}
+        if path:
+            self._load()
+
+    def _board(self, metric):
+        if metric not in self.boards:
+            raise Exception(f"Unknown leaderboard {metric}, expected one of {', '.join(METRICS)}")
+        return self.boards[metric]
+
+    # PERSISTENCE
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            if state.get("version") != VERSION:
+                raise Exception(f"{self.path} is not a version {VERSION} leaderboard file")
+            for metric, entries in state["boards"].items():
+                if metric in self.boards:
+                    self.boards[metric] = Leaderboard(entries)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    if line.strip():
+                        metric, artist_id, score = json.loads(line)
+                        self._board(metric).update(artist_id, score)
+                        self.journaled += 1
+
+    def _journal(self, updates):
+        if not self.journal_path or not updates:
+            return
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(update) + "\n" for update in updates))
+        self.journaled += len(updates)
+        if self.compact_every and self.journaled >= self.compact_every:
+            self.save()
+
+    def save(self):
+        """Writes a snapshot of every board and empties the journal."""
+        if not self.path:
+            return
+        with self.lock:
+            state = {"version": VERSION, "boards": {metric: board.entries() for metric, board in self.boards.items()}}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.journaled = 0
+
+    # UPDATES
+
+    def update(self, metric, artist_id, score):
+        """Sets one score; None removes the artist from that board."""
+        with self.lock:
+            self._board(metric).update(artist_id, score)
+            self._journal([(metric, artist_id, score)])
+
+    def record(self, artist_id, **results):
+        """
+        Records meter results by metric name, e.g.
+        record(artist_id, pmm=pmm_score, mimim=mimim_result, bff=bff_result).
+        Metrics not given are left as they are
+        """
+        updates = [(metric, artist_id, score_of(metric, result)) for metric, result in results.items()]
+        with self.lock:
+            for metric, _, score in updates:
+                self._board(metric).update(artist_id, score)
+            self._journal(updates)
+
+    def record_profile(self, profile):
+        """
+        Records a final statify profile (see statify.iter_profile) and
+        returns True. Provisional profiles are skipped and return False, so
+        every profile of an iter_profile run can be passed in
+        """
+        if not profile["final"]:
+            return False
+        self.record(profile["artist_id"], pmm=profile["pmm_score"], mimim=profile["mimim"], bff=profile["bff"])
+        return True
+
+    def remove(self, artist_id):
+        """Takes the artist off every board."""
+        with self.lock:
+            updates = [(metric, artist_id, None) for metric in METRICS if artist_id in self.boards[metric]]
+            for metric, _, _ in updates:
+                self.boards[metric].update(artist_id, None)
+            self._journal(updates)
+
+    # QUERIES
+
+    def top(self, metric, k=100, offset=0):
+        with self.lock:
+            return self._board(metric).top(k, offset)
+
+    def rank(self, metric, artist_id):
+        with self.lock:
+            return self._board(metric).rank(artist_id)
+
+    def score(self, metric, artist_id):
+        with self.lock:
+            return self._board(metric).score(artist_id)
+
+    def standing(self, artist_id):
+        """{metric: {"score", "rank", "of"}} for every board the artist is on."""
+        with self.lock:
+            return {metric: {"score": board.score(artist_id), "rank": board.rank(artist_id), "of": len(board)}
+                    for metric, board in self.boards.items() if artist_id in board}
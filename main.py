@@ -1,9 +1,10 @@
 import api_client
-import secrets
 import statify
 
 # Create an instance of the SpotifyAPI client
-spotify_client = api_client.SpotifyAPI(secrets.client_id, secrets.client_secret)
+# Credentials come from SPOTIFY_CLIENT_ID / SPOTIFY_CLIENT_SECRET or the config file.
+# The entity map keeps the full artist from the search, so MIMIM needs no extra call
+spotify_client = api_client.SpotifyAPI(entity_map=True)
 
 # Get user input
 user_input_artist = input(f"Name an artist: ")
@@ -22,21 +23,24 @@ artist_name = artist["name"]
 
 print(f"Found artist: {artist_name}")
 
-# Create instances of the Statify metric classes
-pmm = statify.potty_mouth_meter(spotify_client)
-mimim = statify.mom_i_made_it_meter(spotify_client)
-bff = statify.bff_picker(spotify_client)
 
-# Calculate the metrics
-PMM_score = pmm.calculate_pmm(artist_id)
-MIMIM_score = mimim.calculate_mimim(artist_id)
-BFF_result = bff.find_bff(artist_id)
+def show_profile(profile):
+    mimim = profile["mimim"]
+    bff = profile["bff"]
+    heading = f"{artist_name}'s Statify Profile"
+    if not profile["final"]:
+        heading += f" (preview from {profile['tracks_read']} top tracks, refining...)"
+    print(f"""
+{heading}:
 
-# Display results
-print(f"""
-{artist_name}'s Statify Profile:
+    Potty Mouth Meter: {profile['pmm_score']:.1f}%
+    Mom-I-Made-It Score: {mimim['mimim_score']}/100 (Popularity: {mimim['popularity']}, Followers: {mimim['followers']:,})
+    BFF: {bff['name'] if bff else 'No collaborations found'} {f"({bff['collaboration_count']} collaborations)" if bff else ''}
+""")
 
-    Potty Mouth Meter: {PMM_score:.1f}%
-    Mom-I-Made-It Score: {MIMIM_score['mimim_score']}/100 (Popularity: {MIMIM_score['popularity']}, Followers: {MIMIM_score['followers']:,})
-    BFF: {BFF_result['name'] if BFF_result else 'No collaborations found'} {f"({BFF_result['collaboration_count']} collaborations)" if BFF_result else ''}
-""")
\ No newline at end of file
+
+# Show a preview from the artist's top tracks right away, then the final
+# profile once the whole discography has been read
+for profile in statify.iter_profile(spotify_client, artist_id):
+    if profile["source"] == "top_tracks" or profile["final"]:
+        show_profile(profile)
@@ -0,0 +1,141 @@
+#-----------------------------------------------------------------#
+# Typed, schema-limited Spotify payloads for the fast decoding path.
+#
+# Only the fields the statify meters read are declared; everything else in
+# the response is skipped by the decoder instead of being built into dicts.
+# Requires msgspec; when it is not installed AVAILABLE is False and
+# SpotifyAPI keeps using the plain r.json() dict path.
+
+from typing import List, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+AVAILABLE = msgspec is not None
+
+
+if AVAILABLE:
+
+    class Entity(msgspec.Struct):
+        """
+        Base struct with dict-style read access, so the meters and
+        SpotifyAPI helpers work unchanged on either decoding path
+        """
+
+        def get(self, key, default=None):
+            return getattr(self, key, default)
+
+        def __getitem__(self, key):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+
+    class Followers(Entity):
+        total: int = 0
+
+    class SimplifiedArtist(Entity):
+        id: Optional[str] = None
+        name: Optional[str] = None
+
+    class Artist(Entity):
+        id: Optional[str] = None
+        name: Optional[str] = None
+        popularity: int = 0
+        followers: Followers = msgspec.field(default_factory=Followers)
+
+    class SimplifiedTrack(Entity):
+        id: Optional[str] = None
+        name: Optional[str] = None
+        explicit: bool = False
+        artists: List[SimplifiedArtist] = []
+
+    class TrackPage(Entity):
+        items: List[SimplifiedTrack] = []
+        total: int = 0
+        limit: int = 0
+        offset: int = 0
+        next: Optional[str] = None
+
+    class SimplifiedAlbum(Entity):
+        id: Optional[str] = None
+        name: Optional[str] = None
+        album_type: Optional[str] = None
+        release_date: Optional[str] = None
+
+    class Album(Entity):
+        id: Optional[str] = None
+        name: Optional[str] = None
+        album_type: Optional[str] = None
+        release_date: Optional[str] = None
+        total_tracks: int = 0
+        artists: List[SimplifiedArtist] = []
+        # only on the full album object, not in album listings
+        tracks: Optional[TrackPage] = None
+
+    class Track(Entity):
+        """A full track; unlike SimplifiedTrack it carries its album."""
+        id: Optional[str] = None
+        name: Optional[str] = None
+        explicit: bool = False
+        artists: List[SimplifiedArtist] = []
+        album: Optional[SimplifiedAlbum] = None
+
+    class ArtistPage(Entity):
+        items: List[Artist] = []
+        total: int = 0
+        limit: int = 0
+        offset: int = 0
+        next: Optional[str] = None
+
+    class AlbumPage(Entity):
+        items: List[Album] = []
+        total: int = 0
+        limit: int = 0
+        offset: int = 0
+        next: Optional[str] = None
+
+    class FullTrackPage(Entity):
+        items: List[Track] = []
+        total: int = 0
+        limit: int = 0
+        offset: int = 0
+        next: Optional[str] = None
+
+    class SearchResponse(Entity):
+        artists: Optional[ArtistPage] = None
+        albums: Optional[AlbumPage] = None
+        tracks: Optional[FullTrackPage] = None
+
+    class TrackList(Entity):
+        tracks: List[Optional[Track]] = []
+
+    class ArtistList(Entity):
+        artists: List[Optional[Artist]] = []
+
+    class AlbumList(Entity):
+        albums: List[Optional[Album]] = []
+
+    # One reusable decoder per response shape
+    DECODERS = {
+        "artists": msgspec.json.Decoder(Artist),
+        "albums": msgspec.json.Decoder(Album),
+        "tracks": msgspec.json.Decoder(Track),
+        "artist_page": msgspec.json.Decoder(ArtistPage),
+        "album_page": msgspec.json.Decoder(AlbumPage),
+        "track_page": msgspec.json.Decoder(TrackPage),
+        "search": msgspec.json.Decoder(SearchResponse),
+        "track_list": msgspec.json.Decoder(TrackList),
+        "artist_list": msgspec.json.Decoder(ArtistList),
+        "album_list": msgspec.json.Decoder(AlbumList),
+    }
+
+else:
+    DECODERS = {}
+
+
+def decode(kind, content):
+    """Decode raw response bytes into the typed struct registered for kind."""
+    return DECODERS[kind].decode(content)
@@ -0,0 +1,233 @@
+#-----------------------------------------------------------------#
+# Tail-latency and failure controls for SpotifyAPI GET requests.
+#
+# CircuitBreaker  per-endpoint closed / open / half-open breaker that fails
+#                 fast while an endpoint is erroring instead of hammering it
+# Hedger          sends a duplicate GET once the primary has been in flight
+#                 longer than the endpoint's observed latency percentile and
+#                 returns whichever response arrives first
+import time
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while an endpoint's breaker is open."""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"Circuit open for {endpoint}, retry in {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def is_failure_status(status_code):
+    """Server errors and throttling count against an endpoint; 4xx lookups don't."""
+    return status_code == 429 or status_code >= 500
+
+
+class CircuitBreaker(object):
+    """
+    Opens after failure_threshold consecutive failures. After
+    recovery_timeout seconds it lets half_open_max_calls trial requests
+    through; a success closes it again, a failure re-opens it.
+    """
+
+    def __init__(self, endpoint, failure_threshold=5, recovery_timeout=30.0,
+                 half_open_max_calls=1, clock=time.monotonic):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_calls = 0
+        # metrics
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_request(self):
+        """Raises CircuitOpenError if the request should not be sent."""
+        with self.lock:
+            if self.state == OPEN:
+                elapsed = self.clock() - self.opened_at
+                if elapsed < self.recovery_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.endpoint, self.recovery_timeout - elapsed)
+                self.state = HALF_OPEN
+                self.half_open_calls = 0
+            if self.state == HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.endpoint, 0.0)
+                self.half_open_calls += 1
+
+    def record_success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_abandoned(self):
+        """The request was given up by the caller; free its half-open trial slot."""
+        with self.lock:
+            if self.state == HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
+
+
+class CircuitBreakers(object):
+    """Creates one CircuitBreaker per endpoint on first use."""
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1,
+                 clock=time.monotonic):
+        self.settings = {
+            "failure_threshold": failure_threshold,
+            "recovery_timeout": recovery_timeout,
+            "half_open_max_calls": half_open_max_calls,
+            "clock": clock
+        }
+        self.lock = threading.Lock()
+        self.breakers = {}
+
+    def get(self, endpoint):
+        with self.lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = self.breakers[endpoint] = CircuitBreaker(endpoint, **self.settings)
+            return breaker
+
+    def metrics(self):
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {endpoint: breaker.metrics() for endpoint, breaker in breakers.items()}
+
+
+class LatencyWindow(object):
+    """Sliding window of recent latencies (seconds) for one endpoint."""
+
+    def __init__(self, size=200):
+        self.samples = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, latency):
+        with self.lock:
+            self.samples.append(latency)
+
+    def percentile(self, pct):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class Hedger(object):
+    """
+    Hedges idempotent requests. Until an endpoint has min_samples latencies
+    recorded, requests are sent once; afterwards a duplicate is sent when the
+    primary exceeds the percentile latency (never sooner than min_delay).
+    """
+
+    def __init__(self, percentile=95, min_samples=20, min_delay=0.05, window=200, max_workers=8):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window = window
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.counts = {}
+        self.executor = None
+
+    def _window(self, endpoint):
+        with self.lock:
+            if endpoint not in self.windows:
+                self.windows[endpoint] = LatencyWindow(self.window)
+                self.counts[endpoint] = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+            return self.windows[endpoint]
+
+    def _count(self, endpoint, key):
+        with self.lock:
+            self.counts[endpoint][key] += 1
+
+    def _pool(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix="statify-hedge")
+            return self.executor
+
+    def hedge_delay(self, endpoint):
+        window = self._window(endpoint)
+        if len(window) < self.min_samples:
+            return None
+        return max(self.min_delay, window.percentile(self.percentile))
+
+    def call(self, endpoint, send):
+        """Runs send() and, if it is slow, a hedged duplicate; returns the first result."""
+        window = self._window(endpoint)
+        self._count(endpoint, "requests")
+        delay = self.hedge_delay(endpoint)
+        start = time.monotonic()
+        if delay is None:
+            result = send()
+            window.add(time.monotonic() - start)
+            return result
+
+        pool = self._pool()
+        primary = pool.submit(send)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            window.add(time.monotonic() - start)
+            return primary.result()
+
+        self._count(endpoint, "hedged")
+        hedge = pool.submit(send)
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = next((f for f in (primary, hedge) if f in done and f.exception() is None), None)
+        if winner is None:
+            # The first response raised; fall back to the other one
+            wait(pending)
+            winner = next((f for f in (primary, hedge) if f.exception() is None), primary)
+        if winner is hedge:
+            self._count(endpoint, "hedge_wins")
+        window.add(time.monotonic() - start)
+        return winner.result()
+
+    def metrics(self):
+        with self.lock:
+            return {endpoint: dict(counts) for endpoint, counts in self.counts.items()}
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,315 @@
+#-----------------------------------------------------------------#
+# Budget-aware refresh scheduler for tracked artists.
+#
+# Every tracked artist is due again at last_refreshed + interval, where the
+# interval shrinks with the artist's observed change rate and user demand.
+# Intervals are scaled so that the expected cost of all refreshes matches
+# the hourly request budget, and a token bucket spreads that budget evenly
+# over the hour. Interactive lookups run immediately, without waiting for
+# tokens, but the requests they send are charged to the same budget; they
+# pause background refreshes while in flight and bump the artist's demand. An
+# artist whose refresh fails is retried with exponential backoff while the
+# others carry on.
+import time
+import heapq
+import threading
+import collections
+import lanes
+import statify
+import deadlines
+from api_client import RequestTally, active_tallies, tally_scope
+
+SECONDS_PER_HOUR = 3600
+
+
+def _shared_errors():
+    """
+    Failures that are not about one artist (an open circuit, every
+    credential rate limited, the caller's deadline), which stop run_pending
+    """
+    import resilience
+    import credential_pool
+    return (resilience.CircuitOpenError, credential_pool.NoCredentialAvailable, deadlines.DeadlineExceeded)
+
+
+class TrackedArtist(object):
+
+    def __init__(self, artist_id, now):
+        self.artist_id = artist_id
+        self.added_at = now
+        self.last_refreshed = None
+        self.result = None
+        self.change_rate = 0.0      # EWMA of metric change per hour
+        self.demand = 0.0           # decayed count of interactive lookups
+        self.demand_updated = now
+        self.cost = None            # requests used by the last refresh
+        self.due = now
+        self.version = 0            # bumps invalidate stale heap entries
+        self.refreshes = 0
+        self.failures = 0           # consecutive failed refreshes
+
+
+class RefreshScheduler(object):
+    """
+    Keeps PMM, MIMIM and BFF fresh for tracked artists within
+    hourly_budget HTTP requests. Call run_pending() periodically (or run())
+    for background work and lookup() for interactive requests. A failed
+    refresh is retried after retry_backoff seconds, doubling with each
+    consecutive failure up to max_retry_backoff.
+    """
+
+    def __init__(self, api_client, hourly_budget, volatility_weight=10.0, demand_half_life=24 * SECONDS_PER_HOUR,
+                 change_smoothing=0.5, default_cost=20, burst_fraction=1 / 12, retry_backoff=60.0,
+                 max_retry_backoff=6 * SECONDS_PER_HOUR, clock=time.time):
+        self.api_client = api_client
+        self.hourly_budget = hourly_budget
+        self.volatility_weight = volatility_weight
+        self.demand_half_life = demand_half_life
+        self.change_smoothing = change_smoothing
+        self.default_cost = default_cost
+        self.burst = max(1.0, hourly_budget * burst_fraction)
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.clock = clock
+
+        self.lock = threading.RLock()
+        self.idle = threading.Condition(self.lock)
+        self.interactive_in_flight = 0
+        self.artists = {}
+        self.heap = []
+        self.tokens = self.burst
+        self.tokens_updated = clock()
+        self.spent = collections.deque()   # (timestamp, requests)
+        self.stats = {"background_refreshes": 0, "interactive_lookups": 0, "interactive_requests": 0,
+                      "deferred_for_budget": 0, "failed_refreshes": 0}
+
+    # PRIORITIES
+
+    def _demand(self, tracked, now):
+        decay = 0.5 ** ((now - tracked.demand_updated) / self.demand_half_life)
+        return tracked.demand * decay
+
+    def _weight(self, tracked, now):
+        return (1 + self.volatility_weight * tracked.change_rate) * (1 + self._demand(tracked, now))
+
+    def _cost(self, tracked):
+        return tracked.cost if tracked.cost is not None else self.default_cost
+
+    def _interval(self, tracked, now):
+        """
+        Interval that spends the hourly budget across all artists in
+        proportion to cost x weight: sum(cost_i / interval_i) = budget/hour
+        """
+        demand = sum(self._cost(t) * self._weight(t, now) for t in self.artists.values())
+        scale = demand * SECONDS_PER_HOUR / self.hourly_budget
+        return scale / self._weight(tracked, now)
+
+    def _schedule(self, tracked, now, due=None):
+        tracked.version += 1
+        if due is not None:
+            tracked.due = due
+        elif tracked.last_refreshed is None:
+            tracked.due = tracked.added_at
+        else:
+            tracked.due = tracked.last_refreshed + self._interval(tracked, now)
+        heapq.heappush(self.heap, (tracked.due, tracked.artist_id, tracked.version))
+
+    def track(self, *artist_ids):
+        with self.lock:
+            now = self.clock()
+            for artist_id in artist_ids:
+                if artist_id not in self.artists:
+                    tracked = self.artists[artist_id] = TrackedArtist(artist_id, now)
+                    self._schedule(tracked, now)
+
+    def untrack(self, artist_id):
+        with self.lock:
+            # its heap entries are skipped once the artist is gone
+            self.artists.pop(artist_id, None)
+
+    # BUDGET
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self.tokens_updated)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.hourly_budget / SECONDS_PER_HOUR)
+        self.tokens_updated = now
+
+    def _charge(self, requests, now):
+        """Takes the requests a refresh or lookup sent out of the budget."""
+        self._refill(now)
+        self.tokens -= requests
+        self.spent.append((now, requests))
+
+    def used_last_hour(self, now=None):
+        with self.lock:
+            now = self.clock() if now is None else now
+            while self.spent and self.spent[0][0] <= now - SECONDS_PER_HOUR:
+                self.spent.popleft()
+            return sum(requests for _, requests in self.spent)
+
+    # REFRESH
+
+    def _measure(self, artist_id, lane, tally):
+        """Computes PMM, MIMIM and BFF in lane, counting the requests sent in tally."""
+        with tally_scope(active_tallies() + (tally,)), lanes.scope(lane):
+            tracks = self.api_client.get_all_tracks_by_artist(artist_id)
+            mimim = statify.mom_i_made_it_meter(self.api_client).calculate_mimim(artist_id)
+        return {
+            "pmm": statify.explicit_percentage(tracks),
+            "mimim": mimim,
+            "bff": statify.pick_bff(statify.count_collaborators(artist_id, tracks))
+        }
+
+    @staticmethod
+    def _change(old, new):
+        """Size of the change between two results, roughly 0 (same) to 1+."""
+        if old is None:
+            return 0.0
+        change = abs(new["pmm"] - old["pmm"]) / 100
+        change += abs(new["mimim"]["mimim_score"] - old["mimim"]["mimim_score"]) / 100
+        old_bff = old["bff"]["id"] if old["bff"] else None
+        new_bff = new["bff"]["id"] if new["bff"] else None
+        change += 0.0 if old_bff == new_bff else 1.0
+        return change
+
+    def _apply(self, tracked, result, used, now):
+        if tracked.last_refreshed is not None:
+            hours = max((now - tracked.last_refreshed) / SECONDS_PER_HOUR, 1 / 60)
+            rate = self._change(tracked.result, result) / hours
+            tracked.change_rate += self.change_smoothing * (rate - tracked.change_rate)
+        tracked.result = result
+        tracked.last_refreshed = now
+        tracked.refreshes += 1
+        tracked.failures = 0
+        if used:
+            tracked.cost = used
+        self._schedule(tracked, now)
+
+    def _fail(self, tracked, now):
+        """Retries a failed refresh with backoff."""
+        tracked.failures += 1
+        backoff = min(self.retry_backoff * 2 ** (tracked.failures - 1), self.max_retry_backoff)
+        if tracked.artist_id in self.artists:
+            self._schedule(tracked, now, due=now + backoff)
+        self.stats["failed_refreshes"] += 1
+
+    def lookup(self, artist_id):
+        """
+        Interactive lookup: refreshes the artist now, ahead of any queued
+        background work, and counts towards its demand. Returns the result
+        """
+        with self.lock:
+            self.interactive_in_flight += 1
+            self.track(artist_id)
+            tracked = self.artists[artist_id]
+            now = self.clock()
+            tracked.demand = self._demand(tracked, now) + 1
+            tracked.demand_updated = now
+        tally = RequestTally()
+        try:
+            result = self._measure(artist_id, lanes.INTERACTIVE, tally)
+        finally:
+            with self.lock:
+                # charged whether it succeeded or not, and even if the
+                # artist was untracked meanwhile
+                self._charge(tally.count, self.clock())
+                self.stats["interactive_lookups"] += 1
+                self.stats["interactive_requests"] += tally.count
+                self.interactive_in_flight -= 1
+                self.idle.notify_all()
+        with self.lock:
+            if artist_id in self.artists:
+                self._apply(tracked, result, tally.count, self.clock())
+        return result
+
+    def _next_due(self, now):
+        """Pops the next due artist that the budget allows, or returns None."""
+        while self.heap:
+            due, artist_id, version = self.heap[0]
+            tracked = self.artists.get(artist_id)
+            if tracked is None or tracked.version != version:
+                heapq.heappop(self.heap)
+                continue
+            if due > now:
+                return None
+            if self.tokens < min(self._cost(tracked), self.burst):
+                self.stats["deferred_for_budget"] += 1
+                return None
+            heapq.heappop(self.heap)
+            return tracked
+        return None
+
+    def run_pending(self, max_refreshes=None):
+        """
+        Refreshes due artists, most overdue first, while the budget allows.
+        Waits for interactive lookups before starting each one. Returns the
+        number of artists refreshed
+        """
+        refreshed = 0
+        while max_refreshes is None or refreshed < max_refreshes:
+            with self.lock:
+                while self.interactive_in_flight:
+                    self.idle.wait()
+                now = self.clock()
+                self._refill(now)
+                tracked = self._next_due(now)
+                if tracked is None:
+                    break
+            tally = RequestTally()
+            try:
+                result = self._measure(tracked.artist_id, lanes.BULK, tally)
+            except Exception as e:
+                with self.lock:
+                    now = self.clock()
+                    self._charge(tally.count, now)
+                    self._fail(tracked, now)
+                if isinstance(e, _shared_errors()):
+                    raise
+                continue
+            with self.lock:
+                now = self.clock()
+                self._charge(tally.count, now)
+                if tracked.artist_id in self.artists:
+                    self._apply(tracked, result, tally.count, now)
+                self.stats["background_refreshes"] += 1
+            refreshed += 1
+        return refreshed
+
+    def run(self, poll_interval=5.0, stop_event=None, sleep=time.sleep):
+        """
+        Runs background refreshes until stop_event is set. Open circuits,
+        rate limited credentials and exceeded deadlines pause it until the
+        next poll
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                self.run_pending()
+            except _shared_errors():
+                pass
+            sleep(poll_interval)
+
+    def report(self, limit=20):
+        """Queue order and budget usage."""
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            queue = sorted(self.artists.values(), key=lambda t: t.due)[:limit]
+            return {
+                "tracked": len(self.artists),
+                "queue": [{
+                    "artist_id": t.artist_id,
+                    "due_in": round(t.due - now, 1),
+                    "last_refreshed": t.last_refreshed,
+                    "weight": round(self._weight(t, now), 3),
+                    "change_rate": round(t.change_rate, 4),
+                    "demand": round(self._demand(t, now), 3),
+                    "cost": t.cost
+                } for t in queue],
+                "budget": {
+                    "hourly_budget": self.hourly_budget,
+                    "used_last_hour": self.used_last_hour(now),
+                    "tokens_available": round(self.tokens, 1)
+                },
+                **self.stats
+            }
@@ -0,0 +1,382 @@
+#-----------------------------------------------------------------#
+# Compressed on-disk discography snapshots.
+#
+# A snapshot keeps one artist's fetched albums and the track fields the
+# meters read (id, explicit flag, credited artists) in one file,
+# <directory>/<artist_id>.snap, so PMM and BFF can be re-scored without
+# the network.
+#
+# File layout (little endian):
+#   header   magic "SNAP", version, codec, fetched-at (unix seconds),
+#            album count, track count, payload size and CRC32 (uncompressed)
+#   payload  zlib-compressed columns:
+#              strings  count, uint32 lengths, UTF-8 blob (ids and names,
+#                       each stored once; string 0 is the artist id)
+#              artists  count, uint32 id and name string indexes
+#              albums   count, uint32 id, name, album type, release date
+#                       string indexes, stored track counts and the
+#                       albums' own total_tracks (NONE when unknown;
+#                       version 2 on, version 1 files have no such column)
+#              tracks   count, uint32 id string indexes, uint8 explicit
+#                       flags, uint8 artist counts, uint32 artist indexes
+#
+# Loading maps the file and decompresses the payload straight from the
+# mapping. Columns are decoded into C arrays and strings only on demand, so
+# scanning a directory of snapshots for PMM/BFF touches no Python objects
+# per track beyond the collaborator tally.
+import os
+import sys
+import mmap
+import time
+import zlib
+import array
+import struct
+import itertools
+
+MAGIC = b"SNAP"
+VERSION = 2
+# versions Snapshot can still read
+READABLE_VERSIONS = (1, 2)
+CODEC_ZLIB = 1
+HEADER = struct.Struct("<4sHBxqIIII")
+COUNT = struct.Struct("<I")
+NONE = 0xFFFFFFFF
+EXTENSION = ".snap"
+
+
+def _read_array(buffer, offset, typecode, count):
+    column = array.array(typecode)
+    end = offset + column.itemsize * count
+    column.frombytes(buffer[offset:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+def _read_count(buffer, offset):
+    return COUNT.unpack_from(buffer, offset)[0], offset + COUNT.size
+
+
+class _Encoder(object):
+    """Builds the uncompressed payload for one artist."""
+
+    def __init__(self, artist_id):
+        self.strings = {}
+        self.artists = {}
+        self.string(artist_id)
+        self.album_columns = ([], [], [], [], [], [])
+        self.track_ids = []
+        self.explicit = []
+        self.artist_counts = []
+        self.artist_refs = []
+
+    def string(self, value):
+        if value is None:
+            return NONE
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def artist(self, artist):
+        artist_id = artist.get("id")
+        index = self.artists.get(artist_id)
+        if index is None:
+            index = self.artists[artist_id] = (len(self.artists), self.string(artist_id),
+                                               self.string(artist.get("name")))
+        return index[0]
+
+    def add(self, album, tracks):
+        ids, names, types, dates, counts, totals = self.album_columns
+        ids.append(self.string(album.get("id")))
+        names.append(self.string(album.get("name")))
+        types.append(self.string(album.get("album_type")))
+        dates.append(self.string(album.get("release_date")))
+        counts.append(len(tracks))
+        total = album.get("total_tracks")
+        totals.append(NONE if total is None else total)
+        for track in tracks:
+            credits = (track.get("artists") or [])[:255]
+            self.track_ids.append(self.string(track.get("id")))
+            self.explicit.append(1 if track.get("explicit", False) else 0)
+            self.artist_counts.append(len(credits))
+            self.artist_refs.extend(self.artist(artist) for artist in credits)
+
+    def payload(self):
+        out = []
+
+        def column(typecode, values):
+            values = array.array(typecode, values)
+            if sys.byteorder == "big":
+                values.byteswap()
+            out.append(values.tobytes())
+
+        encoded = [value.encode() for value in self.strings]
+        out.append(COUNT.pack(len(encoded)))
+        column("I", map(len, encoded))
+        out.append(b"".join(encoded))
+
+        artists = list(self.artists.values())
+        out.append(COUNT.pack(len(artists)))
+        column("I", (id_index for _, id_index, _ in artists))
+        column("I", (name_index for _, _, name_index in artists))
+
+        out.append(COUNT.pack(len(self.album_columns[0])))
+        for values in self.album_columns:
+            column("I", values)
+
+        out.append(COUNT.pack(len(self.track_ids)))
+        column("I", self.track_ids)
+        column("B", self.explicit)
+        column("B", self.artist_counts)
+        column("I", self.artist_refs)
+        return b"".join(out)
+
+
+def encode(artist_id, discography, fetched_at=None, level=6):
+    """Serialises an iterable of (album, tracks) pairs into snapshot file bytes."""
+    encoder = _Encoder(artist_id)
+    for album, tracks in discography:
+        encoder.add(album, tracks)
+    raw = encoder.payload()
+    fetched_at = int(time.time() if fetched_at is None else fetched_at)
+    header = HEADER.pack(MAGIC, VERSION, CODEC_ZLIB, fetched_at, len(encoder.album_columns[0]),
+                         len(encoder.track_ids), len(raw), zlib.crc32(raw))
+    return header + zlib.compress(raw, level)
+
+
+class SnapshotHeader(object):
+
+    def __init__(self, raw, path=None):
+        magic, version, codec, fetched_at, albums, tracks, size, crc = HEADER.unpack_from(raw)
+        if magic != MAGIC or version not in READABLE_VERSIONS or codec != CODEC_ZLIB:
+            raise Exception(f"{path or 'data'} is not a version {VERSION} discography snapshot")
+        self.version = version
+        self.fetched_at = fetched_at
+        self.album_count = albums
+        self.track_count = tracks
+        self.size = size
+        self.crc = crc
+
+
+class Snapshot(object):
+    """
+    One artist's discography as decoded columns. tracks() and discography()
+    rebuild dicts the statify functions accept; pmm() and bff() score the
+    columns directly
+    """
+
+    def __init__(self, header, raw):
+        self.header = header
+        self.fetched_at = header.fetched_at
+        self.raw = raw
+        offset = 0
+        count, offset = _read_count(raw, offset)
+        lengths, offset = _read_array(raw, offset, "I", count)
+        self.string_offsets = array.array("Q", itertools.accumulate(lengths, initial=offset))
+        offset = self.string_offsets[-1]
+
+        count, offset = _read_count(raw, offset)
+        self.artist_ids, offset = _read_array(raw, offset, "I", count)
+        self.artist_names, offset = _read_array(raw, offset, "I", count)
+
+        count, offset = _read_count(raw, offset)
+        self.album_columns = []
+        for _ in range(6 if header.version >= 2 else 5):
+            values, offset = _read_array(raw, offset, "I", count)
+            self.album_columns.append(values)
+        if header.version < 2:
+            self.album_columns.append(array.array("I", [NONE]) * count)
+
+        count, offset = _read_count(raw, offset)
+        self.track_ids, offset = _read_array(raw, offset, "I", count)
+        self.explicit, offset = _read_array(raw, offset, "B", count)
+        self.artist_counts, offset = _read_array(raw, offset, "B", count)
+        self.artist_refs, offset = _read_array(raw, offset, "I", sum(self.artist_counts))
+        self.artist_id = self.string(0)
+        self.artists = None
+
+    @classmethod
+    def from_bytes(cls, data, path=None):
+        view = memoryview(data)
+        body = view[HEADER.size:]
+        try:
+            header = SnapshotHeader(view, path)
+            raw = zlib.decompress(body)
+        finally:
+            # a mapping cannot be closed while views of it are alive
+            body.release()
+            view.release()
+        if len(raw) != header.size or zlib.crc32(raw) != header.crc:
+            raise Exception(f"{path or 'data'} is a corrupt discography snapshot")
+        return cls(header, raw)
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        return self.raw[self.string_offsets[index]:self.string_offsets[index + 1]].decode()
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def albums(self):
+        """
+        Album dicts. total_tracks is the album's own track count (None if
+        it was not known); tracks_stored is how many of its tracks the
+        snapshot holds, fewer when the fetch was cut short
+        """
+        ids, names, types, dates, counts, totals = self.album_columns
+        return [{
+            "id": self.string(ids[i]),
+            "name": self.string(names[i]),
+            "album_type": self.string(types[i]),
+            "release_date": self.string(dates[i]),
+            "total_tracks": None if totals[i] == NONE else totals[i],
+            "tracks_stored": counts[i]
+        } for i in range(len(ids))]
+
+    def _artist(self, index):
+        return {"id": self.string(self.artist_ids[index]), "name": self.string(self.artist_names[index])}
+
+    def _artists(self):
+        if self.artists is None:
+            self.artists = [self._artist(i) for i in range(len(self.artist_ids))]
+        return self.artists
+
+    def tracks(self, start=0, stop=None):
+        """Track dicts (id, explicit, artists) for tracks start to stop."""
+        stop = len(self.track_ids) if stop is None else stop
+        artists = self._artists()
+        position = sum(self.artist_counts[:start])
+        tracks = []
+        for i in range(start, stop):
+            n = self.artist_counts[i]
+            tracks.append({
+                "id": self.string(self.track_ids[i]),
+                "explicit": bool(self.explicit[i]),
+                "artists": [artists[ref] for ref in self.artist_refs[position:position + n]]
+            })
+            position += n
+        return tracks
+
+    def discography(self):
+        """Yields (album, tracks) pairs, like SpotifyAPI.iter_artist_discography."""
+        start = 0
+        for album in self.albums():
+            stop = start + album["tracks_stored"]
+            yield album, self.tracks(start, stop)
+            start = stop
+
+    def pmm(self):
+        """statify.explicit_percentage over the snapshot's tracks."""
+        if not self.explicit:
+            return 0.0
+        return sum(self.explicit) / len(self.explicit) * 100
+
+    def bff(self):
+        """statify.pick_bff(statify.count_collaborators(...)) over the snapshot's tracks."""
+        counts = {}
+        position = 0
+        for n in self.artist_counts:
+            if n > 1:
+                for ref in self.artist_refs[position:position + n]:
+                    counts[ref] = counts.get(ref, 0) + 1
+            position += n
+        for ref in range(len(self.artist_ids)):
+            if self.string(self.artist_ids[ref]) == self.artist_id:
+                counts.pop(ref, None)
+        if not counts:
+            return None
+        best = max(counts, key=counts.get)
+        artist = self._artist(best)
+        return {"id": artist["id"], "name": artist["name"], "collaboration_count": counts[best]}
+
+
+def read_header(path):
+    """The header of a snapshot file, without decompressing it."""
+    with open(path, "rb") as f:
+        return SnapshotHeader(f.read(HEADER.size), path)
+
+
+def load(path):
+    """Maps a snapshot file and decodes it."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise Exception(f"{path} is not a version {VERSION} discography snapshot")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return Snapshot.from_bytes(mapped, path)
+
+
+class SnapshotStore(object):
+    """Directory of per-artist snapshot files."""
+
+    def __init__(self, directory, level=6, clock=time.time):
+        self.directory = directory
+        self.level = level
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, artist_id):
+        return os.path.join(self.directory, artist_id + EXTENSION)
+
+    def __contains__(self, artist_id):
+        return os.path.exists(self.path(artist_id))
+
+    def artist_ids(self):
+        with os.scandir(self.directory) as entries:
+            return [entry.name[:-len(EXTENSION)] for entry in entries if entry.name.endswith(EXTENSION)]
+
+    def save(self, artist_id, discography, fetched_at=None):
+        """Writes an artist's (album, tracks) pairs and returns the snapshot."""
+        data = encode(artist_id, discography, self.clock() if fetched_at is None else fetched_at, self.level)
+        path = self.path(artist_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return Snapshot.from_bytes(data, path)
+
+    def load(self, artist_id):
+        """The artist's snapshot, or None if there is none."""
+        path = self.path(artist_id)
+        if not os.path.exists(path):
+            return None
+        return load(path)
+
+    def age(self, artist_id):
+        """Seconds since the artist's snapshot was fetched, or None."""
+        path = self.path(artist_id)
+        if not os.path.exists(path):
+            return None
+        return self.clock() - read_header(path).fetched_at
+
+    def fetch(self, api_client, artist_id, max_age=None, **kwargs):
+        """
+        The artist's snapshot, fetched through api_client.iter_artist_discography
+        (kwargs are passed on) when there is none or it is older than
+        max_age seconds
+        """
+        age = self.age(artist_id)
+        if age is not None and (max_age is None or age <= max_age):
+            return self.load(artist_id)
+        fetched_at = self.clock()
+        discography = list(api_client.iter_artist_discography(artist_id, **kwargs))
+        return self.save(artist_id, discography, fetched_at)
+
+    def tracks(self, api_client, artist_id, max_age=None, **kwargs):
+        """Like api_client.get_all_tracks_by_artist, answered from the snapshot when it is fresh."""
+        return self.fetch(api_client, artist_id, max_age, **kwargs).tracks()
+
+    def scan(self):
+        """Yields every snapshot in the directory, one at a time."""
+        for artist_id in self.artist_ids():
+            yield load(self.path(artist_id))
+
+    def rescore(self):
+        """{artist_id: {"pmm_score", "bff", "tracks", "fetched_at"}} for every snapshot, offline."""
+        return {snapshot.artist_id: {
+            "pmm_score": snapshot.pmm(),
+            "bff": snapshot.bff(),
+            "tracks": len(snapshot),
+            "fetched_at": snapshot.fetched_at
+        } for snapshot in self.scan()}
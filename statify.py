@@ -1,123 +1,676 @@
+import time
+import types
+import threading
+import collections
+import deadlines
+import lanes
+
+
+def explicit_percentage(tracks):
+    """Share of explicit tracks, as a percentage."""
+    if not tracks:
+        return 0.0
+    explicit_count = sum(1 for track in tracks if track.get("explicit", False))
+    return (explicit_count / len(tracks)) * 100
+
+
+def mimim_score(popularity, followers):
+    """MIMIM score: a weighted combination of popularity and followers."""
+    # Normalize followers to a 0-100 scale (assuming 10M followers = 100)
+    normalized_followers = min((followers / 10000000) * 100, 100)
+    
+    # Weight: 60% popularity, 40% followers
+    return (popularity * 0.6) + (normalized_followers * 0.4)
+
+
+def count_collaborators(artist_id, tracks, collaborator_counts=None):
+    """
+    Adds every other artist credited on a multi-artist track to
+    collaborator_counts ({id: {"name", "count"}}) and returns it
+    """
+    if collaborator_counts is None:
+        collaborator_counts = {}
+    for track in tracks:
+        artists = track.get("artists", [])
+        # Skip if only one artist (no collaboration)
+        if len(artists) <= 1:
+            continue
+            
+        for artist in artists:
+            collaborator_id = artist.get("id")
+            collaborator_name = artist.get("name")
+            
+            # Skip the main artist
+            if collaborator_id == artist_id:
+                continue
+                
+            if collaborator_id not in collaborator_counts:
+                collaborator_counts[collaborator_id] = {
+                    "name": collaborator_name,
+                    "count": 0
+                }
+            collaborator_counts[collaborator_id]["count"] += 1
+    return collaborator_counts
+
+
+def pick_bff(collaborator_counts):
+    """The most frequent collaborator in collaborator_counts, or None."""
+    if not collaborator_counts:
+        return None
+    bff_id = max(collaborator_counts.keys(), 
+                key=lambda x: collaborator_counts[x]["count"])
+    return {
+        "id": bff_id,
+        "name": collaborator_counts[bff_id]["name"],
+        "collaboration_count": collaborator_counts[bff_id]["count"]
+    }
+
+
+# STATELESS METERS
+#
+# compute_pmm / compute_mimim / compute_bff keep no state between calls and
+# return immutable results (a float or a read-only mapping), so they are
+# safe to call from any number of threads. Meters that share a MeterCache
+# also share fetched discographies: PMM and BFF for the same artist then
+# cost one get_all_tracks_by_artist instead of two.
+
+class MeterCache(object):
+    """
+    Thread-safe, single-flight memo of meter inputs and results. Concurrent
+    requests for the same key wait for one computation; failures are not
+    cached. Entries expire after ttl seconds (None keeps them) and the least
+    recently used are evicted beyond max_entries.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()   # key -> (expires_at, Future)
+
+    def get(self, key, compute):
+        from concurrent.futures import Future, TimeoutError as FutureTimeout
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > self.clock()):
+                self.entries.move_to_end(key)
+                future = entry[1]
+                owner = False
+            else:
+                future = Future()
+                expires_at = self.clock() + self.ttl if self.ttl is not None else None
+                self.entries[key] = (expires_at, future)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                owner = True
+
+        if owner:
+            try:
+                future.set_result(compute())
+            except BaseException as e:
+                with self.lock:
+                    if self.entries.get(key, (None, None))[1] is future:
+                        del self.entries[key]
+                future.set_exception(e)
+                raise
+            return future.result()
+
+        deadline = deadlines.current()
+        try:
+            return future.result(timeout=deadline.remaining() if deadline else None)
+        except FutureTimeout:
+            if future.done():
+                raise
+            raise deadlines.DeadlineExceeded(f"Deadline exceeded waiting for {key}")
+
+    def __contains__(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > self.clock())
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_executor = None
+_preview_executor = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor(max_workers=8):
+    """The thread pool that calculate_many runs on, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="statify-meter")
+        return _executor
+
+
+def preview_executor(max_workers=4):
+    """
+    The thread pool preview_profile sends its top-tracks call on, kept apart
+    from shared_executor so previews never queue behind bulk discography
+    jobs (or wait on a pool they are running in)
+    """
+    global _preview_executor
+    with _executor_lock:
+        if _preview_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _preview_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="statify-preview")
+        return _preview_executor
+
+
+def fetch_tracks(api_client, artist_id, cache=None):
+    """get_all_tracks_by_artist, shared through cache when one is given."""
+    if cache is None:
+        return api_client.get_all_tracks_by_artist(artist_id)
+    return cache.get(("tracks", artist_id), lambda: api_client.get_all_tracks_by_artist(artist_id))
+
+
+def _cached(cache, key, compute):
+    return compute() if cache is None else cache.get(key, compute)
+
+
+def compute_pmm(api_client, artist_id, deadline=None, cache=None, lane=None):
+    """
+    Potty Mouth Meter score for an artist. If the deadline runs out,
+    DeadlineExceeded.partial holds the score over the tracks read so far.
+    """
+    def compute():
+        try:
+            tracks = fetch_tracks(api_client, artist_id, cache)
+        except deadlines.DeadlineExceeded as e:
+            tracks = e.partial or []
+            raise deadlines.DeadlineExceeded(
+                f"Deadline exceeded calculating PMM for artist {artist_id}",
+                partial={"pmm_score": explicit_percentage(tracks), "tracks_read": len(tracks)}
+            ) from e
+        return explicit_percentage(tracks)
+
+    with deadlines.scope(deadline), lanes.scope(lane):
+        return _cached(cache, ("pmm", artist_id), compute)
+
+
+def _mimim_result(artist_data):
+    popularity = artist_data.get("popularity", 0)
+    followers = artist_data.get("followers", {}).get("total", 0)
+    return types.MappingProxyType({
+        "mimim_score": round(mimim_score(popularity, followers), 2),
+        "popularity": popularity,
+        "followers": followers
+    })
+
+
+def compute_mimim(api_client, artist_id, deadline=None, cache=None, lane=None):
+    """Mom I Made It Meter result for an artist, as a read-only mapping."""
+    def compute():
+        return _mimim_result(api_client.get_artist(artist_id))
+
+    with deadlines.scope(deadline), lanes.scope(lane):
+        return _cached(cache, ("mimim", artist_id), compute)
+
+
+def compute_bff(api_client, artist_id, deadline=None, cache=None, lane=None):
+    """
+    Most frequent collaborator of an artist as a read-only mapping, or None.
+    If the deadline runs out, DeadlineExceeded.partial holds the BFF over
+    the tracks read so far.
+    """
+    def compute():
+        try:
+            tracks = fetch_tracks(api_client, artist_id, cache)
+        except deadlines.DeadlineExceeded as e:
+            tracks = e.partial or []
+            raise deadlines.DeadlineExceeded(
+                f"Deadline exceeded finding BFF for artist {artist_id}",
+                partial={"bff": pick_bff(count_collaborators(artist_id, tracks)), "tracks_read": len(tracks)}
+            ) from e
+        bff = pick_bff(count_collaborators(artist_id, tracks))
+        return types.MappingProxyType(bff) if bff else None
+
+    with deadlines.scope(deadline), lanes.scope(lane):
+        return _cached(cache, ("bff", artist_id), compute)
+
+
+def calculate_many(compute, api_client, artist_ids, deadline=None, cache=None, executor=None, lane=None):
+    """
+    Runs compute(api_client, artist_id, deadline, cache, lane) for every
+    distinct artist on the shared executor, in the bulk lane unless another
+    is given or in effect. Returns {artist_id: result}; artists whose
+    computation raised map to the exception instead
+    """
+    deadline = deadlines.resolve(deadline)
+    lane = lane or lanes.current() or lanes.BULK
+    cache = cache if cache is not None else MeterCache()
+    executor = executor or shared_executor()
+    futures = {}
+    for artist_id in artist_ids:
+        if artist_id not in futures:
+            futures[artist_id] = executor.submit(compute, api_client, artist_id, deadline, cache, lane)
+    results = {}
+    for artist_id, future in futures.items():
+        try:
+            results[artist_id] = future.result()
+        except Exception as e:
+            results[artist_id] = e
+    return results
+
+
+# PROGRESSIVE PROFILES
+#
+# A preview needs two requests, the artist and its top tracks, sent
+# concurrently, so provisional PMM and BFF scores are available almost at
+# once. The full discography pass then refines them album by album. Every
+# profile is marked provisional until the last one, which matches
+# calculate_pmm and find_bff.
+
+def _profile(artist_id, name, mimim, final, source, explicit, tracks_read, collaborators, albums_read=None):
+    bff = pick_bff(collaborators)
+    return types.MappingProxyType({
+        "artist_id": artist_id,
+        "name": name,
+        "status": "final" if final else "provisional",
+        "final": final,
+        "source": source,
+        "pmm_score": explicit / tracks_read * 100 if tracks_read else 0.0,
+        "mimim": mimim,
+        "bff": types.MappingProxyType(bff) if bff else None,
+        "tracks_read": tracks_read,
+        "albums_read": albums_read
+    })
+
+
+def _count_explicit(tracks):
+    return sum(1 for track in tracks if track.get("explicit", False))
+
+
+def _tracks_profile(artist_id, name, mimim, tracks, final, source, albums_read=None):
+    return _profile(artist_id, name, mimim, final, source, _count_explicit(tracks), len(tracks),
+                    count_collaborators(artist_id, tracks), albums_read)
+
+
+def preview_profile(api_client, artist_id, market="US", deadline=None, cache=None, executor=None, lane=None):
+    """
+    Provisional profile from one artist call and one top-tracks call, sent
+    concurrently. PMM and BFF are over the top tracks only; MIMIM is final
+    """
+    deadline = deadlines.resolve(deadline)
+    lane = lane or lanes.current()
+    executor = executor or preview_executor()
+
+    def top_tracks():
+        with deadlines.scope(deadline), lanes.scope(lane):
+            return api_client.get_artist_top_tracks(artist_id, market=market)
+
+    top_tracks_future = executor.submit(top_tracks)
+    with deadlines.scope(deadline), lanes.scope(lane):
+        artist_data = api_client.get_artist(artist_id)
+        mimim = _cached(cache, ("mimim", artist_id), lambda: _mimim_result(artist_data))
+    tracks = [track for track in top_tracks_future.result().get("tracks", []) if track]
+    return _tracks_profile(artist_id, artist_data.get("name"), mimim, tracks, False, "top_tracks")
+
+
+def iter_profile(api_client, artist_id, market="US", deadline=None, cache=None, lane=None):
+    """
+    Yields the preview profile, a provisional profile after each album of
+    the full discography pass, then the final profile. A discography already
+    in cache is used as is; one fetched here is added to it
+    """
+    deadline = deadlines.resolve(deadline)
+    lane = lane or lanes.current()
+    preview = preview_profile(api_client, artist_id, market, deadline, cache, lane=lane)
+    yield preview
+    name, mimim = preview["name"], preview["mimim"]
+
+    if cache is not None and ("tracks", artist_id) in cache:
+        with deadlines.scope(deadline), lanes.scope(lane):
+            tracks = fetch_tracks(api_client, artist_id, cache)
+        yield _tracks_profile(artist_id, name, mimim, tracks, True, "discography")
+        return
+
+    # running tallies, so each update costs one album rather than the
+    # whole discography read so far
+    tracks = []
+    explicit = 0
+    collaborators = {}
+    albums_read = 0
+    for album, album_tracks in api_client.iter_artist_discography(artist_id, deadline=deadline, lane=lane):
+        tracks.extend(album_tracks)
+        explicit += _count_explicit(album_tracks)
+        count_collaborators(artist_id, album_tracks, collaborators)
+        albums_read += 1
+        yield _profile(artist_id, name, mimim, False, "discography", explicit, len(tracks), collaborators,
+                       albums_read)
+    if cache is not None:
+        cached = cache.get(("tracks", artist_id), lambda: tracks)
+        if cached is not tracks:
+            # another caller fetched the discography first; score its copy
+            yield _tracks_profile(artist_id, name, mimim, cached, True, "discography", albums_read)
+            return
+    yield _profile(artist_id, name, mimim, True, "discography", explicit, len(tracks), collaborators, albums_read)
+
+
+def stream_profile(api_client, artist_id, on_update, market="US", deadline=None, cache=None, lane=None):
+    """
+    Runs iter_profile on a background thread, calling on_update with every
+    profile. Returns a Future of the final profile
+    """
+    from concurrent.futures import Future
+    future = Future()
+    lane = lane or lanes.current()
+
+    def run():
+        try:
+            profile = None
+            for profile in iter_profile(api_client, artist_id, market, deadline, cache, lane):
+                on_update(profile)
+            future.set_result(profile)
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="statify-profile", daemon=True).start()
+    return future
+
+
 # STATIFY CLASSES
 
 class potty_mouth_meter(object):
     """
     Calculates the Potty Mouth Meter (PMM) for an artist.
     PMM is the percentage of explicit tracks in an artist's discography.
+
+    artist_id and artist_pmm_score hold this meter's last result and are
+    only kept for older callers; when threads share a meter they may come
+    from another thread's call, so use the returned score instead.
     """
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, cache=None):
         self.api_client = api_client
-        self.artist_id = None
-        self.artist_pmm_score = None
+        self.cache = cache
+        # (artist_id, score) of the last call, replaced in one assignment
+        self.last = (None, None)
+
+    @property
+    def artist_id(self):
+        return self.last[0]
+
+    @property
+    def artist_pmm_score(self):
+        return self.last[1]
     
-    def calculate_pmm(self, artist_id):
-        """Calculate the Potty Mouth Meter score for an artist."""
-        self.artist_id = artist_id
-        tracks = self.api_client.get_all_tracks_by_artist(artist_id)
-        
-        if not tracks:
-            self.artist_pmm_score = 0.0
-            return self.artist_pmm_score
-            
-        explicit_count = sum(1 for track in tracks if track.get("explicit", False))
-        total_count = len(tracks)
-        
-        self.artist_pmm_score = (explicit_count / total_count) * 100 if total_count > 0 else 0.0
-        return self.artist_pmm_score
+    def calculate_pmm(self, artist_id, deadline=None, lane=None):
+        """
+        Calculate the Potty Mouth Meter score for an artist. If the deadline
+        runs out, DeadlineExceeded.partial holds the score over the tracks
+        read so far.
+        """
+        score = compute_pmm(self.api_client, artist_id, deadline, self.cache, lane)
+        self.last = (artist_id, score)
+        return score
+
+    def calculate_many(self, artist_ids, deadline=None, lane=None):
+        """PMM scores for many artists, computed concurrently: {artist_id: score}."""
+        return calculate_many(compute_pmm, self.api_client, artist_ids, deadline, self.cache, lane=lane)
+
+    def estimate_pmm(self, artist_id, time_budget=2.0, request_budget=None, confidence=0.95, seed=None,
+                     deadline=None, lane=None):
+        """
+        Approximate PMM for artists with large catalogues. Albums are sampled,
+        stratified by album type and release year, until the time budget
+        (seconds) or request budget (HTTP calls) runs out or every album has
+        been read. Returns the last estimate from iter_pmm_estimates.
+
+        The time budget ends sampling gracefully, also cutting short a call
+        still in flight when it runs out; a deadline is a hard limit on every
+        HTTP call and raises DeadlineExceeded with the latest estimate as
+        partial.
+        """
+        estimate = None
+        with deadlines.scope(deadline), lanes.scope(lane):
+            try:
+                for estimate in self.iter_pmm_estimates(artist_id, confidence=confidence, seed=seed,
+                                                        time_budget=time_budget):
+                    if estimate["exact"]:
+                        break
+                    if request_budget is not None and estimate["requests"] >= request_budget:
+                        break
+            except deadlines.DeadlineExceeded as e:
+                raise deadlines.DeadlineExceeded(
+                    f"Deadline exceeded estimating PMM for artist {artist_id}", partial=estimate) from e
+        self.last = (artist_id, estimate["pmm_score"])
+        return estimate
+
+    def iter_pmm_estimates(self, artist_id, confidence=0.95, seed=None, time_budget=None):
+        """
+        Yields a refined PMM estimate after every sampled album, ending with
+        the exact score once all albums have been read. Each estimate is a
+        dict with pmm_score, the confidence interval (lower, upper) and
+        whether it is exact. With a time_budget (seconds) every HTTP call is
+        capped at the time left, and iteration ends with the estimate so far
+        once it runs out, even during the album listing.
+        """
+        import random
+        budget = deadlines.Deadline(time_budget) if time_budget is not None else None
+        albums, requests, listed = self._list_albums(artist_id, budget=budget)
+        strata = {}
+        for album in albums:
+            strata.setdefault(self._album_stratum(album), []).append(album)
+        rng = random.Random(seed)
+        for members in strata.values():
+            rng.shuffle(members)
+
+        samples = {key: [] for key in strata}
+        sampled = 0
+        if not albums or not listed:
+            yield self._pmm_estimate(strata, samples, confidence, requests, sampled, listed)
+            return
+
+        while sampled < len(albums):
+            # Proportional allocation: read next from the stratum furthest
+            # below its share of the albums sampled so far
+            key = max(
+                (k for k in strata if len(samples[k]) < len(strata[k])),
+                key=lambda k: len(strata[k]) * (sampled + 1) / len(albums) - len(samples[k])
+            )
+            album = strata[key][len(samples[key])]
+            response = self._within_budget(budget, self.api_client.get_album_tracks, album.get("id"))
+            if response is None:
+                if not sampled:
+                    yield self._pmm_estimate(strata, samples, confidence, requests, sampled)
+                return
+            tracks = response.get("items", [])
+            requests += 1
+            sampled += 1
+            explicit = sum(1 for track in tracks if track.get("explicit", False))
+            samples[key].append((explicit, len(tracks)))
+            yield self._pmm_estimate(strata, samples, confidence, requests, sampled)
+
+    @staticmethod
+    def _within_budget(budget, call, *args, **kwargs):
+        """
+        call(*args, **kwargs) with its HTTP calls capped at budget as well as
+        the deadline in effect. Returns None once the budget, not the
+        deadline, has run out
+        """
+        if budget is None:
+            return call(*args, **kwargs)
+        hard = deadlines.current()
+        if budget.expired():
+            return None
+        try:
+            with deadlines.scope(budget):
+                return call(*args, **kwargs)
+        except deadlines.DeadlineExceeded:
+            if not budget.expired() or (hard is not None and hard.expired()):
+                raise
+            return None
+
+    def _list_albums(self, artist_id, include_groups="album,single", budget=None):
+        """(albums, requests, whether the listing is complete) within budget."""
+        albums = []
+        requests = 0
+        offset = 0
+        limit = 50
+        while True:
+            response = self._within_budget(budget, self.api_client.get_albums_by_artist, artist_id,
+                                           include_groups=include_groups, limit=limit, offset=offset)
+            if response is None:
+                return albums, requests, False
+            requests += 1
+            page = [album for album in response.get("items", []) if album.get("id")]
+            albums.extend(page)
+            if len(response.get("items", [])) < limit:
+                break
+            offset += limit
+        return albums, requests, True
+
+    @staticmethod
+    def _album_stratum(album):
+        release_date = album.get("release_date") or ""
+        return (album.get("album_type") or "album", release_date[:4])
+
+    @staticmethod
+    def _pmm_estimate(strata, samples, confidence, requests, sampled, listed=True):
+        """
+        Stratified ratio estimate of explicit tracks / tracks. Strata not
+        yet sampled are collapsed into the sampled ones in proportion to
+        their size. listed is False when only part of the album listing was
+        read; the estimate is then never exact.
+        """
+        import statistics
+        total_albums = sum(len(members) for members in strata.values())
+        observed = {k: v for k, v in samples.items() if v}
+        result = {
+            "pmm_score": 0.0,
+            "lower": 0.0,
+            "upper": 100.0,
+            "confidence": confidence,
+            "exact": listed and sampled == total_albums,
+            "albums_sampled": sampled,
+            "albums_total": total_albums,
+            "requests": requests
+        }
+        if not observed:
+            if result["exact"]:
+                result["upper"] = 0.0
+            return result
+
+        scale = total_albums / sum(len(strata[k]) for k in observed)
+        weights = {k: len(strata[k]) * scale for k in observed}
+        explicit_total = sum(weights[k] * statistics.fmean(e for e, _ in v) for k, v in observed.items())
+        track_total = sum(weights[k] * statistics.fmean(t for _, t in v) for k, v in observed.items())
+        if track_total == 0:
+            ratio = 0.0
+        else:
+            ratio = explicit_total / track_total
+
+        if result["exact"] or track_total == 0:
+            margin = 0.0
+        else:
+            # Linearised variance of the ratio estimator; strata with a single
+            # album borrow the pooled residual variance
+            residuals = {k: [e - ratio * t for e, t in v] for k, v in observed.items()}
+            pooled = [d for values in residuals.values() for d in values]
+            pooled_var = statistics.variance(pooled) if len(pooled) > 1 else (ratio * track_total / sampled) ** 2
+            variance = 0.0
+            for k, values in residuals.items():
+                n, N = len(values), weights[k]
+                stratum_var = statistics.variance(values) if n > 1 else pooled_var
+                variance += N * N * max(0.0, 1 - n / N) * stratum_var / n
+            z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+            margin = z * variance ** 0.5 / track_total
+
+        result["pmm_score"] = ratio * 100
+        result["lower"] = max(0.0, ratio - margin) * 100
+        result["upper"] = min(1.0, ratio + margin) * 100
+        return result
 
 
 class mom_i_made_it_meter(object):
     """
     Calculates the Mom I Made It Meter (MIMIM) for an artist.
     MIMIM combines popularity score and follower count to measure mainstream success.
+
+    artist_id, artist_mimim_score, popularity_rating and followers_count
+    hold this meter's last result and are only kept for older callers; when
+    threads share a meter use the returned result instead.
     """
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, cache=None):
         self.api_client = api_client
-        self.artist_id = None
-        self.artist_mimim_score = None
-        self.popularity_rating = None
-        self.followers_count = None
+        self.cache = cache
+        # (artist_id, result) of the last call, replaced in one assignment
+        self.last = (None, None)
+
+    def _last_field(self, key):
+        result = self.last[1]
+        return result[key] if result else None
+
+    @property
+    def artist_id(self):
+        return self.last[0]
+
+    @property
+    def artist_mimim_score(self):
+        return self._last_field("mimim_score")
+
+    @property
+    def popularity_rating(self):
+        return self._last_field("popularity")
+
+    @property
+    def followers_count(self):
+        return self._last_field("followers")
     
-    def calculate_mimim(self, artist_id):
+    def calculate_mimim(self, artist_id, deadline=None, lane=None):
         """Calculate the Mom I Made It Meter score for an artist."""
-        self.artist_id = artist_id
-        artist_data = self.api_client.get_artist(artist_id)
-        
-        self.popularity_rating = artist_data.get("popularity", 0)
-        self.followers_count = artist_data.get("followers", {}).get("total", 0)
-        
-        # Calculate MIMIM score as a weighted combination of popularity and followers
-        # Normalize followers to a 0-100 scale (assuming 10M followers = 100)
-        normalized_followers = min((self.followers_count / 10000000) * 100, 100)
-        
-        # Weight: 60% popularity, 40% followers
-        self.artist_mimim_score = (self.popularity_rating * 0.6) + (normalized_followers * 0.4)
-        
-        return {
-            "mimim_score": round(self.artist_mimim_score, 2),
-            "popularity": self.popularity_rating,
-            "followers": self.followers_count
-        }
+        result = compute_mimim(self.api_client, artist_id, deadline, self.cache, lane)
+        self.last = (artist_id, result)
+        return result
+
+    def calculate_many(self, artist_ids, deadline=None, lane=None):
+        """MIMIM results for many artists, computed concurrently: {artist_id: result}."""
+        return calculate_many(compute_mimim, self.api_client, artist_ids, deadline, self.cache, lane=lane)
 
 
 class bff_picker(object):
     """
     Finds the BFF (Best Friend Forever) for an artist.
     BFF is the most frequently collaborating artist based on track features.
+
+    artist_id and artist_bff hold this meter's last result and are only
+    kept for older callers; when threads share a meter use the returned BFF
+    instead.
     """
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, cache=None):
         self.api_client = api_client
-        self.artist_id = None
-        self.artist_bff = None
-        self.collaborator_counts = {}
+        self.cache = cache
+        # (artist_id, bff) of the last call, replaced in one assignment
+        self.last = (None, None)
+
+    @property
+    def artist_id(self):
+        return self.last[0]
+
+    @property
+    def artist_bff(self):
+        return self.last[1]
     
-    def find_bff(self, artist_id):
-        """Find the most frequent collaborating artist."""
-        self.artist_id = artist_id
-        tracks = self.api_client.get_all_tracks_by_artist(artist_id)
-        
-        if not tracks:
-            self.artist_bff = None
-            return None
-        
-        # Count collaborators from track artists
-        for track in tracks:
-            artists = track.get("artists", [])
-            # Skip if only one artist (no collaboration)
-            if len(artists) <= 1:
-                continue
-                
-            for artist in artists:
-                collaborator_id = artist.get("id")
-                collaborator_name = artist.get("name")
-                
-                # Skip the main artist
-                if collaborator_id == artist_id:
-                    continue
-                    
-                if collaborator_id not in self.collaborator_counts:
-                    self.collaborator_counts[collaborator_id] = {
-                        "name": collaborator_name,
-                        "count": 0
-                    }
-                self.collaborator_counts[collaborator_id]["count"] += 1
-        
-        if not self.collaborator_counts:
-            self.artist_bff = None
-            return None
-        
-        # Find the most frequent collaborator
-        bff_id = max(self.collaborator_counts.keys(), 
-                    key=lambda x: self.collaborator_counts[x]["count"])
-        
-        self.artist_bff = {
-            "id": bff_id,
-            "name": self.collaborator_counts[bff_id]["name"],
-            "collaboration_count": self.collaborator_counts[bff_id]["count"]
-        }
-        
-        return self.artist_bff
+    def find_bff(self, artist_id, deadline=None, lane=None):
+        """
+        Find the most frequent collaborating artist. If the deadline runs
+        out, DeadlineExceeded.partial holds the BFF over the tracks read so
+        far.
+        """
+        bff = compute_bff(self.api_client, artist_id, deadline, self.cache, lane)
+        self.last = (artist_id, bff)
+        return bff
 
+    def calculate_many(self, artist_ids, deadline=None, lane=None):
+        """BFFs for many artists, computed concurrently: {artist_id: bff or None}."""
+        return calculate_many(compute_bff, self.api_client, artist_ids, deadline, self.cache, lane=lane)
@@ -2,6 +2,11 @@ import unittest
 from unittest.mock import Mock, patch, MagicMock
 import datetime
 import json
+import os
+import subprocess
+import sys
+import tempfile
+import api_client
 from api_client import SpotifyAPI
 
 
@@ -279,6 +284,20 @@ class TestSpotifyAPI(unittest.TestCase):
             mock_albums.assert_called_once()
             self.assertEqual(mock_tracks.call_count, 2)
     
+    def test_iter_artist_discography(self):
+        albums_response = {"items": [{"id": "album1"}, {"id": "album2"}]}
+        tracks_response = {"items": [{"id": "track1"}]}
+        
+        with patch.object(self.api, 'get_albums_by_artist', return_value=albums_response), \
+             patch.object(self.api, 'get_album_tracks', return_value=tracks_response) as mock_tracks:
+            
+            discography = self.api.iter_artist_discography("artist_id")
+            album, tracks = next(discography)
+            
+            self.assertEqual(album["id"], "album1")
+            self.assertEqual(tracks, [{"id": "track1"}])
+            self.assertEqual(mock_tracks.call_count, 1)  # albums are fetched lazily
+    
     @patch('api_client.requests.get')
     def test_get_multiple_tracks_success(self, mock_get):
         mock_response = Mock()
@@ -310,6 +329,36 @@ class TestSpotifyAPI(unittest.TestCase):
             
             self.assertIn("Failed to get multiple tracks", str(context.exception))
     
+    @patch('api_client.requests.get')
+    def test_get_multiple_artists_success(self, mock_get):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "artists": [
+                {"id": "artist1", "popularity": 50},
+                {"id": "artist2", "popularity": 60}
+            ]
+        }
+        mock_get.return_value = mock_response
+        
+        with patch.object(self.api, 'get_resource_header', return_value={"Authorization": "Bearer test_token"}):
+            result = self.api.get_multiple_artists(["artist1", "artist2"])
+            
+            self.assertEqual(len(result["artists"]), 2)
+            self.assertEqual(mock_get.call_args.kwargs["params"], {"ids": "artist1,artist2"})
+    
+    @patch('api_client.requests.get')
+    def test_get_multiple_artists_failure(self, mock_get):
+        mock_response = Mock()
+        mock_response.status_code = 400
+        mock_get.return_value = mock_response
+        
+        with patch.object(self.api, 'get_resource_header', return_value={"Authorization": "Bearer test_token"}):
+            with self.assertRaises(Exception) as context:
+                self.api.get_multiple_artists(["invalid_artist_id"])
+            
+            self.assertIn("Failed to get multiple artists", str(context.exception))
+    
     @patch('api_client.requests.get')
     def test_get_artist_top_tracks_success(self, mock_get):
         mock_response = Mock()
@@ -390,5 +439,45 @@ class TestSpotifyAPI(unittest.TestCase):
             self.assertEqual(result["followers"], 0)
 
 
+class TestCredentials(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.config_dir.name, "config.ini")
+        with open(self.config_path, "w") as f:
+            f.write("[spotify]\nclient_id = file_id\nclient_secret = file_secret\n")
+
+    def tearDown(self):
+        self.config_dir.cleanup()
+
+    def test_constructor_arguments_win(self):
+        with patch.dict(os.environ, {"SPOTIFY_CLIENT_ID": "env_id", "SPOTIFY_CLIENT_SECRET": "env_secret"}):
+            api = SpotifyAPI("arg_id", "arg_secret", config_path=self.config_path)
+        self.assertEqual(api.client_id, "arg_id")
+        self.assertEqual(api.client_secret, "arg_secret")
+
+    def test_environment_before_config_file(self):
+        with patch.dict(os.environ, {"SPOTIFY_CLIENT_ID": "env_id", "SPOTIFY_CLIENT_SECRET": "env_secret"}):
+            api = SpotifyAPI(config_path=self.config_path)
+        self.assertEqual(api.client_id, "env_id")
+        self.assertEqual(api.client_secret, "env_secret")
+
+    def test_config_file_fallback(self):
+        env = {k: v for k, v in os.environ.items() if not k.startswith("SPOTIFY_CLIENT_")}
+        with patch.dict(os.environ, env, clear=True):
+            api = SpotifyAPI(config_path=self.config_path)
+        self.assertEqual(api.client_id, "file_id")
+        self.assertEqual(api.client_secret, "file_secret")
+
+    def test_missing_config_file(self):
+        self.assertEqual(api_client.read_config_credentials("/nonexistent/config.ini"), (None, None))
+
+    def test_import_does_not_load_requests(self):
+        probe = "import sys, statify, api_client; print('requests' in sys.modules)"
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.strip(), "False")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
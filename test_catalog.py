@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from api_client import SpotifyAPI
+from catalog import Catalog
+import catalog
+from fake_spotify import FakeSpotify
+import models
+import statify
+
+
+ALBUMS = {"items": [{"id": "album1", "name": "Album 1", "album_type": "album",
+                     "release_date": "2020-01-01", "artists": [{"id": "artist_id", "name": "Main"}]}]}
+TRACKS = {"items": [
+    {"id": "track1", "name": "Track 1", "explicit": True,
+     "artists": [{"id": "artist_id", "name": "Main"}, {"id": "feat1", "name": "Feat One"}]},
+    {"id": "track2", "name": "Track 2", "explicit": False,
+     "artists": [{"id": "artist_id", "name": "Main"}, {"id": "feat1", "name": "Feat One"},
+                 {"id": "feat2", "name": "Feat Two"}]},
+    {"id": "track3", "name": "Track 3", "explicit": True,
+     "artists": [{"id": "artist_id", "name": "Main"}]},
+    {"id": "track4", "name": "Track 4", "explicit": False,
+     "artists": [{"id": "artist_id", "name": "Main"}]}
+]}
+ARTIST = {"id": "artist_id", "name": "Main", "popularity": 80, "followers": {"total": 5000000}}
+
+
+def fake_get(url, headers=None, params=None, **kwargs):
+    response = Mock()
+    response.status_code = 200
+    if url.endswith("/artists/artist_id/albums"):
+        response.json.return_value = ALBUMS
+    elif url.endswith("/albums/album1/tracks"):
+        response.json.return_value = TRACKS
+    elif url.endswith("/artists/artist_id"):
+        response.json.return_value = ARTIST
+    else:
+        response.status_code = 404
+    return response
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = Catalog()
+        self.api = SpotifyAPI("test_client_id", "test_client_secret", catalog=self.catalog)
+        self.header_patch = patch.object(self.api, 'get_resource_header',
+                                         return_value={"Authorization": "Bearer test_token"})
+        self.header_patch.start()
+
+    def tearDown(self):
+        self.header_patch.stop()
+        self.catalog.close()
+
+    @patch('api_client.requests.get', side_effect=fake_get)
+    def test_metrics_match_meters(self, mock_get):
+        pmm = statify.potty_mouth_meter(self.api).calculate_pmm("artist_id")
+        mimim = statify.mom_i_made_it_meter(self.api).calculate_mimim("artist_id")
+        bff = statify.bff_picker(self.api).find_bff("artist_id")
+
+        self.assertEqual(self.catalog.calculate_pmm("artist_id"), pmm)
+        self.assertEqual(self.catalog.calculate_mimim("artist_id"), mimim)
+        self.assertEqual(self.catalog.find_bff("artist_id"), bff)
+        self.assertEqual(bff["id"], "feat1")
+
+    @patch('api_client.requests.get', side_effect=fake_get)
+    def test_only_listed_albums_are_scored(self, mock_get):
+        pmm = statify.potty_mouth_meter(self.api).calculate_pmm("artist_id")
+        bff = statify.bff_picker(self.api).find_bff("artist_id")
+        # an album seen elsewhere (e.g. in a search) that credits the artist
+        # but was not in its albums listing
+        self.catalog.add_albums([{"id": "other", "artists": [{"id": "artist_id", "name": "Main"}]}])
+        self.catalog.add_tracks([{"id": f"other{i}", "explicit": True,
+                                  "artists": [{"id": "artist_id", "name": "Main"}, {"id": "feat3", "name": "F"}]}
+                                 for i in range(5)], album_id="other")
+        self.assertEqual(self.catalog.calculate_pmm("artist_id"), pmm)
+        self.assertEqual(self.catalog.find_bff("artist_id"), bff)
+
+    def test_upgrade_refetches_discographies(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "old.db")
+            conn = sqlite3.connect(path)
+            conn.executescript(catalog.SCHEMA.split("CREATE TABLE IF NOT EXISTS discography")[0])
+            conn.execute("INSERT INTO artists (id, discography_fetched_at) VALUES ('artist_id', '2024-01-01')")
+            conn.commit()
+            conn.close()
+            upgraded = Catalog(path)
+            self.assertFalse(upgraded.has_discography("artist_id"))
+            upgraded.close()
+
+    def test_unknown_artist(self):
+        self.assertIsNone(self.catalog.calculate_pmm("missing"))
+        self.assertIsNone(self.catalog.calculate_mimim("missing"))
+        self.assertIsNone(self.catalog.find_bff("missing"))
+
+    @patch('api_client.requests.get', side_effect=fake_get)
+    def test_partial_discography_is_not_scored(self, mock_get):
+        self.api.get_albums_by_artist("artist_id")
+        self.api.get_album_tracks("album1")
+        self.assertIsNone(self.catalog.calculate_pmm("artist_id"))
+
+    def test_simplified_artist_keeps_popularity(self):
+        self.catalog.add_artists([ARTIST])
+        self.catalog.add_tracks(TRACKS["items"], album_id="album1")
+        self.assertEqual(self.catalog.calculate_mimim("artist_id")["popularity"], 80)
+
+    def test_full_track_links_embedded_album(self):
+        self.catalog.add_tracks([{"id": "t", "name": "T", "explicit": True,
+                                  "album": {"id": "a", "name": "A", "album_type": "single"},
+                                  "artists": [{"id": "x", "name": "X"}]}])
+        row = self.catalog.conn.execute("SELECT album_id, explicit FROM tracks WHERE id = 't'").fetchone()
+        self.assertEqual(row, ("a", 1))
+
+    @unittest.skipUnless(models.AVAILABLE, "msgspec is not installed")
+    def test_fast_decode_records_the_same_rows(self):
+        def rows(fast_decode):
+            catalog = Catalog()
+            fake = FakeSpotify.synthetic(n_albums=3, tracks_per_album=3)
+            api = SpotifyAPI("test_client_id", "test_client_secret", catalog=catalog, transport=fake,
+                             fast_decode=fast_decode)
+            api.get_album("artist0-album0")
+            api.get_multiple_albums(["artist0-album1"])
+            api.get_track("artist0-album2-track0")
+            api.get_multiple_tracks(["artist0-album2-track1"])
+            api.search_artists("artist0")
+            result = catalog.conn.execute("SELECT id, album_id, explicit FROM tracks ORDER BY id").fetchall()
+            catalog.close()
+            return result
+
+        fast = rows(True)
+        self.assertEqual(fast, rows(False))
+        self.assertEqual(len(fast), 8)
+        self.assertTrue(all(album_id for _, album_id, _ in fast))
+
+    def test_indexes_exist(self):
+        names = {r[0] for r in self.catalog.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({"idx_track_artists_artist", "idx_tracks_album", "idx_tracks_explicit"} <= names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import crawler
+
+
+class GraphClient(object):
+    """Artist i collaborates with artists 2i+1 and 2i+2 (a binary tree)."""
+
+    def __init__(self, size=31):
+        self.size = size
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.fetched = []
+        self.broken = set()
+
+    def get_all_tracks_by_artist(self, artist_id):
+        with self.lock:
+            self.request_count += 2
+            self.fetched.append(artist_id)
+        if artist_id in self.broken:
+            raise Exception(f"Failed to get albums for artist {artist_id}: 500")
+        i = int(artist_id[1:])
+        tracks = [{"explicit": True, "artists": [{"id": artist_id}]}]
+        for child in (2 * i + 1, 2 * i + 2):
+            if child < self.size:
+                tracks.append({"explicit": False, "artists": [{"id": artist_id}, {"id": f"a{child}", "name": "x"}]})
+        return tracks
+
+
+class TestFingerprintSet(unittest.TestCase):
+
+    def test_add_grow_and_round_trip(self):
+        seen = crawler.FingerprintSet(capacity=16)
+        for i in range(1000):
+            self.assertTrue(seen.add(f"artist{i}"))
+        self.assertFalse(seen.add("artist5"))
+        self.assertEqual(len(seen), 1000)
+        restored = crawler.FingerprintSet.from_bytes(seen.to_bytes(), len(seen))
+        self.assertIn("artist999", restored)
+        self.assertNotIn("unknown", restored)
+
+    def test_capacity_rounds_up_to_a_power_of_two(self):
+        seen = crawler.FingerprintSet(capacity=1000)
+        self.assertEqual(len(seen.slots), 1024)
+        for i in range(2000):
+            seen.add(f"artist{i}")
+        self.assertEqual(len(seen), 2000)
+
+
+class TestCollaborationCrawler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmp.name, "crawl.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_crawls_whole_graph_once(self):
+        client = GraphClient()
+        results = []
+        stats = crawler.CollaborationCrawler(client, ["a0", "a0"], max_workers=4,
+                                             on_result=results.append).run()
+        self.assertEqual(stats["crawled"], 31)
+        self.assertEqual(sorted(client.fetched), sorted(f"a{i}" for i in range(31)))
+        record = next(r for r in results if r["artist_id"] == "a0")
+        self.assertEqual(record["depth"], 0)
+        self.assertAlmostEqual(record["pmm"], 100 / 3)
+        self.assertEqual(set(record["collaborators"]), {"a1", "a2"})
+
+    def test_max_depth(self):
+        client = GraphClient()
+        stats = crawler.CollaborationCrawler(client, ["a0"], max_depth=2).run()
+        self.assertEqual(stats["crawled"], 7)
+
+    def test_checkpoint_and_resume(self):
+        client = GraphClient()
+        results_path = os.path.join(self.tmp.name, "results.jsonl")
+        first = crawler.CollaborationCrawler(client, ["a0"], max_artists=10, max_workers=2,
+                                             checkpoint_path=self.checkpoint, results_path=results_path)
+        self.assertEqual(first.run()["crawled"], 10)
+        with open(self.checkpoint) as f:
+            self.assertTrue(json.load(f)["frontier"])
+
+        resumed = crawler.CollaborationCrawler.resume(client, self.checkpoint, results_path=results_path)
+        self.assertEqual(resumed.run()["crawled"], 31)
+        self.assertEqual(len(set(client.fetched)), 31)
+        with open(results_path) as f:
+            self.assertEqual(len(f.readlines()), 31)
+
+    def test_resume_after_crash_writes_no_duplicates(self):
+        client = GraphClient()
+        results_path = os.path.join(self.tmp.name, "results.jsonl")
+        crawler.CollaborationCrawler(client, ["a0"], max_artists=10, max_workers=2,
+                                     checkpoint_path=self.checkpoint, results_path=results_path).run()
+        shutil.copy(self.checkpoint, self.checkpoint + ".old")
+        crawler.CollaborationCrawler.resume(client, self.checkpoint, results_path=results_path,
+                                            max_artists=20).run()
+        # the process dies before its checkpoint lands, mid-way through a record
+        os.replace(self.checkpoint + ".old", self.checkpoint)
+        with open(results_path, "a") as f:
+            f.write('{"artist_id": "a3')
+
+        stats = crawler.CollaborationCrawler.resume(client, self.checkpoint, results_path=results_path).run()
+        self.assertEqual(stats["crawled"], 31)
+        with open(results_path) as f:
+            ids = [json.loads(line)["artist_id"] for line in f]
+        self.assertEqual(sorted(ids), sorted(f"a{i}" for i in range(31)))
+
+    def test_failed_artists_are_retried_and_checkpointed(self):
+        client = GraphClient(size=7)
+        client.broken.add("a2")
+        stats = crawler.CollaborationCrawler(client, ["a0"], max_attempts=2,
+                                             checkpoint_path=self.checkpoint).run()
+        self.assertEqual((stats["crawled"], stats["failed"]), (4, 1))
+        self.assertEqual(client.fetched.count("a2"), 2)
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)["failed_artists"], {"a2": 1})
+
+        client.broken.clear()
+        resumed = crawler.CollaborationCrawler.resume(client, self.checkpoint, retry_failed=True)
+        stats = resumed.run()
+        self.assertEqual((stats["crawled"], stats["failed"]), (7, 0))
+
+    def test_rate_budget_waits(self):
+        client = GraphClient(size=7)
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        crawler.CollaborationCrawler(client, ["a0"], max_workers=1, requests_per_second=2,
+                                     clock=lambda: now[0], sleep=sleep).run()
+        self.assertTrue(sleeps)
+        self.assertLessEqual(client.request_count, 2 * (now[0] + 1) + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import Mock, patch
+import os
+import statify
+from fake_spotify import FakeSpotify
+from fake_clock import FakeClock
+from credential_pool import PooledSpotifyAPI, NoCredentialAvailable, load_pool_credentials
+
+
+def response(status_code, payload=None, retry_after=None):
+    r = Mock()
+    r.status_code = status_code
+    r.json.return_value = payload or {}
+    r.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+    return r
+
+
+class TestPooledSpotifyAPI(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.clock.now += seconds
+
+        self.api = PooledSpotifyAPI([("id_one_xx", "secret1"), ("id_two_xx", "secret2")],
+                                    clock=self.clock, sleep=sleep, max_wait=30)
+        for i, credential in enumerate(self.api.pool):
+            credential.client.get_access_token = Mock(return_value=f"token{i}")
+
+    def tokens_used(self, mock_get):
+        return [call.kwargs["headers"]["Authorization"] for call in mock_get.call_args_list]
+
+    @patch('api_client.requests.get')
+    def test_spreads_load(self, mock_get):
+        mock_get.return_value = response(200, {"id": "artist_id"})
+        for _ in range(4):
+            self.api.get_artist("artist_id")
+        self.assertEqual(sorted(self.tokens_used(mock_get)), ["Bearer token0"] * 2 + ["Bearer token1"] * 2)
+
+    @patch('api_client.requests.get')
+    def test_throttled_credential_cools_down(self, mock_get):
+        mock_get.side_effect = [response(429, retry_after=10), response(200, {"id": "a"}),
+                                response(200, {"id": "b"}), response(200, {"id": "c"})]
+        self.assertEqual(self.api.get_artist("a")["id"], "a")
+        self.assertEqual(self.api.get_artist("b")["id"], "b")
+        used = self.tokens_used(mock_get)
+        self.assertEqual(used[1:], [used[1]] * 2)  # the throttled token is skipped
+        self.assertNotEqual(used[0], used[1])
+
+        self.clock.now = 11
+        self.api.get_artist("c")
+        self.assertEqual(self.tokens_used(mock_get)[-1], used[0])  # back in rotation, least loaded
+        metrics = self.api.pool_metrics()
+        self.assertEqual(sum(m["throttled"] for m in metrics), 1)
+
+    @patch('api_client.requests.get')
+    def test_waits_when_all_throttled(self, mock_get):
+        mock_get.side_effect = [response(429, retry_after=5), response(429, retry_after=8),
+                                response(200, {"id": "a"})]
+        self.assertEqual(self.api.get_artist("a")["id"], "a")
+        self.assertEqual(self.sleeps, [5])
+
+    @patch('api_client.requests.get')
+    def test_gives_up_after_max_wait(self, mock_get):
+        mock_get.return_value = response(429, retry_after=60)
+        with self.assertRaises(NoCredentialAvailable):
+            self.api.get_artist("a")
+
+    @patch('api_client.requests.get')
+    def test_zero_retry_after_is_bounded(self, mock_get):
+        mock_get.return_value = response(429, retry_after=0)
+        with self.assertRaises(NoCredentialAvailable):
+            self.api.get_artist("a")
+        self.assertEqual(mock_get.call_count, 4)   # two tries per credential
+        self.assertEqual(self.sleeps, [1.0])        # the minimum cooldown, not a busy loop
+
+    def test_drop_in_for_meters(self):
+        with patch.object(self.api, 'get_artist', return_value={"popularity": 80, "followers": {"total": 0}}):
+            result = statify.mom_i_made_it_meter(self.api).calculate_mimim("artist_id")
+        self.assertEqual(result["popularity"], 80)
+
+    @patch('requests.post', side_effect=AssertionError("token request bypassed the transport"))
+    def test_token_requests_use_the_pool_transport(self, mock_post):
+        fake = FakeSpotify.synthetic(n_albums=1, tracks_per_album=1)
+        api = PooledSpotifyAPI([("id_one_xx", "secret1"), ("id_two_xx", "secret2")], transport=fake)
+        for _ in range(4):
+            self.assertEqual(api.get_artist("artist0")["id"], "artist0")
+        self.assertEqual(fake.calls["token"], 2)
+        self.assertEqual(fake.calls["artists"], 4)
+        self.assertEqual(api.request_count, 6)
+        mock_post.assert_not_called()
+
+    def test_credentials_from_environment(self):
+        with patch.dict(os.environ, {"SPOTIFY_CREDENTIALS": "a:1, b:2"}):
+            self.assertEqual(load_pool_credentials(), [("a", "1"), ("b", "2")])
+            self.assertEqual(len(PooledSpotifyAPI().pool), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
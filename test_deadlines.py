@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import Mock, patch
+import requests
+import deadlines
+import statify
+from api_client import SpotifyAPI
+from fake_clock import FakeClock
+
+
+def ok_response(payload):
+    r = Mock()
+    r.status_code = 200
+    r.json.return_value = payload
+    return r
+
+
+class TestDeadlineScope(unittest.TestCase):
+
+    def test_nested_scope_only_shortens(self):
+        clock = FakeClock()
+        outer = deadlines.Deadline(10, clock=clock)
+        with deadlines.scope(outer):
+            with deadlines.scope(deadlines.Deadline(60, clock=clock)) as inner:
+                self.assertIs(inner, outer)
+            with deadlines.scope(deadlines.Deadline(1, clock=clock)) as inner:
+                self.assertEqual(inner.remaining(), 1)
+            self.assertIs(deadlines.current(), outer)
+        self.assertIsNone(deadlines.current())
+
+    def test_coerce_seconds(self):
+        self.assertIsNone(deadlines.coerce(None))
+        self.assertGreater(deadlines.coerce(5).remaining(), 4)
+
+
+class TestSpotifyAPIDeadlines(unittest.TestCase):
+
+    def setUp(self):
+        self.api = SpotifyAPI("test_client_id", "test_client_secret", timeout=10)
+        patcher = patch.object(self.api, 'get_resource_header', return_value={"Authorization": "Bearer test_token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('api_client.requests.get')
+    def test_default_timeout(self, mock_get):
+        mock_get.return_value = ok_response({"id": "artist_id"})
+        self.api.get_artist("artist_id")
+        self.assertEqual(mock_get.call_args.kwargs["timeout"], 10)
+
+    @patch('api_client.requests.get')
+    def test_remaining_time_is_the_timeout(self, mock_get):
+        mock_get.return_value = ok_response({"id": "artist_id"})
+        self.api.get_artist("artist_id", deadline=2)
+        self.assertLessEqual(mock_get.call_args.kwargs["timeout"], 2)
+
+    @patch('api_client.requests.get')
+    def test_expired_deadline_sends_nothing(self, mock_get):
+        clock = FakeClock()
+        deadline = deadlines.Deadline(1, clock=clock)
+        clock.now += 2
+        with self.assertRaises(deadlines.DeadlineExceeded):
+            self.api.search_artists("query", deadline=deadline)
+        mock_get.assert_not_called()
+
+    @patch('api_client.requests.get')
+    def test_socket_timeout_at_deadline(self, mock_get):
+        clock = FakeClock()
+        deadline = deadlines.Deadline(1, clock=clock)
+
+        def time_out(*args, **kwargs):
+            clock.now += 1
+            raise requests.exceptions.ReadTimeout()
+        mock_get.side_effect = time_out
+        with self.assertRaises(deadlines.DeadlineExceeded):
+            self.api.get_album_tracks("album_id", deadline=deadline)
+
+        mock_get.side_effect = requests.exceptions.ReadTimeout()
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.api.get_album_tracks("album_id")
+
+    def test_partial_tracks(self):
+        clock = FakeClock()
+        deadline = deadlines.Deadline(1, clock=clock)
+
+        def album_tracks(album_id, market=None):
+            clock.now += 0.6  # the deadline runs out during the second album
+            deadlines.current().check()
+            return {"items": [{"id": album_id + "-track", "explicit": True}]}
+
+        with patch.object(self.api, 'get_albums_by_artist', return_value={"items": [{"id": "a1"}, {"id": "a2"}]}), \
+             patch.object(self.api, 'get_album_tracks', side_effect=album_tracks):
+            with self.assertRaises(deadlines.DeadlineExceeded) as context:
+                self.api.get_all_tracks_by_artist("artist_id", deadline=deadline)
+        self.assertEqual(context.exception.partial, [{"id": "a1-track", "explicit": True}])
+
+    def test_meter_partial_result(self):
+        partial = [{"explicit": True, "artists": [{"id": "artist_id"}, {"id": "feat", "name": "Feat"}]},
+                   {"explicit": False, "artists": [{"id": "artist_id"}]}]
+        error = deadlines.DeadlineExceeded(partial=partial)
+        with patch.object(self.api, 'get_all_tracks_by_artist', side_effect=error):
+            with self.assertRaises(deadlines.DeadlineExceeded) as pmm:
+                statify.potty_mouth_meter(self.api).calculate_pmm("artist_id", deadline=5)
+            with self.assertRaises(deadlines.DeadlineExceeded) as bff:
+                statify.bff_picker(self.api).find_bff("artist_id", deadline=5)
+        self.assertEqual(pmm.exception.partial, {"pmm_score": 50.0, "tracks_read": 2})
+        self.assertEqual(bff.exception.partial["bff"]["id"], "feat")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import Mock, patch
+from api_client import SpotifyAPI
+import entities
+import statify
+
+
+FULL_ARTIST = {"id": "artist1", "type": "artist", "name": "Artist", "popularity": 70,
+               "followers": {"total": 5000}, "genres": []}
+SIMPLIFIED_ARTIST = {"id": "artist2", "type": "artist", "name": "Feat"}
+SIMPLIFIED_ALBUM = {"id": "album1", "type": "album", "name": "Album", "artists": [SIMPLIFIED_ARTIST]}
+FULL_TRACK = {"id": "track1", "type": "track", "name": "Track", "explicit": True, "popularity": 40,
+              "album": SIMPLIFIED_ALBUM, "artists": [SIMPLIFIED_ARTIST]}
+
+
+class TestEntityMap(unittest.TestCase):
+
+    def test_harvest_keeps_only_complete_entities(self):
+        entity_map = entities.EntityMap()
+        stored = entity_map.harvest({"artists": {"items": [FULL_ARTIST]}, "tracks": {"items": [FULL_TRACK]}})
+        self.assertEqual(stored, 2)
+        self.assertIs(entity_map.get("artists", "artist1"), FULL_ARTIST)
+        self.assertIs(entity_map.get("tracks", "track1"), FULL_TRACK)
+        self.assertIsNone(entity_map.get("artists", "artist2"))
+        self.assertIsNone(entity_map.get("albums", "album1"))
+        self.assertEqual(entity_map.stats(), {"entries": 2, "hits": 2, "misses": 2})
+
+    def test_full_album_is_complete(self):
+        album = dict(SIMPLIFIED_ALBUM, label="Label", tracks={"items": []})
+        self.assertEqual(entities.complete_type(album), "albums")
+        self.assertIsNone(entities.complete_type(SIMPLIFIED_ALBUM))
+
+    def test_entries_expire(self):
+        now = [0.0]
+        entity_map = entities.EntityMap(ttl=10, clock=lambda: now[0])
+        entity_map.put("artists", FULL_ARTIST)
+        now[0] = 11.0
+        self.assertIsNone(entity_map.get("artists", "artist1"))
+        self.assertEqual(len(entity_map), 0)
+
+    def test_least_recently_used_evicted(self):
+        entity_map = entities.EntityMap(max_entries=2)
+        for i in range(3):
+            entity_map.put("artists", dict(FULL_ARTIST, id=f"artist{i}"))
+        self.assertIsNone(entity_map.get("artists", "artist0"))
+        self.assertIsNotNone(entity_map.get("artists", "artist2"))
+
+
+class TestSpotifyAPIEntityMap(unittest.TestCase):
+
+    def setUp(self):
+        self.api = SpotifyAPI("test_client_id", "test_client_secret", entity_map=True)
+
+    def mock_response(self, payload):
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = payload
+        return response
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(SpotifyAPI("id", "secret").entity_map)
+
+    @patch('api_client.requests.get')
+    def test_search_answers_get_artist(self, mock_get):
+        mock_get.return_value = self.mock_response({"artists": {"items": [FULL_ARTIST]}})
+        with patch.object(self.api, 'get_resource_header', return_value={}):
+            self.api.search_artists("Artist", limit=1)
+            self.assertIs(self.api.get_artist("artist1"), FULL_ARTIST)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('api_client.requests.get')
+    def test_simplified_artist_still_fetched(self, mock_get):
+        mock_get.side_effect = [self.mock_response({"tracks": [FULL_TRACK]}),
+                                self.mock_response(dict(FULL_ARTIST, id="artist2"))]
+        with patch.object(self.api, 'get_resource_header', return_value={}):
+            self.api.get_multiple_tracks(["track1"])
+            self.assertIs(self.api.get_track("track1"), FULL_TRACK)
+            self.assertEqual(self.api.get_artist("artist2")["popularity"], 70)
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch('api_client.requests.get')
+    def test_several_albums_answers_get_album(self, mock_get):
+        album = dict(SIMPLIFIED_ALBUM, label="Label", tracks={"items": []})
+        mock_get.return_value = self.mock_response({"albums": [album, None]})
+        with patch.object(self.api, 'get_resource_header', return_value={}):
+            self.api.get_multiple_albums(["album1", "missing"])
+            self.assertIs(self.api.get_album("album1"), album)
+        self.assertEqual(mock_get.call_args.kwargs["params"], {"ids": "album1,missing"})
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('api_client.requests.get')
+    def test_mimim_after_search_saves_round_trip(self, mock_get):
+        mock_get.return_value = self.mock_response({"artists": {"items": [FULL_ARTIST]}})
+        with patch.object(self.api, 'get_resource_header', return_value={}):
+            self.api.search_artists("Artist", limit=1)
+            result = statify.mom_i_made_it_meter(self.api).calculate_mimim("artist1")
+        self.assertEqual(result["popularity"], 70)
+        self.assertEqual(mock_get.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
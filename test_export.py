@@ -0,0 +1,85 @@
+import unittest
+import csv
+import os
+import tempfile
+from unittest.mock import Mock
+import export
+
+
+DISCOGRAPHY = [
+    ({"id": "album1", "name": "Album 1", "album_type": "album", "release_date": "2020", "total_tracks": 2}, [
+        {"id": "track1", "name": "Track 1", "explicit": True,
+         "artists": [{"id": "artist_id"}, {"id": "feat1"}]},
+        {"id": "track2", "name": "Track 2", "explicit": False,
+         "artists": [{"id": "artist_id"}]},
+    ]),
+    ({"id": "album2", "name": "Album 2", "album_type": "single", "release_date": "2021", "total_tracks": 1}, [
+        {"id": "track3", "name": "Track 3", "explicit": True,
+         "artists": [{"id": "artist_id"}, {"id": "feat1"}, {"id": "feat2"}]},
+    ]),
+]
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_artist_stats(self):
+        tracks = [t for _, album_tracks in DISCOGRAPHY for t in album_tracks]
+        stats = export.artist_stats("artist_id", tracks)
+        self.assertAlmostEqual(stats["explicit_ratio"], 200 / 3)
+        self.assertEqual(stats["collaboration_tracks"], 2)
+        self.assertEqual(stats["distinct_collaborators"], 2)
+        self.assertEqual((stats["bff_id"], stats["bff_count"]), ("feat1", 2))
+
+    def test_csv_export(self):
+        with export.DiscographyExporter(self.tmp.name, "csv") as exporter:
+            exporter.write_artist("artist_id", iter(DISCOGRAPHY))
+            exporter.write_artist("other", iter([]))
+        with open(os.path.join(self.tmp.name, "tracks.csv")) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([r["track_id"] for r in rows], ["track1", "track2", "track3"])
+        self.assertEqual(rows[2]["album_id"], "album2")
+        with open(os.path.join(self.tmp.name, "artist_stats.csv")) as f:
+            stats = list(csv.DictReader(f))
+        self.assertEqual([s["artist_id"] for s in stats], ["artist_id", "other"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(Exception):
+            export.DiscographyExporter(self.tmp.name, "xlsx")
+
+    def test_export_artists_streams_from_client(self):
+        client = Mock()
+        client.iter_artist_discography.side_effect = lambda artist_id, **kwargs: iter(DISCOGRAPHY)
+        paths = export.export_artists(client, ["a", "b"], self.tmp.name, "csv")
+        self.assertEqual(client.iter_artist_discography.call_count, 2)
+        with open(paths["albums"]) as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 4)
+
+    @unittest.skipIf(export.pyarrow is None, "pyarrow is not installed")
+    def test_parquet_row_group_per_artist(self):
+        with export.DiscographyExporter(self.tmp.name, "parquet") as exporter:
+            exporter.write_artist("artist_id", DISCOGRAPHY)
+            exporter.write_artist("artist_2", DISCOGRAPHY)
+        parquet_file = export.pyarrow.parquet.ParquetFile(exporter.paths["tracks"])
+        self.assertEqual(parquet_file.num_row_groups, 2)
+        table = parquet_file.read()
+        self.assertEqual(table.num_rows, 6)
+        self.assertTrue(export.pyarrow.types.is_dictionary(table.schema.field("artist_id").type))
+
+    @unittest.skipIf(export.pyarrow is None, "pyarrow is not installed")
+    def test_ipc_export(self):
+        with export.DiscographyExporter(self.tmp.name, "ipc") as exporter:
+            exporter.write_artist("artist_id", DISCOGRAPHY)
+            exporter.write_artist("artist_2", DISCOGRAPHY[:1])
+        with export.pyarrow.OSFile(exporter.paths["albums"], "rb") as source:
+            table = export.pyarrow.ipc.open_stream(source).read_all()
+        self.assertEqual(table.column("album_id").to_pylist(), ["album1", "album2", "album1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import time
+import threading
+import unittest
+import deadlines
+import lanes
+import statify
+from api_client import SpotifyAPI
+from fake_spotify import FakeSpotify
+
+
+def wait_for(condition, timeout=5.0):
+    ends = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > ends:
+            raise AssertionError("condition not reached")
+        time.sleep(0.001)
+
+
+class TestLaneScope(unittest.TestCase):
+
+    def test_nested_scopes(self):
+        self.assertIsNone(lanes.current())
+        with lanes.scope(lanes.BULK):
+            with lanes.scope(None):
+                self.assertEqual(lanes.current(), lanes.BULK)
+            with lanes.scope(lanes.INTERACTIVE):
+                self.assertEqual(lanes.current(), lanes.INTERACTIVE)
+            self.assertEqual(lanes.current(), lanes.BULK)
+        self.assertIsNone(lanes.current())
+
+
+class TestLaneScheduler(unittest.TestCase):
+
+    def test_interactive_overtakes_bulk_backlog(self):
+        scheduler = lanes.LaneScheduler(max_in_flight=1)
+        scheduler.acquire(lanes.BULK)
+        order = []
+
+        def request(lane, name):
+            with scheduler.slot(lane):
+                order.append(name)
+
+        threads = []
+        for i in range(5):
+            threads.append(threading.Thread(target=request, args=(lanes.BULK, f"bulk{i}")))
+            threads[-1].start()
+            wait_for(lambda: len(scheduler.waiting) == i + 1)
+        threads.append(threading.Thread(target=request, args=(lanes.INTERACTIVE, "interactive")))
+        threads[-1].start()
+        wait_for(lambda: len(scheduler.waiting) == 6)
+
+        scheduler.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, ["interactive", "bulk0", "bulk1", "bulk2", "bulk3", "bulk4"])
+        metrics = scheduler.metrics()
+        self.assertEqual(metrics[lanes.BULK]["requests"], 6)
+        self.assertEqual(metrics[lanes.INTERACTIVE]["requests"], 1)
+        self.assertLessEqual(metrics[lanes.INTERACTIVE]["wait_max"], metrics[lanes.BULK]["wait_max"])
+
+    def test_weights_share_capacity(self):
+        scheduler = lanes.LaneScheduler(weights={"a": 3, "b": 1}, max_in_flight=1)
+        scheduler.acquire("a")
+        order = []
+
+        def request(lane):
+            with scheduler.slot(lane):
+                order.append(lane)
+
+        threads = []
+        for lane in ["b"] * 4 + ["a"] * 8:
+            threads.append(threading.Thread(target=request, args=(lane,)))
+            threads[-1].start()
+            wait_for(lambda: len(scheduler.waiting) == len(threads))
+        scheduler.release()
+        for thread in threads:
+            thread.join(5)
+        # while both lanes are backlogged "a" gets three slots for each of "b"'s
+        self.assertEqual(order[:8].count("a"), 6)
+
+    def test_rate_limit(self):
+        scheduler = lanes.LaneScheduler(rate=100, burst=1)
+        started = time.monotonic()
+        for _ in range(4):
+            with scheduler.slot():
+                pass
+        self.assertGreaterEqual(time.monotonic() - started, 0.025)
+
+    def test_deadline_while_queued(self):
+        scheduler = lanes.LaneScheduler(max_in_flight=1)
+        scheduler.acquire()
+        with deadlines.scope(0.02):
+            with self.assertRaises(deadlines.DeadlineExceeded):
+                scheduler.acquire(lanes.BULK)
+        scheduler.release()
+        # the abandoned request does not block the queue
+        self.assertLess(scheduler.acquire(), 0.5)
+
+
+class TestClientLanes(unittest.TestCase):
+
+    def test_lane_keyword_and_batch_default(self):
+        api = SpotifyAPI("client_id", "client_secret", transport=FakeSpotify.synthetic(2, 2), lane_scheduler=True)
+        api.get_artist("artist0", lane=lanes.BULK)
+        api.get_artist("collaborator1")
+        statify.mom_i_made_it_meter(api).calculate_many(["collaborator2", "collaborator3"])
+        metrics = api.lane_metrics()
+        # the token request went out with the first call, in the bulk lane
+        self.assertEqual(metrics[lanes.BULK]["requests"], 4)
+        self.assertEqual(metrics[lanes.INTERACTIVE]["requests"], 1)
+
+    def test_interactive_latency_under_bulk_load(self):
+        fake = FakeSpotify.synthetic(n_albums=40, tracks_per_album=2, latency=0.002)
+        api = SpotifyAPI("client_id", "client_secret", transport=fake,
+                         lane_scheduler=lanes.LaneScheduler(max_in_flight=2))
+        api.get_access_token()
+        bulk = threading.Thread(target=lambda: statify.potty_mouth_meter(api).calculate_many(
+            ["artist0"] + [f"collaborator{i}" for i in range(1, 9)]))
+        bulk.start()
+        wait_for(lambda: api.lane_scheduler.metrics()[lanes.BULK]["requests"] > 5)
+        for i in range(5):
+            api.get_artist("artist0")
+        bulk.join(30)
+        metrics = api.lane_metrics()
+        # five lookups and the token request
+        self.assertEqual(metrics[lanes.INTERACTIVE]["requests"], 6)
+        self.assertLess(metrics[lanes.INTERACTIVE]["wait_p95"], 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import random
+import tempfile
+import unittest
+import leaderboard
+
+
+class TestRankedIndex(unittest.TestCase):
+
+    def test_matches_sorted_list(self):
+        rng = random.Random(7)
+        index = leaderboard.RankedIndex(seed=1)
+        expected = []
+        for _ in range(2000):
+            key = rng.randrange(500)
+            if key in expected and rng.random() < 0.5:
+                index.remove(key)
+                expected.remove(key)
+            else:
+                index.insert(key)
+                expected.append(key)
+        expected.sort()
+        self.assertEqual(list(index), expected)
+        self.assertEqual(len(index), len(expected))
+        for position in (0, len(expected) // 2, len(expected) - 1):
+            self.assertEqual(index[position], expected[position])
+            self.assertEqual(index.rank(expected[position]), expected.index(expected[position]))
+        self.assertEqual(list(index.iter_from(10))[:5], expected[10:15])
+
+    def test_from_sorted(self):
+        index = leaderboard.RankedIndex.from_sorted(range(0, 200, 2), seed=3)
+        index.insert(51)
+        index.remove(10)
+        self.assertEqual(index.rank(51), 25)
+        self.assertEqual(index[25], 51)
+        self.assertEqual(len(index), 100)
+
+    def test_remove_missing(self):
+        with self.assertRaises(KeyError):
+            leaderboard.RankedIndex().remove(1)
+
+
+class TestLeaderboards(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "leaderboards.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_top_and_rank(self):
+        boards = leaderboard.Leaderboards()
+        boards.record("a", pmm=10.0, mimim={"mimim_score": 70.0}, bff={"id": "x", "collaboration_count": 3})
+        boards.record("b", pmm=90.0, mimim={"mimim_score": 20.0}, bff=None)
+        boards.record("c", pmm=50.0)
+        self.assertEqual(boards.top("pmm", 2), [("b", 90.0), ("c", 50.0)])
+        self.assertEqual(boards.rank("pmm", "a"), 3)
+        self.assertEqual(boards.top("bff"), [("a", 3), ("b", 0)])
+        self.assertIsNone(boards.rank("mimim", "c"))
+
+        boards.record("a", pmm=95.0)
+        self.assertEqual(boards.rank("pmm", "a"), 1)
+        self.assertEqual(boards.top("pmm", 2, offset=1), [("b", 90.0), ("c", 50.0)])
+        self.assertEqual(boards.standing("c"), {"pmm": {"score": 50.0, "rank": 3, "of": 3}})
+
+        boards.remove("a")
+        self.assertEqual(boards.top("bff"), [("b", 0)])
+        with self.assertRaises(Exception):
+            boards.top("unknown")
+
+    def test_record_profile(self):
+        boards = leaderboard.Leaderboards()
+        profile = {"artist_id": "a", "pmm_score": 25.0, "mimim": {"mimim_score": 40.0}, "bff": None, "final": True}
+        self.assertTrue(boards.record_profile(profile))
+        self.assertEqual(boards.score("mimim", "a"), 40.0)
+        self.assertEqual(boards.score("bff", "a"), 0)
+
+    def test_provisional_profiles_are_skipped(self):
+        boards = leaderboard.Leaderboards()
+        preview = {"artist_id": "a", "pmm_score": 90.0, "mimim": {"mimim_score": 40.0}, "bff": None, "final": False}
+        self.assertFalse(boards.record_profile(preview))
+        self.assertIsNone(boards.score("pmm", "a"))
+        boards.record_profile(dict(preview, pmm_score=25.0, final=True))
+        self.assertEqual(boards.score("pmm", "a"), 25.0)
+
+    def test_persists_snapshot_and_journal(self):
+        boards = leaderboard.Leaderboards(self.path)
+        for i in range(50):
+            boards.record(f"artist{i}", pmm=float(i % 7), mimim=float(i))
+        boards.save()
+        boards.record("artist3", pmm=100.0)
+        boards.remove("artist4")
+
+        loaded = leaderboard.Leaderboards(self.path)
+        self.assertEqual(loaded.top("pmm", 50), boards.top("pmm", 50))
+        self.assertEqual(loaded.rank("pmm", "artist3"), 1)
+        self.assertIsNone(loaded.rank("mimim", "artist4"))
+        self.assertEqual(loaded.journaled, 3)
+
+    def test_compacts_journal(self):
+        boards = leaderboard.Leaderboards(self.path, compact_every=5)
+        for i in range(6):
+            boards.record(f"artist{i}", pmm=float(i))
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(boards.journaled, 1)
+        self.assertEqual(leaderboard.Leaderboards(self.path).top("pmm", 1), [("artist5", 5.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import Mock, patch
+import json
+import models
+from api_client import SpotifyAPI
+import statify
+
+
+TRACK_PAGE = {
+    "items": [
+        {"id": "track1", "name": "Track 1", "explicit": True, "disc_number": 1,
+         "artists": [{"id": "artist_id", "name": "Main"}, {"id": "feat", "name": "Feat", "type": "artist"}]},
+        {"id": "track2", "name": "Track 2", "explicit": False, "duration_ms": 1000,
+         "artists": [{"id": "artist_id", "name": "Main"}]}
+    ],
+    "total": 2,
+    "href": "https://api.spotify.com/v1/albums/album1/tracks"
+}
+
+
+@unittest.skipUnless(models.AVAILABLE, "msgspec is not installed")
+class TestTypedDecoding(unittest.TestCase):
+
+    def setUp(self):
+        self.api = SpotifyAPI("test_client_id", "test_client_secret", fast_decode=True)
+
+    def mock_response(self, payload):
+        response = Mock()
+        response.status_code = 200
+        response.content = json.dumps(payload).encode()
+        return response
+
+    def test_fast_decode_enabled(self):
+        self.assertTrue(self.api.fast_decode)
+        self.assertFalse(SpotifyAPI("id", "secret").fast_decode)
+
+    def test_track_page_skips_unused_fields(self):
+        page = models.decode("track_page", json.dumps(TRACK_PAGE).encode())
+        self.assertIsInstance(page.items[0], models.SimplifiedTrack)
+        self.assertTrue(page.items[0].explicit)
+        self.assertEqual(page.items[0].artists[1].id, "feat")
+        self.assertIsNone(page.get("href"))
+
+    def test_artist_defaults(self):
+        artist = models.decode("artists", b'{"id": "a", "name": "A"}')
+        self.assertEqual(artist.popularity, 0)
+        self.assertEqual(artist.get("followers").get("total"), 0)
+        with self.assertRaises(KeyError):
+            artist["genres"]
+
+    @patch('api_client.requests.get')
+    def test_get_album_tracks_typed(self, mock_get):
+        mock_get.return_value = self.mock_response(TRACK_PAGE)
+        with patch.object(self.api, 'get_resource_header', return_value={"Authorization": "Bearer test_token"}):
+            result = self.api.get_album_tracks("album1")
+        self.assertIsInstance(result, models.TrackPage)
+        self.assertEqual(len(result.get("items", [])), 2)
+
+    @patch('api_client.requests.get')
+    def test_get_resource_typed(self, mock_get):
+        mock_get.return_value = self.mock_response({"id": "artist_id", "popularity": 70,
+                                                    "followers": {"href": None, "total": 5}})
+        with patch.object(self.api, 'get_resource_header', return_value={"Authorization": "Bearer test_token"}):
+            result = self.api.get_artist("artist_id")
+        self.assertIsInstance(result, models.Artist)
+        self.assertEqual(result["followers"]["total"], 5)
+
+    def test_meters_accept_structs(self):
+        page = models.decode("track_page", json.dumps(TRACK_PAGE).encode())
+        with patch.object(self.api, 'get_all_tracks_by_artist', return_value=page.items):
+            self.assertEqual(statify.potty_mouth_meter(self.api).calculate_pmm("artist_id"), 50.0)
+            bff = statify.bff_picker(self.api).find_bff("artist_id")
+        self.assertEqual(bff["id"], "feat")
+
+
+if __name__ == '__main__':
+    unittest.main()
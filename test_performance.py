@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import platform
+import tracemalloc
+import unittest
+from api_client import SpotifyAPI
+from fake_spotify import FakeSpotify
+import statify
+
+# Synthetic discographies: name -> (albums, tracks per album)
+SIZES = {"small": (4, 8), "medium": (60, 12), "large": (150, 12)}
+
+# Write the measurements as JSON here when set, e.g. to compare commits
+# with benchmarks/perf_report.py
+REPORT_ENV = "STATIFY_PERF_REPORT"
+
+# Wall time and allocation budgets: a fixed allowance plus a per-unit cost,
+# about twice what the current code needs
+WALL_BASE_SECONDS = 0.5
+WALL_SECONDS_PER_CALL = 0.003
+PEAK_BASE_BYTES = 128 * 1024
+PEAK_BYTES_PER_TRACK = 3 * 1024
+
+
+def discography_calls(n_albums):
+    """
+    Requests for get_all_tracks_by_artist: album pages of 50 (a full last
+    page needs one more, empty, page) and one tracks call per album
+    """
+    return {"artist_albums": n_albums // 50 + 1, "album_tracks": n_albums}
+
+
+def endpoint_calls(n_albums, discography=True, **extra):
+    """Per-endpoint call budget: the token request, the discography and extra endpoint counts"""
+    calls = {"token": 1}
+    if discography:
+        calls.update(discography_calls(n_albums))
+    calls.update(extra)
+    return calls
+
+
+def _pmm(client):
+    statify.compute_pmm(client, "artist0")
+
+
+def _mimim(client):
+    statify.compute_mimim(client, "artist0")
+
+
+def _bff(client):
+    statify.compute_bff(client, "artist0")
+
+
+def _pmm_and_bff(client):
+    cache = statify.MeterCache()
+    statify.compute_pmm(client, "artist0", cache=cache)
+    statify.compute_bff(client, "artist0", cache=cache)
+
+
+def _profile(client):
+    for profile in statify.iter_profile(client, "artist0", cache=statify.MeterCache()):
+        pass
+
+
+def _profile_after_search(client):
+    client.search_artists("artist artist0", limit=1)
+    _profile(client)
+
+
+def _discography_peak(tracks):
+    return PEAK_BASE_BYTES + PEAK_BYTES_PER_TRACK * tracks
+
+
+# name -> (run(client), client options, {endpoint: HTTP calls} budget for
+# n_albums, peak allocation budget for n tracks)
+SCENARIOS = {
+    "pmm": (_pmm, {}, endpoint_calls, _discography_peak),
+    "mimim": (_mimim, {}, lambda n_albums: endpoint_calls(n_albums, discography=False, artists=1),
+              lambda tracks: PEAK_BASE_BYTES),
+    "bff": (_bff, {}, endpoint_calls, _discography_peak),
+    "pmm_and_bff": (_pmm_and_bff, {}, endpoint_calls, _discography_peak),
+    "profile": (_profile, {}, lambda n_albums: endpoint_calls(n_albums, artists=1, artist_top_tracks=1),
+                _discography_peak),
+    # the searched artist answers get_artist from the entity map
+    "profile_after_search": (_profile_after_search, {"entity_map": True},
+                             lambda n_albums: endpoint_calls(n_albums, search=1, artist_top_tracks=1),
+                             _discography_peak),
+}
+
+
+def measure(scenario, size, repeat=1):
+    """
+    Runs one scenario against a fresh fake catalog. Returns HTTP calls,
+    best wall time over repeat runs and peak traced allocations
+    """
+    run, options, call_budget, peak_budget = SCENARIOS[scenario]
+    n_albums, tracks_per_album = SIZES[size]
+
+    def client():
+        fake = FakeSpotify.synthetic(n_albums, tracks_per_album)
+        return fake, SpotifyAPI("client_id", "client_secret", transport=fake, **options)
+
+    wall_seconds = None
+    for _ in range(repeat):
+        fake, api = client()
+        started = time.perf_counter()
+        run(api)
+        elapsed = time.perf_counter() - started
+        wall_seconds = elapsed if wall_seconds is None else min(wall_seconds, elapsed)
+
+    fake, api = client()
+    tracemalloc.start()
+    try:
+        run(api)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tracks = n_albums * tracks_per_album
+    calls = call_budget(n_albums)
+    http_calls = sum(calls.values())
+    return {
+        "scenario": scenario,
+        "size": size,
+        "albums": n_albums,
+        "tracks": tracks,
+        "http_calls": api.request_count,
+        "calls_by_endpoint": dict(fake.calls),
+        "wall_seconds": round(wall_seconds, 6),
+        "peak_bytes": peak_bytes,
+        "budget": {
+            "http_calls": http_calls,
+            "calls_by_endpoint": calls,
+            "wall_seconds": WALL_BASE_SECONDS + WALL_SECONDS_PER_CALL * http_calls,
+            "peak_bytes": peak_budget(tracks)
+        }
+    }
+
+
+def measure_all(repeat=1):
+    return [measure(scenario, size, repeat) for scenario in SCENARIOS for size in SIZES]
+
+
+def report(results):
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": int(time.time()),
+        "results": results
+    }
+
+
+RESULTS = []
+
+
+def tearDownModule():
+    path = os.environ.get(REPORT_ENV)
+    if path and RESULTS:
+        with open(path, "w") as f:
+            json.dump(report(RESULTS), f, indent=2)
+
+
+class TestPerformanceBudgets(unittest.TestCase):
+
+    def check(self, scenario):
+        for size in SIZES:
+            with self.subTest(size=size):
+                result = measure(scenario, size)
+                RESULTS.append(result)
+                budget = result["budget"]
+                self.assertLessEqual(result["http_calls"], budget["http_calls"], result["calls_by_endpoint"])
+                for endpoint, calls in result["calls_by_endpoint"].items():
+                    self.assertLessEqual(calls, budget["calls_by_endpoint"].get(endpoint, 0), endpoint)
+                self.assertLessEqual(result["wall_seconds"], budget["wall_seconds"])
+                self.assertLessEqual(result["peak_bytes"], budget["peak_bytes"])
+
+    def test_pmm(self):
+        self.check("pmm")
+
+    def test_mimim(self):
+        self.check("mimim")
+
+    def test_bff(self):
+        self.check("bff")
+
+    def test_shared_cache(self):
+        self.check("pmm_and_bff")
+
+    def test_profile(self):
+        self.check("profile")
+
+    def test_profile_after_search(self):
+        self.check("profile_after_search")
+
+    def test_fake_matches_paging(self):
+        fake = FakeSpotify.synthetic(n_albums=51, tracks_per_album=3)
+        api = SpotifyAPI("client_id", "client_secret", transport=fake)
+        self.assertEqual(len(api.get_all_tracks_by_artist("artist0")), 153)
+        self.assertEqual(fake.calls["artist_albums"], 2)
+        self.assertEqual(api.get_artist("missing"), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
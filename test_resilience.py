@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import Mock, patch
+import threading
+import resilience
+from api_client import SpotifyAPI
+from fake_clock import FakeClock
+
+
+def response(status_code):
+    r = Mock()
+    r.status_code = status_code
+    r.json.return_value = {"items": []}
+    return r
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = resilience.CircuitBreaker("search", failure_threshold=2,
+                                                 recovery_timeout=10, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.breaker.before_request()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, resilience.OPEN)
+        with self.assertRaises(resilience.CircuitOpenError):
+            self.breaker.before_request()
+        self.assertEqual(self.breaker.metrics()["rejected"], 1)
+
+    def test_half_open_trial(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 11
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, resilience.HALF_OPEN)
+        with self.assertRaises(resilience.CircuitOpenError):
+            self.breaker.before_request()  # only one trial call at a time
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, resilience.OPEN)
+        self.assertEqual(self.breaker.times_opened, 2)
+
+        self.clock.now = 22
+        self.breaker.before_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, resilience.CLOSED)
+
+
+class TestHedger(unittest.TestCase):
+
+    def test_no_hedge_until_warm(self):
+        hedger = resilience.Hedger(min_samples=3)
+        self.assertEqual(hedger.call("album_tracks", lambda: "ok"), "ok")
+        self.assertIsNone(hedger.hedge_delay("album_tracks"))
+        self.assertEqual(hedger.metrics()["album_tracks"]["hedged"], 0)
+
+    def test_hedge_wins_when_primary_is_slow(self):
+        hedger = resilience.Hedger(min_samples=1, min_delay=0.01)
+        hedger._window("album_tracks").add(0.01)
+        release = threading.Event()
+        calls = []
+
+        def send():
+            calls.append(1)
+            if len(calls) == 1:
+                release.wait(2)  # primary stalls
+                return "slow"
+            return "fast"
+
+        self.assertEqual(hedger.call("album_tracks", send), "fast")
+        release.set()
+        self.assertEqual(hedger.metrics()["album_tracks"], {"requests": 1, "hedged": 1, "hedge_wins": 1})
+        hedger.shutdown()
+
+
+class TestSpotifyAPIResilience(unittest.TestCase):
+
+    def setUp(self):
+        self.breakers = resilience.CircuitBreakers(failure_threshold=2, recovery_timeout=60)
+        self.api = SpotifyAPI("test_client_id", "test_client_secret", circuit_breakers=self.breakers)
+        patcher = patch.object(self.api, 'get_resource_header', return_value={"Authorization": "Bearer test_token"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('api_client.requests.get')
+    def test_breaker_opens_per_endpoint(self, mock_get):
+        mock_get.return_value = response(503)
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                self.api.get_album_tracks("album_id")
+        with self.assertRaises(resilience.CircuitOpenError):
+            self.api.get_album_tracks("album_id")
+        self.assertEqual(mock_get.call_count, 2)
+
+        mock_get.return_value = response(200)
+        self.api.search("query")  # other endpoints are unaffected
+        metrics = self.api.resilience_metrics()["circuit_breakers"]
+        self.assertEqual(metrics["album_tracks"]["state"], resilience.OPEN)
+        self.assertEqual(metrics["search"]["state"], resilience.CLOSED)
+
+    @patch('api_client.requests.get')
+    def test_not_found_is_not_a_failure(self, mock_get):
+        mock_get.return_value = response(404)
+        for _ in range(3):
+            self.assertEqual(self.api.get_artist("missing"), {})
+        self.assertEqual(self.breakers.get("artists").state, resilience.CLOSED)
+
+    def test_defaults(self):
+        api = SpotifyAPI("id", "secret", circuit_breakers=True, hedger=True)
+        self.assertIsInstance(api.circuit_breakers, resilience.CircuitBreakers)
+        self.assertIsInstance(api.hedger, resilience.Hedger)
+
+
+if __name__ == '__main__':
+    unittest.main()
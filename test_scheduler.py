@@ -0,0 +1,177 @@
+import unittest
+import threading
+import api_client
+import deadlines
+import scheduler
+from fake_clock import FakeClock
+
+
+class FakeClient(object):
+    """
+    Each discography fetch costs 4 requests and each artist lookup 1.
+    Artists in missing fail after 2 requests and artists in slow run out of
+    time after 1; requests made by other users of the client are added with
+    background_requests.
+    """
+
+    def __init__(self):
+        self.request_count = 0
+        self.explicit = {}
+        self.missing = set()
+        self.slow = set()
+        self.background_requests = 0
+        self.calls = []
+
+    def send(self, n):
+        self.request_count += n + self.background_requests
+        for _ in range(n):
+            api_client.count_request()
+
+    def get_all_tracks_by_artist(self, artist_id):
+        self.calls.append(artist_id)
+        if artist_id in self.missing:
+            self.send(2)
+            raise Exception(f"Failed to get albums for artist {artist_id}: 404")
+        if artist_id in self.slow:
+            self.send(1)
+            raise deadlines.DeadlineExceeded(f"Deadline exceeded fetching artist {artist_id}")
+        self.send(4)
+        explicit = self.explicit.get(artist_id, False)
+        return [{"explicit": explicit, "artists": [{"id": artist_id}]}]
+
+    def get_artist(self, artist_id):
+        self.send(1)
+        return {"popularity": 50, "followers": {"total": 1000}}
+
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = FakeClient()
+        self.scheduler = scheduler.RefreshScheduler(self.client, hourly_budget=600, clock=self.clock)
+
+    def test_new_artists_refresh_first_and_costs_are_measured(self):
+        self.scheduler.track("a", "b")
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        report = self.scheduler.report()
+        self.assertEqual(report["budget"]["used_last_hour"], 10)
+        self.assertEqual({q["cost"] for q in report["queue"]}, {5})
+        self.assertEqual(self.scheduler.run_pending(), 0)  # nothing is due yet
+
+    def test_budget_limits_refreshes(self):
+        ids = [f"artist{i}" for i in range(100)]
+        self.scheduler.track(*ids)
+        refreshed = self.scheduler.run_pending()
+        self.assertLess(refreshed, 100)  # the burst allowance (600 / 12) runs out first
+        self.assertGreater(self.scheduler.report()["deferred_for_budget"], 0)
+
+        total = refreshed
+        for _ in range(60):
+            self.clock.now += 60
+            total += self.scheduler.run_pending()
+        self.assertLessEqual(self.scheduler.used_last_hour(), 600 + 5)
+
+    def test_volatile_artist_refreshes_more_often(self):
+        self.scheduler.track("stable", "volatile")
+        for _ in range(200):
+            self.clock.now += 30
+            self.client.explicit["volatile"] = not self.client.explicit.get("volatile", False)
+            self.scheduler.run_pending()
+        self.assertGreater(self.client.calls.count("volatile"), self.client.calls.count("stable"))
+
+    def test_lookup_preempts_and_records_demand(self):
+        self.scheduler.track("a")
+        self.scheduler.run_pending()
+        result = self.scheduler.lookup("a")
+        self.assertEqual(result["pmm"], 0.0)
+        report = self.scheduler.report()
+        self.assertEqual(report["interactive_lookups"], 1)
+        self.assertGreater(report["queue"][0]["demand"], 0.9)
+
+    def test_lookups_are_charged_to_the_budget(self):
+        self.scheduler.lookup("a")
+        self.client.missing.add("b")
+        with self.assertRaises(Exception):
+            self.scheduler.lookup("b")
+        report = self.scheduler.report()
+        self.assertEqual(report["budget"]["used_last_hour"], 5 + 2)
+        self.assertEqual((report["interactive_lookups"], report["interactive_requests"]), (2, 7))
+        self.assertAlmostEqual(report["budget"]["tokens_available"], self.scheduler.burst - 7)
+
+    def test_untracked_artist_is_still_charged(self):
+        self.scheduler.track("a")
+        measure = self.scheduler._measure
+
+        def untrack_meanwhile(artist_id, lane, tally):
+            self.scheduler.untrack(artist_id)
+            return measure(artist_id, lane, tally)
+
+        self.scheduler._measure = untrack_meanwhile
+        self.scheduler.run_pending()
+        self.scheduler.track("b")
+        self.scheduler.lookup("b")
+        self.assertEqual(self.scheduler.used_last_hour(), 10)
+        self.assertNotIn("a", self.scheduler.artists)
+
+    def test_background_waits_for_interactive(self):
+        self.scheduler.track("a")
+        with self.scheduler.lock:
+            self.scheduler.interactive_in_flight = 1
+        worker = threading.Thread(target=self.scheduler.run_pending)
+        worker.start()
+        worker.join(0.05)
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(self.client.calls, [])
+        with self.scheduler.lock:
+            self.scheduler.interactive_in_flight = 0
+            self.scheduler.idle.notify_all()
+        worker.join(1)
+        self.assertEqual(self.client.calls, ["a"])
+
+    def test_costs_ignore_other_users_of_the_client(self):
+        self.client.background_requests = 3
+        self.scheduler.track("a")
+        self.scheduler.run_pending()
+        self.assertEqual(self.scheduler.report()["queue"][0]["cost"], 5)
+
+    def test_failed_artist_backs_off_without_stopping_others(self):
+        self.client.missing.add("bad")
+        self.scheduler.track("bad", "good1", "good2")
+        self.assertEqual(self.scheduler.run_pending(), 2)
+        report = self.scheduler.report()
+        self.assertEqual(report["failed_refreshes"], 1)
+        self.assertEqual(report["budget"]["used_last_hour"], 2 + 5 + 5)
+        bad = self.scheduler.artists["bad"]
+        self.assertEqual(bad.due, 60.0)
+
+        self.clock.now = 60.0
+        self.scheduler.run_pending()
+        self.assertEqual(bad.failures, 2)
+        self.assertEqual(bad.due, 60.0 + 120.0)
+
+        self.client.missing.clear()
+        self.clock.now = 180.0
+        self.scheduler.run_pending()
+        self.assertEqual((bad.failures, bad.refreshes), (0, 1))
+
+    def test_run_survives_failures(self):
+        self.client.missing.add("bad")
+        self.scheduler.track("bad", "good1", "good2")
+        stop = threading.Event()
+        self.scheduler.run(stop_event=stop, sleep=lambda seconds: stop.set())
+        self.assertEqual(self.scheduler.report()["background_refreshes"], 2)
+        self.assertIn("good2", self.client.calls)
+
+    def test_run_pauses_on_deadline(self):
+        self.client.slow.add("slow")
+        self.scheduler.track("slow", "good")
+        stop = threading.Event()
+        self.scheduler.run(stop_event=stop, sleep=lambda seconds: stop.set())
+        report = self.scheduler.report()
+        self.assertEqual((report["background_refreshes"], report["failed_refreshes"]), (1, 1))
+        self.assertEqual(report["budget"]["used_last_hour"], 5 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
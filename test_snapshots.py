@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+import zlib
+from api_client import SpotifyAPI
+from fake_spotify import FakeSpotify
+from fake_clock import FakeClock
+import snapshots
+import statify
+
+
+class TestSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock(1700000000)
+        self.store = snapshots.SnapshotStore(self.tmp.name, clock=self.clock)
+        self.fake = FakeSpotify.synthetic(n_albums=7, tracks_per_album=9, n_collaborators=4)
+        self.api = SpotifyAPI("client_id", "client_secret", transport=self.fake)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        discography = list(self.api.iter_artist_discography("artist0"))
+        self.store.save("artist0", discography)
+        snapshot = self.store.load("artist0")
+
+        self.assertEqual(snapshot.artist_id, "artist0")
+        self.assertEqual(snapshot.fetched_at, self.clock.now)
+        self.assertEqual(len(snapshot), 63)
+        albums = snapshot.albums()
+        self.assertEqual([a["id"] for a in albums], [album.get("id") for album, _ in discography])
+        self.assertEqual(albums[0]["release_date"], discography[0][0].get("release_date"))
+        for (album, tracks), (loaded_album, loaded_tracks) in zip(discography, snapshot.discography()):
+            self.assertEqual(loaded_album["total_tracks"], album.get("total_tracks"))
+            self.assertEqual(loaded_album["tracks_stored"], len(tracks))
+            self.assertEqual([t["id"] for t in loaded_tracks], [t.get("id") for t in tracks])
+            self.assertEqual([t["explicit"] for t in loaded_tracks], [t.get("explicit") for t in tracks])
+            self.assertEqual([[a["name"] for a in t["artists"]] for t in loaded_tracks],
+                             [[a.get("name") for a in t.get("artists")] for t in tracks])
+
+    def test_scores_match_statify(self):
+        tracks = self.api.get_all_tracks_by_artist("artist0")
+        snapshot = self.store.fetch(self.api, "artist0")
+        self.assertEqual(snapshot.pmm(), statify.explicit_percentage(tracks))
+        self.assertEqual(snapshot.bff(), statify.pick_bff(statify.count_collaborators("artist0", tracks)))
+        loaded = snapshot.tracks()
+        self.assertEqual(statify.explicit_percentage(loaded), statify.explicit_percentage(tracks))
+        self.assertEqual(statify.count_collaborators("artist0", loaded),
+                         statify.count_collaborators("artist0", tracks))
+
+    def test_bff_ties_and_missing_ids(self):
+        album = {"id": "a1", "name": "A"}
+        tracks = [
+            {"id": "t1", "explicit": True, "artists": [{"id": "me", "name": "Me"}, {"id": None, "name": "Local"}]},
+            {"id": "t2", "explicit": False, "artists": [{"id": "me", "name": "Me"}, {"id": "x", "name": "X"}]},
+            {"id": "t3", "explicit": False, "artists": [{"id": "x", "name": "X"}]},
+            {"id": "t4", "explicit": False, "artists": []},
+        ]
+        snapshot = snapshots.Snapshot.from_bytes(snapshots.encode("me", [(album, tracks)], fetched_at=5))
+        self.assertEqual(snapshot.bff(), statify.pick_bff(statify.count_collaborators("me", tracks)))
+        self.assertEqual(snapshot.pmm(), 25.0)
+        self.assertIsNone(snapshots.Snapshot.from_bytes(snapshots.encode("me", [])).bff())
+
+    def test_partial_album_keeps_its_total_tracks(self):
+        tracks = [{"id": "t1", "explicit": True, "artists": [{"id": "me", "name": "Me"}]}]
+        discography = [({"id": "a1", "total_tracks": 12}, tracks), ({"id": "a2"}, tracks)]
+        snapshot = snapshots.Snapshot.from_bytes(snapshots.encode("me", discography))
+        self.assertEqual([(a["total_tracks"], a["tracks_stored"]) for a in snapshot.albums()],
+                         [(12, 1), (None, 1)])
+        self.assertEqual([len(loaded) for _, loaded in snapshot.discography()], [1, 1])
+
+    def test_reads_version_1_files(self):
+        encoder = snapshots._Encoder("me")
+        encoder.add({"id": "a1", "total_tracks": 12}, [{"id": "t1", "explicit": True, "artists": []}])
+        encoder.album_columns = encoder.album_columns[:5]
+        raw = encoder.payload()
+        header = snapshots.HEADER.pack(snapshots.MAGIC, 1, snapshots.CODEC_ZLIB, 5, 1, 1, len(raw), zlib.crc32(raw))
+        snapshot = snapshots.Snapshot.from_bytes(header + zlib.compress(raw))
+        self.assertEqual(snapshot.albums()[0]["total_tracks"], None)
+        self.assertEqual(snapshot.albums()[0]["tracks_stored"], 1)
+        self.assertEqual(snapshot.pmm(), 100.0)
+
+    def test_fresh_snapshot_needs_no_requests(self):
+        self.store.fetch(self.api, "artist0")
+        calls = sum(self.fake.calls.values())
+        self.clock.advance(100)
+        self.assertEqual(len(self.store.tracks(self.api, "artist0", max_age=3600)), 63)
+        self.assertEqual(sum(self.fake.calls.values()), calls)
+
+        self.clock.advance(7200)
+        self.store.fetch(self.api, "artist0", max_age=3600)
+        self.assertGreater(sum(self.fake.calls.values()), calls)
+        self.assertEqual(self.store.age("artist0"), 0)
+
+    def test_header(self):
+        self.store.fetch(self.api, "artist0")
+        header = snapshots.read_header(self.store.path("artist0"))
+        self.assertEqual((header.fetched_at, header.album_count, header.track_count), (self.clock.now, 7, 63))
+        self.assertLess(os.path.getsize(self.store.path("artist0")), header.size)
+
+    def test_rejects_bad_files(self):
+        self.store.fetch(self.api, "artist0")
+        path = self.store.path("artist0")
+        with open(path, "rb") as f:
+            data = bytearray(f.read())
+        data[-1] ^= 0xFF
+        with open(path, "wb") as f:
+            f.write(data)
+        with self.assertRaises(Exception):
+            self.store.load("artist0")
+        with open(path, "wb") as f:
+            f.write(b"nope")
+        with self.assertRaises(Exception):
+            self.store.load("artist0")
+        self.assertIsNone(self.store.load("missing"))
+
+    def test_rescore_directory(self):
+        for n in range(3):
+            fake = FakeSpotify.synthetic(n_albums=n + 1, tracks_per_album=3, artist_id=f"artist{n}")
+            api = SpotifyAPI("client_id", "client_secret", transport=fake)
+            self.store.fetch(api, f"artist{n}")
+        scores = self.store.rescore()
+        self.assertEqual(sorted(scores), ["artist0", "artist1", "artist2"])
+        self.assertEqual(scores["artist2"]["tracks"], 9)
+        self.assertAlmostEqual(scores["artist2"]["pmm_score"], 100 / 3)
+        self.assertEqual(scores["artist1"]["bff"]["collaboration_count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
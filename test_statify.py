@@ -0,0 +1,214 @@
+import time
+import unittest
+import threading
+from unittest.mock import Mock
+import statify
+
+
+def fake_client(n_albums=120, tracks_per_album=10):
+    """Albums alternate album/single across 2000-2019; every third track is explicit."""
+    albums = [{"id": f"album{i}", "album_type": "album" if i % 2 else "single",
+               "release_date": f"{2000 + i % 20}-01-01"} for i in range(n_albums)]
+    tracks = {a["id"]: [{"id": f"{a['id']}-{j}", "explicit": (i * tracks_per_album + j) % 3 == 0}
+                        for j in range(tracks_per_album)] for i, a in enumerate(albums)}
+
+    client = Mock()
+    client.get_albums_by_artist.side_effect = lambda artist_id, include_groups=None, limit=20, offset=0: \
+        {"items": albums[offset:offset + limit]}
+    client.get_album_tracks.side_effect = lambda album_id: {"items": tracks[album_id]}
+    client.get_all_tracks_by_artist.side_effect = lambda artist_id: \
+        [t for a in albums for t in tracks[a["id"]]]
+    return client
+
+
+class TestEstimatePMM(unittest.TestCase):
+
+    def test_request_budget_gives_interval(self):
+        client = fake_client()
+        meter = statify.potty_mouth_meter(client)
+        exact = statify.potty_mouth_meter(client).calculate_pmm("artist_id")
+
+        estimate = meter.estimate_pmm("artist_id", time_budget=None, request_budget=33, seed=1)
+
+        self.assertFalse(estimate["exact"])
+        self.assertEqual(estimate["requests"], 33)  # 3 listing pages + 30 albums
+        self.assertEqual(estimate["albums_sampled"], 30)
+        self.assertLessEqual(estimate["lower"], estimate["pmm_score"])
+        self.assertLessEqual(estimate["pmm_score"], estimate["upper"])
+        self.assertLess(abs(estimate["pmm_score"] - exact), 5)
+        self.assertEqual(meter.artist_pmm_score, estimate["pmm_score"])
+
+    def test_refines_to_exact(self):
+        client = fake_client(n_albums=12)
+        exact = statify.potty_mouth_meter(client).calculate_pmm("artist_id")
+        estimates = list(statify.potty_mouth_meter(client).iter_pmm_estimates("artist_id", seed=2))
+
+        self.assertEqual(len(estimates), 12)
+        self.assertFalse(any(e["exact"] for e in estimates[:-1]))
+        final = estimates[-1]
+        self.assertTrue(final["exact"])
+        self.assertAlmostEqual(final["pmm_score"], exact)
+        self.assertAlmostEqual(final["lower"], final["upper"])
+
+    def test_samples_every_stratum_early(self):
+        client = fake_client(n_albums=40)
+        meter = statify.potty_mouth_meter(client)
+        meter.estimate_pmm("artist_id", time_budget=None, request_budget=5, seed=3)
+        read = [call.args[0] for call in client.get_album_tracks.call_args_list]
+        types = {int(album_id[5:]) % 2 for album_id in read}
+        self.assertEqual(types, {0, 1})
+
+    def test_time_budget_caps_listing_and_calls(self):
+        from api_client import SpotifyAPI
+        from fake_spotify import FakeSpotify
+        fake = FakeSpotify.synthetic(n_albums=120, tracks_per_album=2, latency=0.05)
+        meter = statify.potty_mouth_meter(SpotifyAPI("client_id", "client_secret", transport=fake))
+        started = time.monotonic()
+        estimate = meter.estimate_pmm("artist0", time_budget=0.12)
+        self.assertLess(time.monotonic() - started, 0.3)
+        self.assertFalse(estimate["exact"])
+        self.assertEqual(estimate["albums_sampled"], 0)
+        self.assertEqual(estimate["albums_total"], 100)   # the third listing page was cut short
+
+        with self.assertRaises(statify.deadlines.DeadlineExceeded):
+            meter.estimate_pmm("artist0", time_budget=1.0, deadline=0.12)
+
+    def test_no_albums(self):
+        client = fake_client(n_albums=0)
+        estimate = statify.potty_mouth_meter(client).estimate_pmm("artist_id")
+        self.assertTrue(estimate["exact"])
+        self.assertEqual(estimate["pmm_score"], 0.0)
+
+
+
+class TestStatelessMeters(unittest.TestCase):
+
+    def setUp(self):
+        self.tracks = {
+            "artist_a": [{"explicit": True, "artists": [{"id": "artist_a"}, {"id": "feat_a", "name": "Feat A"}]}],
+            "artist_b": [{"explicit": False, "artists": [{"id": "artist_b"}, {"id": "feat_b", "name": "Feat B"}]},
+                         {"explicit": False, "artists": [{"id": "artist_b"}]}],
+        }
+        self.client = Mock()
+        self.client.get_all_tracks_by_artist.side_effect = lambda artist_id: self.tracks[artist_id]
+        self.client.get_artist.side_effect = lambda artist_id: {"popularity": 50, "followers": {"total": 0}}
+
+    def test_reused_bff_picker_does_not_mix_artists(self):
+        picker = statify.bff_picker(self.client)
+        picker.find_bff("artist_a")
+        self.tracks["artist_a"] = self.tracks["artist_a"] * 5
+        self.assertEqual(picker.find_bff("artist_b")["id"], "feat_b")
+        self.assertEqual(picker.find_bff("artist_a")["collaboration_count"], 5)
+
+    def test_results_are_read_only(self):
+        result = statify.compute_mimim(self.client, "artist_a")
+        with self.assertRaises(TypeError):
+            result["popularity"] = 100
+
+    def test_shared_cache_fetches_discography_once(self):
+        cache = statify.MeterCache()
+        statify.potty_mouth_meter(self.client, cache).calculate_pmm("artist_a")
+        statify.bff_picker(self.client, cache).find_bff("artist_a")
+        self.assertEqual(self.client.get_all_tracks_by_artist.call_count, 1)
+
+    def test_cache_does_not_keep_failures(self):
+        cache = statify.MeterCache()
+        self.client.get_all_tracks_by_artist.side_effect = [Exception("boom"), self.tracks["artist_a"]]
+        with self.assertRaises(Exception):
+            statify.compute_pmm(self.client, "artist_a", cache=cache)
+        self.assertEqual(statify.compute_pmm(self.client, "artist_a", cache=cache), 100.0)
+
+    def test_cache_ttl(self):
+        now = [0.0]
+        cache = statify.MeterCache(ttl=10, clock=lambda: now[0])
+        statify.compute_pmm(self.client, "artist_a", cache=cache)
+        statify.compute_pmm(self.client, "artist_a", cache=cache)
+        now[0] = 11
+        statify.compute_pmm(self.client, "artist_a", cache=cache)
+        self.assertEqual(self.client.get_all_tracks_by_artist.call_count, 2)
+
+    def test_calculate_many(self):
+        def get_all_tracks_by_artist(artist_id):
+            if artist_id not in self.tracks:
+                raise Exception("Failed to get albums for artist")
+            return self.tracks[artist_id]
+        self.client.get_all_tracks_by_artist.side_effect = get_all_tracks_by_artist
+        results = statify.bff_picker(self.client).calculate_many(["artist_a", "artist_b", "artist_a", "missing"])
+        self.assertEqual(results["artist_a"]["id"], "feat_a")
+        self.assertEqual(results["artist_b"]["id"], "feat_b")
+        self.assertIsInstance(results["missing"], Exception)
+        self.assertEqual(self.client.get_all_tracks_by_artist.call_count, 3)
+
+        scores = statify.potty_mouth_meter(self.client).calculate_many(["artist_a", "artist_b"])
+        self.assertEqual(scores, {"artist_a": 100.0, "artist_b": 0.0})
+        popularity = statify.mom_i_made_it_meter(self.client).calculate_many(["artist_a"])
+        self.assertEqual(popularity["artist_a"]["popularity"], 50)
+
+
+class TestProgressiveProfile(unittest.TestCase):
+
+    def setUp(self):
+        feat = {"id": "feat", "name": "Feat"}
+        main = {"id": "artist_id", "name": "Main"}
+        self.client = Mock()
+        self.client.get_artist.return_value = {"name": "Main", "popularity": 80, "followers": {"total": 0}}
+        self.client.get_artist_top_tracks.return_value = {"tracks": [
+            {"explicit": True, "artists": [main, feat]},
+            {"explicit": True, "artists": [main]}]}
+        self.client.iter_artist_discography.side_effect = lambda artist_id, deadline=None, lane=None: iter([
+            ({"id": "album1"}, [{"explicit": True, "artists": [main, feat]}, {"explicit": False, "artists": [main]}]),
+            ({"id": "album2"}, [{"explicit": False, "artists": [main]}, {"explicit": False, "artists": [main]}]),
+        ])
+
+    def test_preview_does_not_queue_behind_bulk_work(self):
+        release = threading.Event()
+        pool = statify.shared_executor()
+        blocked = [pool.submit(release.wait, 5) for _ in range(pool._max_workers * 2)]
+        try:
+            started = time.monotonic()
+            profile = statify.preview_profile(self.client, "artist_id")
+            self.assertLess(time.monotonic() - started, 1.0)
+            self.assertEqual(profile["tracks_read"], 2)
+        finally:
+            release.set()
+            for future in blocked:
+                future.result()
+
+    def test_preview_uses_two_calls(self):
+        preview = statify.preview_profile(self.client, "artist_id")
+        self.assertEqual(preview["status"], "provisional")
+        self.assertEqual(preview["pmm_score"], 100.0)
+        self.assertEqual(preview["bff"]["id"], "feat")
+        self.assertEqual(preview["mimim"]["popularity"], 80)
+        self.client.get_artist_top_tracks.assert_called_once_with("artist_id", market="US")
+        self.client.iter_artist_discography.assert_not_called()
+
+    def test_iter_profile_refines_to_final(self):
+        cache = statify.MeterCache()
+        profiles = list(statify.iter_profile(self.client, "artist_id", cache=cache))
+        self.assertEqual([p["status"] for p in profiles], ["provisional"] * 3 + ["final"])
+        self.assertEqual([p["pmm_score"] for p in profiles], [100.0, 50.0, 25.0, 25.0])
+        self.assertEqual(profiles[-1]["albums_read"], 2)
+        # the discography is left in the cache for the meters
+        self.assertEqual(statify.potty_mouth_meter(self.client, cache).calculate_pmm("artist_id"), 25.0)
+        self.client.get_all_tracks_by_artist.assert_not_called()
+
+    def test_cached_discography_skips_full_pass(self):
+        cache = statify.MeterCache()
+        self.client.get_all_tracks_by_artist.return_value = [{"explicit": False, "artists": []}]
+        statify.compute_pmm(self.client, "artist_id", cache=cache)
+        profiles = list(statify.iter_profile(self.client, "artist_id", cache=cache))
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual(profiles[-1]["pmm_score"], 0.0)
+        self.client.iter_artist_discography.assert_not_called()
+
+    def test_stream_profile_calls_back(self):
+        updates = []
+        final = statify.stream_profile(self.client, "artist_id", updates.append).result(timeout=5)
+        self.assertTrue(final["final"])
+        self.assertEqual(len(updates), 4)
+        self.assertIs(updates[-1], final)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import os
+import struct
+import tempfile
+from unittest.mock import Mock
+import statify
+import watchlist
+
+
+class TestMIMIMSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "artist.mimim")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_size(self):
+        series = watchlist.MIMIMSeries(self.path)
+        for day in range(10):
+            series.append(day * 86400, 50 + day, 1000000 + day * 1000)
+
+        reopened = watchlist.MIMIMSeries(self.path)
+        self.assertEqual(len(reopened), 10)
+        timestamps, popularity, followers = reopened.range()
+        self.assertEqual(list(popularity), list(range(50, 60)))
+        self.assertEqual(followers[-1], 1009000)
+        self.assertEqual(os.path.getsize(self.path), watchlist.HEADER.size + 9 * watchlist.RECORD_SIZE)
+
+    def test_range_and_trend(self):
+        series = watchlist.MIMIMSeries(self.path)
+        for day in range(30):
+            series.append(day * 86400, 60, 2000000 + day * 500)
+
+        timestamps, _, _ = series.range(10 * 86400, 19 * 86400)
+        self.assertEqual(len(timestamps), 10)
+        trend = series.trend(10 * 86400, 20 * 86400)
+        self.assertAlmostEqual(trend["followers_per_day"], 500)
+        self.assertEqual(trend["popularity_change"], 0)
+
+        _, scores = series.mimim(end=0)
+        self.assertAlmostEqual(scores[0], statify.mimim_score(60, 2000000))
+        self.assertIsNone(series.trend(end=0))
+
+    def test_records_are_little_endian(self):
+        series = watchlist.MIMIMSeries(self.path)
+        series.append(100, 50, 1000)
+        series.append(160, 49, 1300)
+        with open(self.path, "rb") as f:
+            f.seek(watchlist.HEADER.size)
+            self.assertEqual(f.read(), struct.pack("<iii", 60, -1, 300))
+
+    def test_range_reads_between_checkpoints(self):
+        series = watchlist.MIMIMSeries(self.path)
+        # two samples per timestamp, so ranges start and end inside runs
+        samples = [(i // 2 * 60, i % 100, 1000 + i) for i in range(1000)]
+        for sample in samples:
+            series.append(*sample)
+        every = watchlist.CHECKPOINT_EVERY
+        for reader in (series, watchlist.MIMIMSeries(self.path)):
+            for start, end in ((None, None), (0, 0), (7650, 7680), (7680, 15360), (14000, None), (None, 100)):
+                expected = [sample for sample in samples
+                            if (start is None or sample[0] >= start) and (end is None or sample[0] <= end)]
+                with self.subTest(start=start, end=end):
+                    self.assertEqual(list(zip(*reader.range(start, end))), expected)
+
+        reads = []
+        columns = series._columns
+        series._columns = lambda first=0, stop=None: reads.append((first, stop)) or columns(first, stop)
+        series.range(9000, 9060)
+        self.assertEqual(len(reads), 1)
+        self.assertLessEqual(reads[0][1] - reads[0][0], 2 * every)
+
+    def test_truncated_file(self):
+        with open(self.path, "wb") as f:
+            f.write(watchlist.MAGIC)
+        with self.assertRaisesRegex(Exception, "truncated"):
+            watchlist.MIMIMSeries(self.path)
+
+    def test_rejects_out_of_order_samples(self):
+        series = watchlist.MIMIMSeries(self.path)
+        series.append(100, 1, 1)
+        with self.assertRaises(Exception):
+            series.append(50, 1, 1)
+
+
+class TestWatchlist(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client = Mock()
+        self.client.get_multiple_artists.side_effect = lambda ids: {"artists": [
+            {"id": artist_id, "popularity": 40, "followers": {"total": 100}} for artist_id in ids
+        ] + [None]}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_refresh_batches(self):
+        tracker = watchlist.Watchlist(self.client, self.tmp.name, batch_size=50)
+        tracker.register(*[f"artist{i}" for i in range(120)])
+        tracker.register("artist0")
+
+        self.assertEqual(tracker.refresh(timestamp=1000), 120)
+        self.assertEqual(self.client.get_multiple_artists.call_count, 3)
+        self.assertEqual(len(tracker.series("artist7")), 1)
+
+        reloaded = watchlist.Watchlist(self.client, self.tmp.name)
+        self.assertEqual(len(reloaded.artist_ids), 120)
+
+    def test_run(self):
+        tracker = watchlist.Watchlist(self.client, self.tmp.name)
+        tracker.register("artist0")
+        sleep = Mock()
+        tracker.run(interval=60, iterations=3, sleep=sleep)
+        self.assertEqual(self.client.get_multiple_artists.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+#-----------------------------------------------------------------#
+# Watchlist: periodic MIMIM sampling for many artists.
+#
+# Watchlist.refresh() fetches popularity and followers for every registered
+# artist through the several-artists endpoint (50 per call) and appends one
+# sample per artist to its MIMIMSeries file.
+#
+# MIMIMSeries file layout (little endian):
+#   header   magic "MIMS", version, sample count, first sample
+#            (timestamp, popularity, followers) and last sample
+#   records  one int32 triple per later sample: seconds since the previous
+#            sample, popularity delta, followers delta
+#
+# Appends only write one 12 byte record and rewrite the header. A series
+# keeps a sparse in-memory index of every CHECKPOINT_EVERY-th sample
+# (absolute values), built on the first query and extended by appends.
+# Range queries bisect the index and read only the records between the two
+# surrounding checkpoints into a single array, decoding them with running
+# sums, so a history never becomes a list of per-sample Python objects.
+import os
+import sys
+import time
+import array
+import bisect
+import struct
+import itertools
+import deadlines
+import lanes
+import statify
+
+MAGIC = b"MIMS"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxIqiqqiq")
+RECORD_FIELDS = 3
+RECORD_SIZE = 4 * RECORD_FIELDS
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+SECONDS_PER_DAY = 86400
+# samples between two index checkpoints
+CHECKPOINT_EVERY = 256
+
+
+class MIMIMSeries(object):
+    """Append-only, delta-encoded popularity/followers history for one artist."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.first = None
+        self.last = None
+        # timestamps, popularity and followers of samples 0, CHECKPOINT_EVERY,
+        # 2 * CHECKPOINT_EVERY, ...; None until the first query
+        self.checkpoints = None
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                self._read_header(f.read(HEADER.size))
+
+    def _read_header(self, raw):
+        if len(raw) < HEADER.size:
+            raise Exception(f"{self.path} is a truncated MIMIM series file")
+        magic, version, count, *values = HEADER.unpack(raw)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"{self.path} is not a version {VERSION} MIMIM series file")
+        self.count = count
+        self.first = tuple(values[:3])
+        self.last = tuple(values[3:])
+
+    def _header(self):
+        return HEADER.pack(MAGIC, VERSION, self.count, *self.first, *self.last)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, popularity, followers):
+        """Adds a sample; timestamps must not go backwards."""
+        sample = (int(timestamp), int(popularity), int(followers))
+        if self.count == 0:
+            self.first = self.last = sample
+            self.count = 1
+            with open(self.path, "wb") as f:
+                f.write(self._header())
+            self.checkpoints = tuple(array.array("q", [value]) for value in sample)
+            return
+
+        record = array.array("i")
+        for value, previous in zip(sample, self.last):
+            delta = value - previous
+            if not INT32_MIN <= delta <= INT32_MAX:
+                raise Exception(f"Sample delta {delta} does not fit in {self.path}")
+            record.append(delta)
+        if record[0] < 0:
+            raise Exception(f"Sample at {sample[0]} is older than the last one in {self.path}")
+
+        if sys.byteorder == "big":
+            record.byteswap()
+        self.last = sample
+        self.count += 1
+        with open(self.path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            record.tofile(f)
+            f.seek(0)
+            f.write(self._header())
+        if self.checkpoints is not None and (self.count - 1) % CHECKPOINT_EVERY == 0:
+            for column, value in zip(self.checkpoints, sample):
+                column.append(value)
+
+    def _columns(self, first=0, stop=None):
+        """
+        Returns (timestamps, popularity, followers) as C-backed arrays for
+        samples first to stop; first must be a checkpoint
+        """
+        stop = self.count if stop is None else stop
+        records = array.array("i")
+        if stop > first + 1:
+            with open(self.path, "rb") as f:
+                # record i holds the deltas from sample i to sample i + 1
+                f.seek(HEADER.size + first * RECORD_SIZE)
+                try:
+                    records.fromfile(f, (stop - first - 1) * RECORD_FIELDS)
+                except EOFError:
+                    raise Exception(f"{self.path} is a truncated MIMIM series file") from None
+        if sys.byteorder == "big":
+            records.byteswap()
+        if first == 0:
+            initial = self.first
+        else:
+            initial = tuple(column[first // CHECKPOINT_EVERY] for column in self.checkpoints)
+        columns = []
+        for field in range(RECORD_FIELDS):
+            deltas = records[field::RECORD_FIELDS]
+            columns.append(array.array("q", itertools.accumulate(deltas, initial=initial[field])))
+        return tuple(columns)
+
+    def _index(self):
+        """The checkpoint arrays, reading the whole series once to build them."""
+        if self.checkpoints is None:
+            self.checkpoints = tuple(column[::CHECKPOINT_EVERY] for column in self._columns())
+        return self.checkpoints
+
+    def range(self, start=None, end=None):
+        """
+        Returns (timestamps, popularity, followers) arrays for the samples
+        with start <= timestamp <= end
+        """
+        if self.count == 0:
+            return array.array("q"), array.array("q"), array.array("q")
+        checkpoints = self._index()[0]
+        # samples up to the last checkpoint before start are all older than
+        # start, and samples from the first checkpoint after end are newer
+        block = 0 if start is None else max(0, bisect.bisect_left(checkpoints, start) - 1)
+        first = block * CHECKPOINT_EVERY
+        after = len(checkpoints) if end is None else bisect.bisect_right(checkpoints, end)
+        stop = min(self.count, after * CHECKPOINT_EVERY)
+        timestamps, popularity, followers = self._columns(first, stop)
+        lo = 0 if start is None else bisect.bisect_left(timestamps, start)
+        hi = len(timestamps) if end is None else bisect.bisect_right(timestamps, end)
+        return timestamps[lo:hi], popularity[lo:hi], followers[lo:hi]
+
+    def mimim(self, start=None, end=None):
+        """Returns (timestamps, MIMIM scores) for the samples in the range."""
+        timestamps, popularity, followers = self.range(start, end)
+        scores = array.array("d", map(statify.mimim_score, popularity, followers))
+        return timestamps, scores
+
+    def trend(self, start=None, end=None):
+        """
+        Growth over the range: follower change per day and relative growth,
+        popularity change and MIMIM at both ends. None if fewer than two
+        samples fall in the range
+        """
+        timestamps, popularity, followers = self.range(start, end)
+        if len(timestamps) < 2:
+            return None
+        days = (timestamps[-1] - timestamps[0]) / SECONDS_PER_DAY
+        follower_change = followers[-1] - followers[0]
+        mimim_start = statify.mimim_score(popularity[0], followers[0])
+        mimim_end = statify.mimim_score(popularity[-1], followers[-1])
+        return {
+            "samples": len(timestamps),
+            "days": days,
+            "followers_per_day": follower_change / days if days else 0.0,
+            "follower_growth_rate": follower_change / followers[0] if followers[0] else 0.0,
+            "popularity_change": popularity[-1] - popularity[0],
+            "mimim_start": round(mimim_start, 2),
+            "mimim_end": round(mimim_end, 2),
+            "mimim_change": round(mimim_end - mimim_start, 2)
+        }
+
+
+class Watchlist(object):
+    """
+    Registered artists are kept in directory/watchlist.txt and each has a
+    directory/<artist_id>.mimim series file.
+    """
+
+    def __init__(self, api_client, directory, batch_size=50):
+        self.api_client = api_client
+        self.directory = directory
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, "watchlist.txt")
+        self.artist_ids = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.artist_ids = [line.strip() for line in f if line.strip()]
+
+    def _save(self):
+        with open(self.index_path, "w") as f:
+            f.write("".join(artist_id + "\n" for artist_id in self.artist_ids))
+
+    def register(self, *artist_ids):
+        known = set(self.artist_ids)
+        for artist_id in artist_ids:
+            if artist_id not in known:
+                self.artist_ids.append(artist_id)
+                known.add(artist_id)
+        self._save()
+
+    def unregister(self, artist_id):
+        if artist_id in self.artist_ids:
+            self.artist_ids.remove(artist_id)
+            self._save()
+
+    def series(self, artist_id):
+        return MIMIMSeries(os.path.join(self.directory, artist_id + ".mimim"))
+
+    def refresh(self, timestamp=None, deadline=None):
+        """
+        Samples every registered artist once, in batched calls in the bulk
+        lane. Returns the number of samples recorded
+        """
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        recorded = 0
+        with deadlines.scope(deadline), lanes.scope(lanes.current() or lanes.BULK):
+            for i in range(0, len(self.artist_ids), self.batch_size):
+                batch = self.artist_ids[i:i + self.batch_size]
+                response = self.api_client.get_multiple_artists(batch)
+                for artist in response.get("artists", []):
+                    if not artist or not artist.get("id"):
+                        continue
+                    followers = artist.get("followers") or {}
+                    self.series(artist.get("id")).append(
+                        timestamp, artist.get("popularity", 0), followers.get("total", 0))
+                    recorded += 1
+        return recorded
+
+    def run(self, interval=3600, iterations=None, sleep=time.sleep):
+        """Refreshes every interval seconds, forever or for the given number of rounds."""
+        rounds = 0
+        while iterations is None or rounds < iterations:
+            started = time.monotonic()
+            self.refresh()
+            rounds += 1
+            if iterations is None or rounds < iterations:
+                sleep(max(0.0, interval - (time.monotonic() - started)))